@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+合成 .docx 基准语料生成器
+
+直接写出最小的 OOXML 包（不依赖 python-docx），相同参数和随机种子生成的文件逐字节相同，
+因此不同提交之间的基准结果可以直接比较。生成的文档包含：
+- 多级标题（Heading 1..N 样式）和正文段落，正文中穿插日期、金额、负责人等可被字段提取的文本
+- 指定数量和大小的表格，可选横向 (gridSpan) 和纵向 (vMerge) 合并单元格
+- 可选的中文 (CJK) 文本
+"""
+
+import argparse
+import random
+import zipfile
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, List, Optional
+from xml.sax.saxutils import escape
+
+# 固定的压缩包内时间戳，保证生成结果逐字节可复现
+_ZIP_DATE_TIME = (2024, 1, 1, 0, 0, 0)
+
+_W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>
+<Override PartName="/docProps/core.xml" ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>
+</Types>"""
+
+_PACKAGE_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties" Target="docProps/core.xml"/>
+</Relationships>"""
+
+_DOCUMENT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+_CORE_PROPERTIES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" \
+xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" \
+xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">
+<dc:title>{title}</dc:title>
+<dc:creator>{author}</dc:creator>
+<dcterms:created xsi:type="dcterms:W3CDTF">2024-03-05T08:00:00Z</dcterms:created>
+<dcterms:modified xsi:type="dcterms:W3CDTF">2024-03-06T08:00:00Z</dcterms:modified>
+</cp:coreProperties>"""
+
+_LATIN_WORDS = ['alpha', 'beta', 'gamma', 'delta', 'report', 'budget', 'quarter', 'revenue',
+                'project', 'status', 'review', 'total', 'region', 'growth', 'plan', 'cost']
+_CJK_WORDS = ['项目', '预算', '季度', '收入', '增长', '部门', '计划', '审核', '成本', '地区',
+              '合计', '说明', '负责人', '完成率', '年度', '报告']
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    """单个文档的生成参数"""
+    paragraphs: int = 50
+    heading_depth: int = 3
+    tables: int = 2
+    rows: int = 10
+    cols: int = 5
+    merge_ratio: float = 0.0
+    cjk: bool = True
+
+
+# 基准使用的规模档位：(文档参数, 文档数)
+TIERS: Dict[str, tuple] = {
+    'small': (CorpusSpec(paragraphs=20, heading_depth=2, tables=2, rows=5, cols=4), 40),
+    'medium': (CorpusSpec(paragraphs=200, heading_depth=3, tables=8, rows=20, cols=6,
+                          merge_ratio=0.05), 15),
+    'large': (CorpusSpec(paragraphs=2000, heading_depth=4, tables=30, rows=100, cols=8,
+                         merge_ratio=0.05), 4),
+}
+
+
+def _styles_xml(heading_depth: int) -> str:
+    styles = ['<w:style w:type="paragraph" w:default="1" w:styleId="Normal">'
+              '<w:name w:val="Normal"/></w:style>']
+    for level in range(1, heading_depth + 1):
+        styles.append(f'<w:style w:type="paragraph" w:styleId="Heading{level}">'
+                      f'<w:name w:val="heading {level}"/><w:basedOn w:val="Normal"/></w:style>')
+    styles.append('<w:style w:type="table" w:default="1" w:styleId="TableNormal">'
+                  '<w:name w:val="Normal Table"/></w:style>')
+    return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<w:styles xmlns:w="{_W_NS}">{"".join(styles)}</w:styles>')
+
+
+def _paragraph(text: str, style: Optional[str] = None) -> str:
+    ppr = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ''
+    return f'<w:p>{ppr}<w:r><w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+
+def _sentence(rng: random.Random, cjk: bool, words: int) -> str:
+    vocabulary = _CJK_WORDS if cjk and rng.random() < 0.6 else _LATIN_WORDS
+    separator = '' if vocabulary is _CJK_WORDS else ' '
+    return separator.join(rng.choice(vocabulary) for _ in range(words))
+
+
+def _merge_layout(rng: random.Random, rows: int, cols: int, merge_ratio: float) -> List[List[str]]:
+    """
+    为表格规划合并区域，返回每个网格位置的角色：
+    'cell' 普通单元格，'origin:<列数>' 合并区域起点，'hcover' 被横向合并，'vcont:<列数>' 纵向合并的续行
+    """
+    layout = [['cell'] * cols for _ in range(rows)]
+    if merge_ratio <= 0 or rows < 3 or cols < 2:
+        return layout
+
+    attempts = max(1, int(rows * cols * merge_ratio))
+    for _ in range(attempts):
+        top = rng.randrange(1, rows - 1)
+        left = rng.randrange(0, cols - 1)
+        height = rng.randint(1, min(3, rows - top))
+        width = rng.randint(1, min(3, cols - left))
+        if height == 1 and width == 1:
+            continue
+        if any(layout[r][c] != 'cell' for r in range(top, top + height)
+               for c in range(left, left + width)):
+            continue
+        for r in range(top, top + height):
+            layout[r][left] = f'origin:{width}' if r == top else f'vcont:{width}'
+            for c in range(left + 1, left + width):
+                layout[r][c] = 'hcover'
+    return layout
+
+
+def _table(rng: random.Random, spec: CorpusSpec) -> str:
+    layout = _merge_layout(rng, spec.rows, spec.cols, spec.merge_ratio)
+    grid = ''.join('<w:gridCol w:w="1500"/>' for _ in range(spec.cols))
+    parts = [f'<w:tbl><w:tblPr><w:tblStyle w:val="TableNormal"/><w:tblW w:w="0" w:type="auto"/>'
+             f'</w:tblPr><w:tblGrid>{grid}</w:tblGrid>']
+
+    for r in range(spec.rows):
+        parts.append('<w:tr>')
+        for c in range(spec.cols):
+            role = layout[r][c]
+            if role == 'hcover':
+                continue
+
+            tc_pr = []
+            if role.startswith(('origin:', 'vcont:')):
+                width = int(role.split(':')[1])
+                if width > 1:
+                    tc_pr.append(f'<w:gridSpan w:val="{width}"/>')
+                below = layout[r + 1][c] if r + 1 < spec.rows else ''
+                if role.startswith('vcont:'):
+                    tc_pr.append('<w:vMerge/>')
+                elif below.startswith('vcont:'):
+                    tc_pr.append('<w:vMerge w:val="restart"/>')
+
+            if role.startswith('vcont:'):
+                text = ''
+            elif r == 0:
+                text = f"{'列' if spec.cjk else 'Col'}{c + 1}"
+            elif c == 0:
+                text = f"{_sentence(rng, spec.cjk, 2)}{r}"
+            else:
+                text = f"{rng.uniform(0, 100000):,.2f}{'元' if spec.cjk else ''}"
+
+            tc_pr_xml = f'<w:tcPr>{"".join(tc_pr)}</w:tcPr>' if tc_pr else ''
+            parts.append(f'<w:tc>{tc_pr_xml}{_paragraph(text)}</w:tc>')
+        parts.append('</w:tr>')
+    parts.append('</w:tbl>')
+    return ''.join(parts)
+
+
+def document_xml(spec: CorpusSpec, seed: int) -> str:
+    """生成 word/document.xml 的内容"""
+    rng = random.Random(seed)
+    body = [
+        _paragraph(f"{'年度报告' if spec.cjk else 'Annual Report'} {seed}", 'Heading1'),
+        _paragraph(f"日期：2024年{seed % 12 + 1}月{seed % 28 + 1}日"),
+        _paragraph("编制单位：基准测试公司"),
+        _paragraph(f"负责人：张{seed}，审核状态：已审核"),
+    ]
+
+    # 表格均匀穿插在段落之间
+    table_positions = {int(spec.paragraphs * (i + 1) / (spec.tables + 1))
+                       for i in range(spec.tables)}
+    tables_written = 0
+    for idx in range(spec.paragraphs):
+        if spec.heading_depth and idx % 10 == 0:
+            level = 1 + (idx // 10) % spec.heading_depth
+            body.append(_paragraph(f"{'第' if spec.cjk else 'Section '}{idx // 10 + 1}"
+                                   f"{'节' if spec.cjk else ''}", f'Heading{level}'))
+        else:
+            body.append(_paragraph(_sentence(rng, spec.cjk, rng.randint(5, 30))))
+
+        if idx in table_positions:
+            body.append(_table(rng, spec))
+            tables_written += 1
+
+    while tables_written < spec.tables:
+        body.append(_table(rng, spec))
+        tables_written += 1
+
+    body.append('<w:sectPr/>')
+    return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<w:document xmlns:w="{_W_NS}"><w:body>{"".join(body)}</w:body></w:document>')
+
+
+def write_document(path: Path, spec: CorpusSpec, seed: int):
+    """生成一个 .docx 文件"""
+    parts = [
+        ('[Content_Types].xml', _CONTENT_TYPES),
+        ('_rels/.rels', _PACKAGE_RELS),
+        ('docProps/core.xml', _CORE_PROPERTIES.format(title=f"基准文档 {seed}", author="基准测试")),
+        ('word/_rels/document.xml.rels', _DOCUMENT_RELS),
+        ('word/document.xml', document_xml(spec, seed)),
+        ('word/styles.xml', _styles_xml(spec.heading_depth)),
+    ]
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, content in parts:
+            info = zipfile.ZipInfo(name, date_time=_ZIP_DATE_TIME)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            zf.writestr(info, content.encode('utf-8'))
+
+
+def generate_corpus(output_dir: str, spec: CorpusSpec, count: int, seed: int = 0) -> List[Path]:
+    """
+    生成 count 个文档到 output_dir，第 i 个文档使用种子 seed + i
+
+    Returns:
+        生成的文档路径列表
+    """
+    directory = Path(output_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = directory / f"bench_{i:04d}.docx"
+        write_document(path, spec, seed + i)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成合成 .docx 基准语料')
+    parser.add_argument('--output-dir', '-o', required=True, help='输出目录')
+    parser.add_argument('--tier', choices=sorted(TIERS), help='使用预设规模档位（其余规模参数被忽略）')
+    parser.add_argument('--count', '-n', type=int, help='文档数 (默认: 档位预设值或 10)')
+    parser.add_argument('--paragraphs', type=int, default=CorpusSpec.paragraphs, help='每个文档的段落数')
+    parser.add_argument('--heading-depth', type=int, default=CorpusSpec.heading_depth, help='标题级别数')
+    parser.add_argument('--tables', type=int, default=CorpusSpec.tables, help='每个文档的表格数')
+    parser.add_argument('--rows', type=int, default=CorpusSpec.rows, help='每个表格的行数')
+    parser.add_argument('--cols', type=int, default=CorpusSpec.cols, help='每个表格的列数')
+    parser.add_argument('--merge-ratio', type=float, default=CorpusSpec.merge_ratio,
+                       help='合并区域数量占单元格数的比例 (默认: 0，不合并)')
+    parser.add_argument('--no-cjk', action='store_false', dest='cjk', help='只生成英文文本')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子 (默认: 0)')
+
+    args = parser.parse_args()
+
+    if args.tier:
+        spec, count = TIERS[args.tier]
+    else:
+        spec = CorpusSpec(args.paragraphs, args.heading_depth, args.tables, args.rows, args.cols,
+                          args.merge_ratio, args.cjk)
+        count = 10
+    count = args.count or count
+
+    paths = generate_corpus(args.output_dir, spec, count, args.seed)
+    print(f"已生成 {len(paths)} 个文档到 {args.output_dir}: {asdict(spec)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+性能基准运行器
+
+对每个规模档位生成确定性的合成语料（见 corpus.py），分别测量三个主要入口：
+- extract_tables: extract_tables.extract_tables_from_docx
+- extract_fields: extract_fields.extract_fields（使用固定的字段配置）
+- batch_process: batch_process.process_documents 并写出汇总Excel
+
+每个 (档位, 入口) 在独立的子进程中运行，峰值内存 (RSS) 互不影响，导入依赖的时间不计入。
+每次重复前清空进程级文档缓存 (document_cache)，测量的是解析文档的开销，不是缓存命中。
+结果以 JSON 输出，包含 docs/sec、cells/sec 和峰值 RSS；使用 --compare 与之前保存的结果比较，
+吞吐量下降超过阈值时以非零状态退出。
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from corpus import TIERS, generate_corpus
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / 'scripts'
+
+ENTRY_POINTS = ('extract_tables', 'extract_fields', 'batch_process')
+
+# extract_fields 基准使用的字段配置，覆盖段落、标题、表格和正则四种定位方式
+BENCH_FIELDS = [
+    {'name': '标题', 'type': 'paragraph', 'location': '标题1[0]', 'default': ''},
+    {'name': '二级标题', 'type': 'paragraph', 'location': '标题2[0]', 'default': ''},
+    {'name': '编制单位', 'type': 'paragraph', 'location': '标题9[0]',
+     'pattern': '编制单位[:：]\\s*(.+)', 'default': ''},
+    {'name': '日期', 'type': 'regex', 'pattern': '日期[:：]\\s*(\\d{4}年\\d{1,2}月\\d{1,2}日)', 'default': ''},
+    {'name': '负责人', 'type': 'regex', 'pattern': '负责人[:：]\\s*([^\\s，。]+)', 'default': ''},
+    {'name': '不存在的字段', 'type': 'regex', 'pattern': '不存在[:：]\\s*(\\S+)', 'default': ''},
+    {'name': '首表表头', 'type': 'table', 'table_index': 0, 'row': 0, 'column': 1, 'default': ''},
+    {'name': '末表单元格', 'type': 'table', 'table_index': 1, 'row': 3, 'column': 2, 'default': ''},
+]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """当前进程（含已结束的子进程）的峰值常驻内存，单位MB；不支持的平台返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux 以KB为单位，macOS 以字节为单位
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 1)
+
+
+def _corpus_cells(paths: List[Path], engine: str) -> int:
+    from extract_tables import extract_tables_from_docx
+
+    return sum(len(row) for path in paths
+               for table in extract_tables_from_docx(str(path), engine) for row in table)
+
+
+def measure(entry: str, corpus_dir: str, engine: str, repeat: int, jobs: int) -> Dict[str, Any]:
+    """在当前进程中测量一个入口，返回测量结果（由子进程调用）"""
+    sys.path.insert(0, str(SCRIPTS_DIR))
+    from docx_excel import document_cache
+
+    paths = sorted(Path(corpus_dir).glob('*.docx'))
+
+    if entry == 'extract_tables':
+        from extract_tables import extract_tables_from_docx
+
+        def run_once(docs):
+            for path in docs:
+                extract_tables_from_docx(str(path), engine)
+
+    elif entry == 'extract_fields':
+        from extract_fields import FieldPlan, extract_fields
+
+        plan = FieldPlan(BENCH_FIELDS)
+
+        def run_once(docs):
+            for path in docs:
+                extract_fields(str(path), plan, engine)
+
+    elif entry == 'batch_process':
+        from batch_process import SummaryExcelWriter, process_documents
+
+        output = Path(tempfile.mkdtemp()) / 'summary.xlsx'
+
+        def run_once(docs):
+            writer = SummaryExcelWriter(str(output))
+            for _, doc_info, tables_info in process_documents(docs, jobs, engine):
+                writer.add_document(doc_info, tables_info)
+            writer.close()
+
+    else:
+        raise ValueError(f"未知的入口: {entry}")
+
+    # 预热：先处理一个文档，使延迟导入的依赖不计入计时
+    run_once(paths[:1])
+
+    timings = []
+    for _ in range(repeat):
+        # 同一进程中重复打开未变化的文档会命中缓存，每次重复都从解析开始
+        document_cache().clear()
+        start = time.perf_counter()
+        run_once(paths)
+        timings.append(time.perf_counter() - start)
+
+    cells = _corpus_cells(paths, engine)
+    seconds = statistics.median(timings)
+    return {
+        'entry': entry,
+        'documents': len(paths),
+        'cells': cells,
+        'seconds': round(seconds, 4),
+        'seconds_min': round(min(timings), 4),
+        'docs_per_sec': round(len(paths) / seconds, 2) if seconds else None,
+        'cells_per_sec': round(cells / seconds, 1) if seconds else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def _measure_in_subprocess(entry: str, corpus_dir: str, engine: str, repeat: int,
+                           jobs: int) -> Dict[str, Any]:
+    command = [sys.executable, __file__, '--measure', entry, '--corpus-dir', corpus_dir,
+               '--engine', engine, '--repeat', str(repeat), '--jobs', str(jobs)]
+    completed = subprocess.run(command, capture_output=True, text=True, encoding='utf-8')
+    if completed.returncode != 0:
+        raise RuntimeError(f"{entry} 测量失败:\n{completed.stderr}")
+    # 被测函数可能输出提示信息，结果在最后一行
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPTS_DIR,
+                                   capture_output=True, text=True)
+    except OSError:
+        return None
+    return completed.stdout.strip() or None
+
+
+def run_benchmarks(tiers: List[str], entries: List[str], engine: str, repeat: int,
+                   jobs: int, corpus_root: str, verbose: bool = False) -> Dict[str, Any]:
+    """生成语料并测量所有 (档位, 入口) 组合"""
+    report: Dict[str, Any] = {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'engine': engine,
+        'repeat': repeat,
+        'jobs': jobs,
+        'tiers': {},
+        'results': [],
+    }
+
+    for tier in tiers:
+        spec, count = TIERS[tier]
+        corpus_dir = str(Path(corpus_root) / tier)
+        generate_corpus(corpus_dir, spec, count)
+        report['tiers'][tier] = {'documents': count, **asdict(spec)}
+
+        for entry in entries:
+            if verbose:
+                print(f"测量 {tier}/{entry} ...", file=sys.stderr)
+            result = _measure_in_subprocess(entry, corpus_dir, engine, repeat, jobs)
+            result['tier'] = tier
+            report['results'].append(result)
+            if verbose:
+                print(f"  {result['docs_per_sec']} docs/sec, {result['cells_per_sec']} cells/sec, "
+                      f"峰值内存 {result['peak_rss_mb']} MB", file=sys.stderr)
+
+    return report
+
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any],
+                    threshold: float) -> List[str]:
+    """
+    比较两次基准结果，输出每项吞吐量变化
+
+    Returns:
+        吞吐量下降超过 threshold（比例）的项目列表
+    """
+    previous = {(r['tier'], r['entry']): r for r in baseline.get('results', [])}
+    regressions = []
+    print(f"对比基准: {baseline.get('commit')} -> {current.get('commit')}", file=sys.stderr)
+    for result in current['results']:
+        key = (result['tier'], result['entry'])
+        old = previous.get(key)
+        if not old or not old.get('docs_per_sec') or not result.get('docs_per_sec'):
+            continue
+        change = result['docs_per_sec'] / old['docs_per_sec'] - 1
+        flag = ''
+        if change < -threshold:
+            flag = '  <-- 变慢'
+            regressions.append(f"{key[0]}/{key[1]}")
+        print(f"  {key[0]:<8} {key[1]:<16} {old['docs_per_sec']:>10} -> "
+              f"{result['docs_per_sec']:>10} docs/sec ({change:+.1%}){flag}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='运行 docx-to-excel 性能基准')
+    parser.add_argument('--tiers', default='small,medium,large',
+                       help=f'规模档位，逗号分隔 (可选: {",".join(TIERS)}；默认: 全部)')
+    parser.add_argument('--entries', default=','.join(ENTRY_POINTS),
+                       help='要测量的入口，逗号分隔 (默认: 全部)')
+    parser.add_argument('--engine', '-e', default='fast', help='解析引擎 (默认: fast)')
+    parser.add_argument('--repeat', '-r', type=int, default=3, help='每项重复次数，取中位数 (默认: 3)')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                       help='batch_process 的进程数 (默认: 1，串行结果最稳定)')
+    parser.add_argument('--corpus-dir', help='语料目录 (默认: 临时目录)')
+    parser.add_argument('--output', '-o', help='结果JSON文件路径 (默认: 输出到标准输出)')
+    parser.add_argument('--compare', help='与之前保存的结果JSON比较')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                       help='判定为性能下降的吞吐量降幅 (默认: 0.10)')
+    parser.add_argument('--measure', choices=ENTRY_POINTS, help=argparse.SUPPRESS)
+    parser.add_argument('--verbose', '-v', action='store_true', help='显示进度')
+
+    args = parser.parse_args()
+
+    if args.measure:
+        # 子进程模式：只测量一个入口
+        result = measure(args.measure, args.corpus_dir, args.engine, args.repeat, args.jobs)
+        print(json.dumps(result, ensure_ascii=False))
+        return
+
+    tiers = [t.strip() for t in args.tiers.split(',') if t.strip()]
+    entries = [e.strip() for e in args.entries.split(',') if e.strip()]
+    for tier in tiers:
+        if tier not in TIERS:
+            parser.error(f"未知的档位: {tier}")
+    for entry in entries:
+        if entry not in ENTRY_POINTS:
+            parser.error(f"未知的入口: {entry}")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        report = run_benchmarks(tiers, entries, args.engine, args.repeat, args.jobs,
+                                args.corpus_dir or temp_dir, args.verbose)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + '\n', encoding='utf-8')
+        print(f"基准结果已保存: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        regressions = compare_reports(baseline, report, args.threshold)
+        if regressions:
+            print(f"性能下降超过 {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,98 +5,890 @@
 """
 
 import argparse
+import json
+import os
+import re
 import sys
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import chain, islice
 from pathlib import Path
-from typing import List, Dict, Any
-import pandas as pd
-from docx import Document
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from docx_excel import (DEFAULT_ENGINE, ENGINES, StreamingDocument, document_cache, metrics, open_document,
+                        read_metadata, table_model)
+from docx_excel.engine import origin_count
+from docx_excel.archive import document_size, is_archive
+from docx_excel.budget import DEFAULT_MAX_TASKS, MEMORY_ERROR, BudgetExceeded, BudgetPool, memory_exhausted
+from docx_excel.consolidate import TableBatch, column_names
+from docx_excel.dedup import DEDUP_MODES, document_digest
+from docx_excel.discovery import iter_documents, parse_shard, select_shard
+from docx_excel.metrics import Progress, stage
+from docx_excel.result_cache import ResultCache
+from docx_excel.writers import (OUTPUT_FORMATS, RecordWriter, format_output_path, open_record_writer,
+                                read_rows, resolve_format, restore_types, shard_metadata_path,
+                                shard_output_path, sheet_output_path, write_records)
+
+
+def find_docx_files(input_dir: str, pattern: str = "*.docx", recursive: bool = False,
+                    ordered: bool = True) -> Iterator[Path]:
+    """
+    逐个返回指定目录或 zip/tar 归档中匹配的.docx文件（边扫描边返回，见 docx_excel.discovery）
+
+    Raises:
+        FileNotFoundError: 输入目录不存在
+    """
+    if not Path(input_dir).is_dir() and not (is_archive(input_dir) and Path(input_dir).is_file()):
+        raise FileNotFoundError(f"输入目录不存在: {input_dir}")
+    return iter_documents(input_dir, pattern, recursive, ordered)
+
+
+def _build_document_info(doc, doc_path: Path) -> Dict[str, Any]:
+    """根据已解析的文档对象生成文档基本信息"""
+    first = next((text for text in (p.text.strip() for p in doc.paragraphs) if text), None)
+    return _document_info(doc_path, len(doc.paragraphs), len(doc.tables), len(doc.inline_shapes),
+                          doc.core_properties, first)
+
+
+def _document_info(doc_path: Path, paragraph_count: int, table_count: int, shape_count: int,
+                   core_properties, first_paragraph: Optional[str]) -> Dict[str, Any]:
+    info = {
+        '文件名': doc_path.name,
+        '文件路径': str(doc_path),
+        '文件大小': f"{document_size(doc_path) / 1024:.1f} KB",
+        '段落数': paragraph_count,
+        '表格数': table_count,
+        '图片数': shape_count,
+        '页数': '未知'  # python-docx不直接支持页数
+    }
+
+    # 尝试提取文档属性
+    info.update(_core_properties_info(core_properties))
+
+    # 第一个非空段落作为摘要
+    if first_paragraph:
+        info['首段'] = _summary_text(first_paragraph)
+
+    return info
+
+
+def _core_properties_info(core_properties) -> Dict[str, Any]:
+    """核心属性中的标题、作者和日期，为空的属性不输出"""
+    info = {}
+    if core_properties:
+        if core_properties.title:
+            info['标题'] = core_properties.title
+        if core_properties.author:
+            info['作者'] = core_properties.author
+        if core_properties.created:
+            info['创建日期'] = core_properties.created.strftime('%Y-%m-%d')
+        if core_properties.modified:
+            info['修改日期'] = core_properties.modified.strftime('%Y-%m-%d')
+    return info
+
+
+def _summary_text(text: str) -> str:
+    return text[:100] + "..." if len(text) > 100 else text
+
+
+def _build_metadata_info(metadata, doc_path: Path) -> Dict[str, Any]:
+    """根据文档属性部件生成文档基本信息（段落数和页数为 Word 保存时记录的值，不统计表格和图片）"""
+    info = {
+        '文件名': doc_path.name,
+        '文件路径': str(doc_path),
+        '文件大小': f"{document_size(doc_path) / 1024:.1f} KB",
+        '段落数': metadata.paragraphs if metadata.paragraphs is not None else '未知',
+        '页数': metadata.pages if metadata.pages is not None else '未知',
+    }
+    info.update(_core_properties_info(metadata.core_properties))
+    if metadata.first_paragraph:
+        info['首段'] = _summary_text(metadata.first_paragraph)
+    return info
+
+
+def _build_tables_summary(doc, doc_path: Path,
+                          batches: Optional[List[TableBatch]] = None) -> List[Dict[str, Any]]:
+    """
+    根据已解析的文档对象生成表格摘要（按网格模型统计，合并单元格只计一次）
+
+    batches 不为 None 时同时把每个表格的数据按列追加到其中（见 docx_excel.consolidate）。
+    """
+    tables_summary = []
+
+    for table_idx, table in enumerate(doc.tables):
+        model = table_model(table)
+        header = _header_texts(model.rows[0]) if model.rows else None
+        tables_summary.append(_table_info(doc_path, table_idx, len(model.rows), model.column_count,
+                                          model.cell_count, len(model.merged_cells), header))
+        if batches is not None:
+            batch = TableBatch.from_rows(table_idx + 1, model.texts())
+            if batch is not None:
+                batches.append(batch)
+
+    return tables_summary
+
+
+def _header_texts(row) -> List[str]:
+    """第一行中各单元格的文本，横向合并的单元格只取一次"""
+    return [cell.text for col, cell in enumerate(row) if cell.is_origin(0, col)]
+
+
+def _table_info(doc_path: Path, table_idx: int, row_count: int, col_count: int, cell_count: int,
+                merge_count: int, header: Optional[List[str]]) -> Dict[str, Any]:
+    table_info = {
+        '文档': doc_path.name,
+        '表格索引': table_idx + 1,
+        '行数': row_count,
+        '列数': col_count,
+        '总单元格数': cell_count,
+        '合并区域数': merge_count
+    }
+
+    # 提取表头（第一行）
+    if header is not None:
+        headers = [text.strip() for text in header if text.strip()]
+        table_info['表头'] = ', '.join(headers) if headers else '无'
+
+    return table_info
+
+
+def analyze_document(doc_path: Path, engine: str = DEFAULT_ENGINE,
+                     batches: Optional[List[TableBatch]] = None
+                     ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    单次解析文档，同时生成文档信息和表格摘要
+
+    每个文档只解析一次，避免重复解压和构建XML树。
+
+    Args:
+        doc_path: Word文档路径
+        engine: 解析引擎，'fast' 直接读取XML，'docx' 使用python-docx
+        batches: 不为 None 时在同一次解析中收集各表格的数据（--consolidate）
+
+    Returns:
+        (文档信息, 表格摘要列表)；解析失败时文档信息包含 '错误' 字段，表格摘要为空
+    """
+    try:
+        doc = open_document(doc_path, engine)
+    except MemoryError:
+        raise  # 内存耗尽不是文档本身的错误，由 _analyze 按内存预算处理
+    except Exception as e:
+        print(f"处理文件失败 {doc_path.name}: {e}")
+        return {'文件名': doc_path.name, '错误': str(e)}, []
 
+    try:
+        with stage('document_info'):
+            info = _build_document_info(doc, doc_path)
+    except MemoryError:
+        raise
+    except Exception as e:
+        print(f"处理文件失败 {doc_path.name}: {e}")
+        info = {'文件名': doc_path.name, '错误': str(e)}
 
-def find_docx_files(input_dir: str, pattern: str = "*.docx") -> List[Path]:
-    """查找指定目录下的所有.docx文件"""
-    input_path = Path(input_dir)
-    if not input_path.exists():
-        print(f"错误: 输入目录不存在: {input_dir}")
-        return []
+    try:
+        with stage('tables_summary'):
+            tables_summary = _build_tables_summary(doc, doc_path, batches)
+    except MemoryError:
+        raise
+    except Exception as e:
+        print(f"提取表格摘要失败 {doc_path.name}: {e}")
+        tables_summary = []
+        if batches:
+            batches.clear()
+
+    metrics.count(tables=len(tables_summary),
+                  rows=sum(t['行数'] for t in tables_summary),
+                  cells=sum(t['总单元格数'] for t in tables_summary))
+    return info, tables_summary
+
+
+def analyze_document_streaming(doc_path: Path, batches: Optional[List[TableBatch]] = None
+                               ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    增量解析文档（--streaming），结果与 analyze_document() 相同
+
+    按文档顺序遍历一次，每个段落和表格行处理完即释放，峰值内存与文档大小无关
+    （batches 不为 None 时表格数据会保留到该文档处理完）。
+    """
+    paragraph_count = 0
+    first_paragraph = None
+    tables_summary = []
+    try:
+        doc = StreamingDocument(doc_path)
+        with stage('stream'):
+            for block in doc.iter_blocks():
+                if isinstance(block, str):
+                    paragraph_count += 1
+                    if first_paragraph is None and block.strip():
+                        first_paragraph = block.strip()
+                    continue
+
+                row_count = 0
+                cell_count = 0
+                header = None
+                texts = [] if batches is not None else None
+                for row in block.iter_cells():
+                    if header is None:
+                        header = _header_texts(row)
+                    cell_count += origin_count(row, row_count)
+                    row_count += 1
+                    if texts is not None:
+                        texts.append([cell.text for cell in row])
+                if texts:
+                    batches.append(TableBatch.from_rows(len(tables_summary) + 1, texts))
+                tables_summary.append(_table_info(doc_path, len(tables_summary), row_count,
+                                                  block.column_count, cell_count,
+                                                  len(block.merged_cells), header))
+
+        with stage('document_info'):
+            info = _document_info(doc_path, paragraph_count, len(tables_summary),
+                                  doc.inline_shape_count, doc.core_properties, first_paragraph)
+    except MemoryError:
+        raise
+    except Exception as e:
+        print(f"处理文件失败 {doc_path.name}: {e}")
+        if batches:
+            batches.clear()
+        return {'文件名': doc_path.name, '错误': str(e)}, []
 
-    docx_files = list(input_path.glob(pattern))
-    docx_files.extend(input_path.glob("*.DOCX"))  # 大写扩展名
+    metrics.count(tables=len(tables_summary),
+                  rows=sum(t['行数'] for t in tables_summary),
+                  cells=sum(t['总单元格数'] for t in tables_summary))
+    return info, tables_summary
 
-    # 按文件名排序
-    docx_files.sort()
-    return docx_files
 
+def analyze_metadata(doc_path: Path, first_paragraph: bool = True
+                     ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    只读取 docProps/core.xml 和 docProps/app.xml 生成文档信息，不解析正文
 
-def extract_document_info(doc_path: Path) -> Dict[str, Any]:
-    """提取文档基本信息"""
+    first_paragraph 为 True 时增量解析正文，读到第一个非空段落即停止。
+    返回值与 analyze_document() 相同，表格摘要总是为空。
+    """
     try:
-        doc = Document(str(doc_path))
-        info = {
-            '文件名': doc_path.name,
-            '文件路径': str(doc_path),
-            '文件大小': f"{doc_path.stat().st_size / 1024:.1f} KB",
-            '段落数': len(doc.paragraphs),
-            '表格数': len(doc.tables),
-            '图片数': len(doc.inline_shapes),
-            '页数': '未知'  # python-docx不直接支持页数
-        }
-
-        # 尝试提取文档属性
-        if doc.core_properties:
-            if doc.core_properties.title:
-                info['标题'] = doc.core_properties.title
-            if doc.core_properties.author:
-                info['作者'] = doc.core_properties.author
-            if doc.core_properties.created:
-                info['创建日期'] = doc.core_properties.created.strftime('%Y-%m-%d')
-            if doc.core_properties.modified:
-                info['修改日期'] = doc.core_properties.modified.strftime('%Y-%m-%d')
-
-        # 提取前几个段落作为摘要
-        paragraphs = [p.text.strip() for p in doc.paragraphs if p.text.strip()]
-        if paragraphs:
-            info['首段'] = paragraphs[0][:100] + "..." if len(paragraphs[0]) > 100 else paragraphs[0]
-
-        return info
-
+        metadata = read_metadata(doc_path, first_paragraph)
+        with stage('document_info'):
+            return _build_metadata_info(metadata, doc_path), []
+    except MemoryError:
+        raise
     except Exception as e:
         print(f"处理文件失败 {doc_path.name}: {e}")
-        return {'文件名': doc_path.name, '错误': str(e)}
+        return {'文件名': doc_path.name, '错误': str(e)}, []
 
 
-def extract_tables_summary(doc_path: Path) -> List[Dict[str, Any]]:
-    """提取文档中的表格摘要信息"""
-    try:
-        doc = Document(str(doc_path))
-        tables_summary = []
+def extract_document_info(doc_path: Path, engine: str = DEFAULT_ENGINE) -> Dict[str, Any]:
+    """提取文档基本信息"""
+    info, _ = analyze_document(doc_path, engine)
+    return info
 
-        for table_idx, table in enumerate(doc.tables):
-            table_info = {
-                '文档': doc_path.name,
-                '表格索引': table_idx + 1,
-                '行数': len(table.rows),
-                '列数': len(table.columns) if table.columns else 0,
-                '总单元格数': len(table.rows) * (len(table.columns) if table.columns else 0)
-            }
 
-            # 提取表头（第一行）
-            if table.rows:
-                headers = []
-                for cell in table.rows[0].cells:
-                    header_text = cell.text.strip()
-                    if header_text:
-                        headers.append(header_text)
-                table_info['表头'] = ', '.join(headers) if headers else '无'
+def extract_tables_summary(doc_path: Path, engine: str = DEFAULT_ENGINE) -> List[Dict[str, Any]]:
+    """提取文档中的表格摘要信息"""
+    _, tables_summary = analyze_document(doc_path, engine)
+    return tables_summary
+
+
+def _analyze(doc_path: Path, engine: str, profile: bool, metadata_only: bool = False,
+             first_paragraph: bool = True, streaming: bool = False, consolidate: bool = False
+             ) -> Tuple[Tuple[Dict[str, Any], List[Dict[str, Any]]], Optional[Dict[str, Any]],
+                        Optional[List[TableBatch]]]:
+    """
+    分析文档（可在工作进程中执行），返回 (分析结果, 计时记录, 表格数据)
+
+    profile 为 False 时计时记录为 None；consolidate 为 False 时表格数据为 None。
+
+    Raises:
+        BudgetExceeded: 内存耗尽（'memory'），该文档记为内存超限，工作进程随后被回收。
+            C 扩展分配失败时可能报告为其他错误，失败时内存已接近上限的同样按内存超限处理
+    """
+    batches = [] if consolidate else None
+    if metadata_only:
+        func, args = analyze_metadata, (doc_path, first_paragraph)
+    elif streaming:
+        func, args = analyze_document_streaming, (doc_path, batches)
+    else:
+        func, args = analyze_document, (doc_path, engine, batches)
+    try:
+        if profile:
+            result, record = metrics.profile_document(doc_path.name, func, *args)
+        else:
+            result, record = func(*args), None
+    except MemoryError:
+        raise BudgetExceeded(MEMORY_ERROR) from None
+    if '错误' in result[0] and memory_exhausted():
+        raise BudgetExceeded(MEMORY_ERROR)
+    return result, record, batches
+
+
+def _duplicate_result(result: Tuple[Dict[str, Any], List[Dict[str, Any]]], doc_path: Path,
+                      original: Path, dedup: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    由内容相同的原文档的分析结果生成重复文档的结果
+
+    文件名、路径、大小改为重复文档自己的值，并在“重复于”中记录原文档路径。
+    content 方式下两者的文档属性可能不同，重新读取重复文档的核心属性（只读 docProps/core.xml）。
+    """
+    info, tables_summary = result
+    info = dict(info, 文件名=doc_path.name)
+    if '文件路径' in info:
+        info['文件路径'] = str(doc_path)
+    if '文件大小' in info:
+        info['文件大小'] = f"{document_size(doc_path) / 1024:.1f} KB"
+    if dedup == 'content' and '错误' not in info:
+        try:
+            core_info = _core_properties_info(read_metadata(doc_path, first_paragraph=False).core_properties)
+        except Exception as e:
+            print(f"读取文档属性失败 {doc_path.name}: {e}")
+        else:
+            for key in ('标题', '作者', '创建日期', '修改日期'):
+                info.pop(key, None)
+            info.update(core_info)
+    info[DUPLICATE_FIELD] = str(original)
+    return info, [dict(table_info, 文档=doc_path.name) for table_info in tables_summary]
+
+
+def _init_worker():
+    """工作进程中每个文档只打开一次，关闭已解析文档的缓存，不保留处理完的文档"""
+    document_cache().max_documents = 0
+
+
+def process_documents(docx_files: Iterable[Path], jobs: Optional[int] = None,
+                      engine: str = DEFAULT_ENGINE,
+                      cache: Optional[ResultCache] = None,
+                      ordered: bool = True, metadata_only: bool = False,
+                      first_paragraph: bool = True, streaming: bool = False,
+                      consolidate: bool = False, timeout: Optional[float] = None,
+                      max_memory: Optional[int] = None,
+                      max_tasks_per_worker: Optional[int] = None,
+                      dedup: Optional[str] = None) -> Iterator[tuple]:
+    """
+    并行分析文档，逐个返回结果
+
+    docx_files 可以是边查找边产生的迭代器，找到的文档立即提交处理。
+    激活了性能统计 (docx_excel.metrics) 时，每个文档的计时记录从工作进程返回并合并。
+
+    Args:
+        docx_files: 待处理的文档
+        jobs: 工作进程数，None 表示使用全部CPU核心，1 表示在当前进程内串行处理
+        engine: 解析引擎
+        cache: 结果缓存，命中的文档不再解析
+        ordered: True 时按输入顺序返回；False 时按完成顺序返回，慢文档不阻塞其他结果
+        metadata_only: 只读取文档属性（见 analyze_metadata），不解析正文
+        first_paragraph: metadata_only 时是否读取首段
+        streaming: 增量解析文档（见 analyze_document_streaming），用于超大文档
+        consolidate: 在同一次解析中收集各表格的数据（缓存中没有表格数据，此时不使用缓存）
+        timeout: 单个文档的处理时间上限（秒），超时的文档记为 '错误': 'timeout'
+        max_memory: 每个工作进程的内存上限（MB），超限的文档记为 '错误': 'memory'
+        max_tasks_per_worker: 每个工作进程处理的文档数上限，之后换用新进程
+        dedup: 'file' 或 'content' 时先计算文档指纹（见 docx_excel.dedup），指纹相同的文档只分析
+            第一个，其余复用其结果并在文档信息中记录“重复于”；结果缓存命中的文档不计算指纹。
+            整个运行期间只保留各内容的文档信息和表格摘要；consolidate 时不保留表格数据，首个文档
+            处理完后才出现的副本重新分析以取得表格数据
+
+    设置了 timeout、max_memory 或 max_tasks_per_worker 时使用 BudgetPool
+    （见 docx_excel.budget），即使 jobs 为 1 也在独立的工作进程中处理文档。
+
+    Yields:
+        (文档路径, 文档信息, 表格摘要列表)；consolidate 为 True 时为
+        (文档路径, 文档信息, 表格摘要列表, 表格数据批次列表)
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    budgeted = bool(timeout or max_memory or max_tasks_per_worker)
+    # 文档数少于进程数时不启动多余的进程
+    files_iter = iter(docx_files)
+    head = list(islice(files_iter, jobs))
+    jobs = max(1, min(jobs, len(head)))
+    files_iter = chain(head, files_iter)
+    collector = metrics.current()
+    analyze_args = (engine, collector is not None, metadata_only, first_paragraph, streaming,
+                    consolidate)
+    if consolidate:
+        cache = None
+    # 文档指纹 -> (首个文档路径, 在途的进程池任务或 None, 文档信息和表格摘要或 None)。
+    # 任务完成后只保留体积很小的摘要结果，不保留任务和表格数据
+    seen: Dict[str, tuple] = {}
+
+    def fingerprint(doc_path: Path) -> Optional[str]:
+        if not dedup:
+            return None
+        with stage('dedup'):
+            return document_digest(doc_path, dedup)
+
+    def remember(digest: Optional[str], doc_path: Path, result):
+        """首个文档分析完成：保留其摘要结果，供之后的副本复用"""
+        if digest:
+            seen[digest] = (doc_path, None, result)
+
+    def mark_duplicate(result, original: Path):
+        """重新分析的副本（consolidate）：结果是其自身的分析结果，只记录“重复于”"""
+        return dict(result[0], **{DUPLICATE_FIELD: str(original)}), result[1]
+
+    def output(doc_path: Path, result, batches):
+        if consolidate:
+            return doc_path, result[0], result[1], batches or []
+        return doc_path, result[0], result[1]
+
+    def lookup(doc_path: Path):
+        if not cache:
+            return None
+        with stage('cache'):
+            cached = cache.lookup(doc_path)
+        if cached is not None and collector:
+            collector.add_document({'file': doc_path.name, 'seconds': 0.0, 'stages': {},
+                                    'cached': True})
+        return cached
+
+    # 缓存未命中、正在分析的文档 -> 分析之前取得的 (大小, 修改时间, 内容哈希)
+    stamps: Dict[Path, Optional[tuple]] = {}
+
+    def begin(doc_path: Path, digest: Optional[str]):
+        """分析之前记录文档的状态，分析期间被修改的文件不会以新的状态保存旧的结果"""
+        if cache:
+            # 按文件内容去重的指纹即是文件内容的 SHA-1，不再读取文件
+            content_hash = digest.split(':', 1)[1] if dedup == 'file' and digest else None
+            with stage('cache'):
+                stamps[doc_path] = cache.stamp(doc_path, content_hash)
+
+    def finish(doc_path: Path, result, record):
+        if record is not None:
+            if '错误' in result[0]:
+                record['error'] = result[0]['错误']
+            collector.add_document(record)
+        if cache:
+            with stage('cache'):
+                cache.store(doc_path, result[0], result[1], stamps.pop(doc_path, None))
+
+    if jobs == 1 and not budgeted:
+        # 与工作进程 (_init_worker) 相同，每个文档只打开一次，不保留处理完的文档；结束时恢复
+        doc_cache = document_cache()
+        max_documents, doc_cache.max_documents = doc_cache.max_documents, 0
+        try:
+            for doc_path in files_iter:
+                batches = None
+                result = lookup(doc_path)
+                digest = fingerprint(doc_path) if result is None else None
+                original, _, shared = seen.get(digest, (None, None, None))
+                if shared is not None and not consolidate:
+                    result = _duplicate_result(shared, doc_path, original, dedup)
+                elif result is None:
+                    begin(doc_path, digest)
+                    try:
+                        result, record, batches = _analyze(doc_path, *analyze_args)
+                    except BudgetExceeded as e:
+                        print(f"处理文件失败 {doc_path.name}: {e}")
+                        result = ({'文件名': doc_path.name, '错误': str(e)}, [])
+                        stamps.pop(doc_path, None)
+                    else:
+                        finish(doc_path, result, record)
+                    if original is None:
+                        remember(digest, doc_path, result)
+                    else:
+                        result = mark_duplicate(result, original)
+                yield output(doc_path, result, batches)
+        finally:
+            doc_cache.max_documents = max_documents
+        return
+
+    # 限制在途任务数量，避免一次性提交全部文档占用内存
+    max_in_flight = jobs * 4
+    max_pending = max_in_flight * 16
+    if budgeted:
+        executor = BudgetPool(jobs, timeout, max_memory, max_tasks_per_worker, initializer=_init_worker)
+    else:
+        executor = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker)
+    with executor:
+        pending = deque()
+        in_flight = 0
+        exhausted = False
+
+        while True:
+            # 补充任务：缓存命中的结果直接排队，副本与其首个文档共用任务或已完成的结果，
+            # 其余的提交到进程池。队列项为 (文档路径, 任务, 已有结果, 首个相同文档, 是否共用, 文档指纹)
+            while not exhausted and in_flight < max_in_flight and len(pending) < max_pending:
+                doc_path = next(files_iter, None)
+                if doc_path is None:
+                    exhausted = True
+                    break
+                cached = lookup(doc_path)
+                if cached is not None:
+                    pending.append((doc_path, None, cached, None, False, None))
+                    continue
+                digest = fingerprint(doc_path)
+                original, task, shared = seen.get(digest, (None, None, None))
+                if task is not None or (shared is not None and not consolidate):
+                    pending.append((doc_path, task, shared, original, True, None))
+                    continue
+                begin(doc_path, digest)
+                future = executor.submit(_analyze, doc_path, *analyze_args)
+                pending.append((doc_path, future, None, original, False, digest))
+                in_flight += 1
+                if digest and original is None:
+                    seen[digest] = (doc_path, future, None)
+
+            if not pending:
+                break
+
+            if ordered:
+                doc_path, future, result, original, shared, digest = pending.popleft()
+            else:
+                doc_path, future, result, original, shared, digest = _take_completed(pending)
+            batches = None
+            if future is not None:
+                if not shared:
+                    in_flight -= 1
+                try:
+                    result, record, batches = future.result()
+                except Exception as e:
+                    # 工作进程异常退出、超出时间或内存预算等情况，记录为单个文档错误而不中断整批处理
+                    print(f"处理文件失败 {doc_path.name}: {e}")
+                    result = ({'文件名': doc_path.name, '错误': str(e)}, [])
+                    if not shared:
+                        stamps.pop(doc_path, None)
+                else:
+                    if not shared:
+                        finish(doc_path, result, record)
+                if not shared and original is None:
+                    remember(digest, doc_path, result)
+            if shared:
+                result = _duplicate_result(result, doc_path, original, dedup)
+            elif original is not None:
+                result = mark_duplicate(result, original)
+
+            yield output(doc_path, result, batches)
+
+
+def _take_completed(pending: deque):
+    """从队列中取出一个已有结果的项（缓存命中或已完成的任务），都未完成时等待任一任务完成"""
+    def first_ready():
+        return next((i for i, (_, future, *_) in enumerate(pending)
+                     if future is None or future.done()), None)
+
+    index = first_ready()
+    if index is None:
+        wait({future for _, future, *_ in pending}, return_when=FIRST_COMPLETED)
+        index = first_ready()
+    item = pending[index]
+    del pending[index]
+    return item
+
+
+# 汇总表的列结构。预先固定列顺序，使输出可以逐行流式写入，且每次运行的列一致
+DOCUMENT_INFO_FIELDS = ['文件名', '文件路径', '文件大小', '段落数', '表格数', '图片数', '页数',
+                        '标题', '作者', '创建日期', '修改日期', '首段', '错误']
+# --dedup：重复文档在文档信息中记录内容相同的首个文档的路径
+DUPLICATE_FIELD = '重复于'
+TABLE_SUMMARY_FIELDS = ['文档', '表格索引', '行数', '列数', '总单元格数', '合并区域数', '表头']
+# --consolidate：合并表格工作表在表头列之前的来源列，以及各表结构的索引工作表
+CONSOLIDATED_SOURCE_FIELDS = ['文件路径', '表格索引']
+SCHEMA_INDEX_FIELDS = ['工作表', '签名', '表头', '表格数', '行数']
+SCHEMA_INDEX_SHEET = '表结构'
+
+
+class StreamingSheet:
+    """
+    基于只写(write-only)工作表或流式记录写入器 (RecordWriter) 的写入器
+
+    列结构由 fields 预先确定。extensible 为 True 时，前 schema_buffer 条记录会先缓存，
+    其中出现的新字段追加到列尾；缓存写满后列结构冻结，之后出现的未知字段会被忽略并给出警告。
+    因此内存占用只与缓存大小有关，与总行数无关。
+    """
+
+    def __init__(self, ws, fields: List[str], extensible: bool = True,
+                 schema_buffer: int = 1000):
+        self.ws = ws
+        self.fields = list(fields)
+        self.extensible = extensible
+        self.schema_buffer = schema_buffer
+        self.row_count = 0
+        self._known = set(self.fields)
+        self._buffer: List[Dict[str, Any]] = []
+        self._frozen = not extensible
+        self._ignored = set()
+        if self._frozen:
+            self._write_header()
+
+    def append(self, record: Dict[str, Any]):
+        """追加一条记录"""
+        self.row_count += 1
+        if not self._frozen:
+            for key in record:
+                if key not in self._known:
+                    self._known.add(key)
+                    self.fields.append(key)
+            self._buffer.append(record)
+            if len(self._buffer) >= self.schema_buffer:
+                self._freeze()
+            return
+
+        for key in record:
+            if key not in self._known and key not in self._ignored:
+                self._ignored.add(key)
+                print(f"警告: 工作表 {self.ws.title} 列结构已固定，忽略新字段: {key}")
+        self.ws.append([record.get(field, '') for field in self.fields])
+
+    def append_columns(self, columns: List[list]):
+        """追加按列存放的一批行，列顺序与 fields 相同（只用于列结构固定的工作表）"""
+        self.row_count += len(columns[0]) if columns else 0
+        if isinstance(self.ws, RecordWriter):
+            self.ws.append_columns(columns)
+        else:
+            for values in zip(*columns):
+                self.ws.append(values)
+
+    def close(self):
+        """写出缓存中剩余的记录"""
+        if not self._frozen:
+            self._freeze()
+
+    def _freeze(self):
+        self._frozen = True
+        self._write_header()
+        for record in self._buffer:
+            self.ws.append([record.get(field, '') for field in self.fields])
+        self._buffer = []
+
+    def _write_header(self):
+        if isinstance(self.ws, RecordWriter):
+            self.ws.write_header(self.fields)
+            return
+
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+        from openpyxl.utils import get_column_letter
+
+        # 只写工作表必须在写入第一行之前设置列宽
+        for col_idx, field in enumerate(self.fields, 1):
+            self.ws.column_dimensions[get_column_letter(col_idx)].width = max(len(field), 15)
+
+        header = []
+        for field in self.fields:
+            cell = WriteOnlyCell(self.ws, value=field)
+            cell.font = Font(bold=True)
+            header.append(cell)
+        self.ws.append(header)
+
+
+class ConsolidatedSheet:
+    """一种表结构（表头签名）的合并表格工作表"""
+
+    __slots__ = ('name', 'header', 'table_count', 'sheet')
+
+    def __init__(self, name: str, header: List[str], sheet: StreamingSheet):
+        self.name = name
+        self.header = header
+        self.table_count = 0
+        self.sheet = sheet
+
+
+class SummaryExcelWriter:
+    """
+    流式生成批量处理汇总文件
+
+    每处理完一个文档即调用 add_document() 追加行，close() 时写入统计信息并保存。
+    output_format 为 xlsx 时生成包含三个工作表的Excel文件；为 csv/jsonl/parquet 时
+    每个工作表写成一个文件（<输出文件名>_<工作表>.<格式>），记录逐条写出。
+
+    consolidate 为 True 时，表头签名相同的表格数据追加到同一个工作表（表_<签名>），
+    首次遇到新的表结构时创建；close() 时另写一个“表结构”索引工作表。
+
+    dedup 为 True 时文档信息增加“重复于”列，统计信息中给出重复文档数。
+    """
+
+    def __init__(self, output_path: str,
+                 document_fields: Optional[List[str]] = None,
+                 table_fields: Optional[List[str]] = None,
+                 extensible: bool = True,
+                 output_format: str = 'xlsx',
+                 include_tables: bool = True,
+                 consolidate: bool = False,
+                 dedup: bool = False):
+        self.output_path = output_path
+        self.output_format = output_format
+        self.include_tables = include_tables
+        self.consolidate = consolidate
+        self.dedup = dedup
+        if document_fields is None:
+            document_fields = DOCUMENT_INFO_FIELDS + [DUPLICATE_FIELD] if dedup else DOCUMENT_INFO_FIELDS
+        self.wb = None
+        sheet_names = ["文档信息", "表格摘要"] if include_tables else ["文档信息"]
+        if output_format == 'xlsx':
+            from openpyxl import Workbook
+
+            self.wb = Workbook(write_only=True)
+            targets = [self.wb.create_sheet(title=name) for name in sheet_names]
+            self.output_files = [output_path]
+        else:
+            targets = [open_record_writer(self._sheet_path(name), output_format, name)
+                       for name in sheet_names]
+            self.output_files = [self._sheet_path(name) for name in sheet_names + ["统计信息"]]
+
+        self.docs_sheet = StreamingSheet(
+            targets[0], document_fields, extensible)
+        # 只读取文档属性时 (include_tables 为 False) 没有表格摘要工作表
+        self.tables_sheet = StreamingSheet(
+            targets[1], table_fields or TABLE_SUMMARY_FIELDS, extensible) if include_tables else None
+        self.document_count = 0
+        self.table_count = 0
+        self.failed_count = 0
+        self.duplicate_count = 0
+        # 表头签名 -> 合并表格工作表，按首次出现的顺序
+        self.schemas: Dict[str, ConsolidatedSheet] = {}
+        self.consolidated_rows = 0
+
+    def _sheet_path(self, sheet_name: str) -> str:
+        return sheet_output_path(self.output_path, sheet_name, self.output_format)
+
+    def add_document(self, doc_info: Dict[str, Any], tables_info: List[Dict[str, Any]],
+                     batches: Optional[List[TableBatch]] = None):
+        """追加一个文档的信息行和表格摘要行，以及合并表格的数据（consolidate 时）"""
+        self.add_document_info(doc_info)
+        self.add_tables_summary(tables_info)
+        if batches:
+            self.add_table_batches(doc_info.get('文件路径', doc_info.get('文件名', '')), batches)
+
+    def add_table_batches(self, source: str, batches: List[TableBatch]):
+        """把一个文档的表格数据按表头签名追加到对应的合并表格工作表"""
+        for batch in batches:
+            schema = self.schemas.get(batch.signature)
+            if schema is None:
+                schema = self._open_schema(batch.signature, batch.header)
+            schema.table_count += 1
+            if batch.row_count:
+                n = batch.row_count
+                schema.sheet.append_columns([[source] * n, [batch.table_index] * n] + batch.columns)
+                self.consolidated_rows += n
+
+    def add_schema_rows(self, signature: str, header: List[str], table_count: int,
+                        rows: Iterable[list], chunk_rows: int = 1000):
+        """
+        追加另一次运行写出的合并表格行（合并分片结果时使用）
+
+        rows 的每一行已包含来源列 (CONSOLIDATED_SOURCE_FIELDS)，按 chunk_rows 行一批转为按列存放后写入。
+        """
+        schema = self.schemas.get(signature)
+        if schema is None:
+            schema = self._open_schema(signature, header)
+        schema.table_count += table_count
+        rows = iter(rows)
+        for chunk in iter(lambda: list(islice(rows, chunk_rows)), []):
+            schema.sheet.append_columns([list(column) for column in zip(*chunk)])
+            self.consolidated_rows += len(chunk)
+
+    def _open_schema(self, signature: str, header: List[str]) -> 'ConsolidatedSheet':
+        name = f"表_{signature[:12]}"
+        if self.wb is not None:
+            target = self.wb.create_sheet(title=name)
+        else:
+            target = open_record_writer(self._sheet_path(name), self.output_format, name)
+            self.output_files.insert(-1, self._sheet_path(name))
+        fields = CONSOLIDATED_SOURCE_FIELDS + column_names(header)
+        schema = ConsolidatedSheet(name, header, StreamingSheet(target, fields, extensible=False))
+        self.schemas[signature] = schema
+        return schema
+
+    def schema_rows(self) -> List[list]:
+        """表结构索引工作表的内容"""
+        return [[schema.name, signature, ', '.join(column_names(schema.header)),
+                 schema.table_count, schema.sheet.row_count]
+                for signature, schema in self.schemas.items()]
+
+    def add_document_info(self, doc_info: Dict[str, Any]):
+        """追加一行文档信息"""
+        self.docs_sheet.append(doc_info)
+        self.document_count += 1
+        if '错误' in doc_info:
+            self.failed_count += 1
+        if doc_info.get(DUPLICATE_FIELD):
+            self.duplicate_count += 1
+
+    def add_tables_summary(self, tables_info: List[Dict[str, Any]]):
+        """追加表格摘要行"""
+        if self.tables_sheet is None:
+            return
+        for table_info in tables_info:
+            self.tables_sheet.append(table_info)
+        self.table_count += len(tables_info)
+
+    def stats_rows(self) -> List[list]:
+        """统计信息工作表的内容"""
+        rows = [
+            ["处理文档数", self.document_count],
+            ["发现表格总数", self.table_count],
+            ["成功处理文档", self.document_count - self.failed_count],
+            ["失败文档", self.failed_count]
+        ]
+        if not self.include_tables:
+            del rows[1]
+        if self.dedup:
+            rows.append(["重复文档数", self.duplicate_count])
+        if self.consolidate:
+            rows += [["表结构数", len(self.schemas)], ["合并数据行数", self.consolidated_rows]]
+        return rows
+
+    def column_types(self) -> Dict[str, Dict[str, str]]:
+        """各工作表中读回时会丢失的列类型（工作表名 -> 列名 -> 类型），见 RecordWriter.column_types()"""
+        sheets = [sheet for sheet in (self.docs_sheet, self.tables_sheet) if sheet is not None]
+        sheets += [schema.sheet for schema in self.schemas.values()]
+        types = {}
+        for sheet in sheets:
+            if isinstance(sheet.ws, RecordWriter) and sheet.ws.column_types():
+                types[sheet.ws.title] = sheet.ws.column_types()
+        return types
+
+    def close(self) -> bool:
+        """写入统计信息工作表并保存文件"""
+        try:
+            sheets = [sheet for sheet in (self.docs_sheet, self.tables_sheet) if sheet is not None]
+            sheets += [schema.sheet for schema in self.schemas.values()]
+            for sheet in sheets:
+                sheet.close()
+
+            if self.wb is None:
+                with stage('save'):
+                    for sheet in sheets:
+                        sheet.ws.close()
+                    if self.consolidate:
+                        index_path = self._sheet_path(SCHEMA_INDEX_SHEET)
+                        write_records(index_path, self.output_format, SCHEMA_INDEX_FIELDS,
+                                      self.schema_rows())
+                        self.output_files.insert(-1, index_path)
+                    write_records(self._sheet_path("统计信息"), self.output_format,
+                                  ["统计项", "数值"], self.stats_rows())
+                return True
+
+            if self.consolidate:
+                index = StreamingSheet(self.wb.create_sheet(title=SCHEMA_INDEX_SHEET),
+                                       SCHEMA_INDEX_FIELDS, extensible=False)
+                for row in self.schema_rows():
+                    index.append(dict(zip(SCHEMA_INDEX_FIELDS, row)))
+
+            from openpyxl.cell import WriteOnlyCell
+            from openpyxl.styles import Font
+
+            # 统计信息工作表
+            ws_stats = self.wb.create_sheet(title="统计信息")
+            for col in ['A', 'B']:
+                ws_stats.column_dimensions[col].width = 20
+
+            header = []
+            for value in ["统计项", "数值"]:
+                cell = WriteOnlyCell(ws_stats, value=value)
+                cell.font = Font(bold=True)
+                header.append(cell)
+            ws_stats.append(header)
 
-            tables_summary.append(table_info)
+            for row in self.stats_rows():
+                ws_stats.append(row)
 
-        return tables_summary
+            # 保存文件
+            with stage('save'):
+                self.wb.save(self.output_path)
+            return True
 
-    except Exception as e:
-        print(f"提取表格摘要失败 {doc_path.name}: {e}")
-        return []
+        except Exception as e:
+            print(f"创建{'Excel' if self.wb is not None else self.output_format}文件失败: {e}")
+            return False
 
 
 def create_summary_excel(documents_info: List[Dict[str, Any]],
@@ -104,77 +896,11 @@ def create_summary_excel(documents_info: List[Dict[str, Any]],
                         output_path: str) -> bool:
     """创建汇总Excel文件"""
     try:
-        wb = Workbook()
-
-        # 文档信息工作表
-        if documents_info:
-            ws_docs = wb.active
-            ws_docs.title = "文档信息"
-
-            # 获取所有字段
-            all_fields = set()
-            for info in documents_info:
-                all_fields.update(info.keys())
-
-            fields = list(all_fields)
-            ws_docs.append(fields)
-
-            # 写入数据
-            for info in documents_info:
-                row = [info.get(field, '') for field in fields]
-                ws_docs.append(row)
-
-            # 设置列宽和格式
-            for col_idx, field in enumerate(fields, 1):
-                ws_docs.column_dimensions[chr(64 + col_idx)].width = max(len(field), 15)
-
-            # 表头加粗
-            for cell in ws_docs[1]:
-                cell.font = Font(bold=True)
-
-        # 表格摘要工作表
-        if tables_summary:
-            ws_tables = wb.create_sheet(title="表格摘要")
-
-            if tables_summary:
-                fields = list(tables_summary[0].keys())
-                ws_tables.append(fields)
-
-                for table_info in tables_summary:
-                    row = [table_info.get(field, '') for field in fields]
-                    ws_tables.append(row)
-
-                # 设置列宽
-                for col_idx, field in enumerate(fields, 1):
-                    ws_tables.column_dimensions[chr(64 + col_idx)].width = max(len(field), 15)
-
-                # 表头加粗
-                for cell in ws_tables[1]:
-                    cell.font = Font(bold=True)
-
-        # 统计信息工作表
-        ws_stats = wb.create_sheet(title="统计信息")
-        stats_data = [
-            ["统计项", "数值"],
-            ["处理文档数", len(documents_info)],
-            ["发现表格总数", len(tables_summary)],
-            ["成功处理文档", sum(1 for d in documents_info if '错误' not in d)],
-            ["失败文档", sum(1 for d in documents_info if '错误' in d)]
-        ]
-
-        for row in stats_data:
-            ws_stats.append(row)
-
-        # 设置格式
-        for col in ['A', 'B']:
-            ws_stats.column_dimensions[col].width = 20
-
-        for cell in ws_stats[1]:
-            cell.font = Font(bold=True)
-
-        # 保存文件
-        wb.save(output_path)
-        return True
+        writer = SummaryExcelWriter(output_path)
+        for info in documents_info:
+            writer.add_document_info(info)
+        writer.add_tables_summary(tables_summary)
+        return writer.close()
 
     except Exception as e:
         print(f"创建Excel文件失败: {e}")
@@ -182,8 +908,11 @@ def create_summary_excel(documents_info: List[Dict[str, Any]],
 
 
 def create_individual_excels(documents_info: List[Dict[str, Any]],
-                           output_dir: str) -> bool:
-    """为每个文档创建单独的Excel文件"""
+                           output_dir: str, output_format: str = 'xlsx') -> bool:
+    """为每个文档创建单独的Excel文件（或指定格式的文件）"""
+    from openpyxl import Workbook
+    from openpyxl.styles import Font
+
     try:
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
@@ -192,9 +921,14 @@ def create_individual_excels(documents_info: List[Dict[str, Any]],
             if '错误' in info:
                 continue
 
-            filename = info.get('文件名', 'unknown').replace('.docx', '.xlsx')
+            filename = info.get('文件名', 'unknown').replace('.docx', f'.{output_format}')
             filepath = output_path / filename
 
+            if output_format != 'xlsx':
+                write_records(str(filepath), output_format, ["属性", "值"],
+                              ([key, str(value)] for key, value in info.items() if key != '文件名'))
+                continue
+
             wb = Workbook()
             ws = wb.active
             ws.title = "文档信息"
@@ -221,80 +955,482 @@ def create_individual_excels(documents_info: List[Dict[str, Any]],
         return False
 
 
-def main():
-    parser = argparse.ArgumentParser(description='批量处理Word文档并提取信息到Excel')
-    parser.add_argument('--input-dir', '-i', required=True, help='输入目录路径')
-    parser.add_argument('--output', '-o', default='batch_output.xlsx', help='输出Excel文件路径')
-    parser.add_argument('--merge', '-m', action='store_true', default=True,
-                       help='合并所有文档数据到单个文件 (默认: True)')
-    parser.add_argument('--no-merge', action='store_false', dest='merge',
-                       help='为每个文档创建单独文件')
-    parser.add_argument('--pattern', '-p', default='*.docx', help='文件匹配模式 (默认: *.docx)')
-    parser.add_argument('--verbose', '-v', action='store_true', help='显示详细信息')
-
-    args = parser.parse_args()
+def _cache_key(engine: str, metadata_only: bool, first_paragraph: bool, streaming: bool) -> str:
+    if metadata_only:
+        return 'metadata' if first_paragraph else 'metadata-no-summary'
+    return 'stream' if streaming else engine
+
+
+def run_batch(input_dir: str, output: str = 'batch_output.xlsx', merge: bool = True,
+              pattern: str = '*.docx', jobs: Optional[int] = None,
+              engine: str = DEFAULT_ENGINE, use_cache: bool = False,
+              cache_file: Optional[str] = None, verbose: bool = False,
+              output_format: Optional[str] = None, recursive: bool = False,
+              ordered: bool = True, metadata_only: bool = False,
+              first_paragraph: bool = True, streaming: bool = False,
+              consolidate: bool = False, shard: Optional[str] = None,
+              timeout: Optional[float] = None, max_memory: Optional[int] = None,
+              max_tasks_per_worker: Optional[int] = None,
+              dedup: Optional[str] = None) -> Dict[str, Any]:
+    """
+    执行一次批量处理（命令行和常驻服务共用）
+
+    文档边查找边处理，不等待整个目录扫描完成。
+
+    Args:
+        input_dir: 输入目录，或 zip/tar 归档文件（不解压到磁盘）
+        output_format: 输出格式 xlsx/csv/jsonl/parquet，默认按输出文件扩展名判断
+        recursive: 是否查找子目录中的文档
+        ordered: True 时按路径顺序输出（每次运行一致）；False 时按处理完成的顺序输出
+        metadata_only: 只读取文档属性生成文档信息，不解析正文，不生成表格摘要
+        first_paragraph: metadata_only 时是否读取首段（读到第一个非空段落即停止）
+        streaming: 增量解析文档，峰值内存与文档大小无关（忽略 engine）
+        consolidate: 把表头相同的表格数据合并到同一个工作表（每种表结构一个），需要合并模式
+        shard: "I/N" 时只处理第 I 个分片（共 N 个，按相对路径的哈希划分）的文档，结果写入
+            部分结果文件 <输出文件名>.part-I-of-N.<扩展名>，之后用 run_merge() 合并
+        timeout: 单个文档的处理时间上限（秒），超时的文档终止其工作进程并记为 '错误': 'timeout'
+        max_memory: 每个工作进程的内存上限（MB），超限的文档记为 '错误': 'memory'
+        max_tasks_per_worker: 每个工作进程处理的文档数上限，之后换用新进程（设置了 timeout 或
+            max_memory 时默认为 DEFAULT_MAX_TASKS）
+        dedup: 'file' 按文件内容、'content' 按规范化的主文档部件识别重复文档，每份内容只分析一次，
+            结果复用到所有重复的路径
+
+    Returns:
+        处理结果统计：documents（文档数）、tables（表格数）、failed（失败文档数）、
+        output（输出位置）、files（生成的文件）、schemas（合并表格的表结构数，未合并时为 None）、
+        duplicates（重复文档数，未去重或非合并模式时为 None）
+
+    Raises:
+        FileNotFoundError: 输入目录不存在或未找到匹配的文档
+        ValueError: 输入的归档文件无效、分片参数格式错误、预算参数不是正数、去重方式未知，
+            或 consolidate、dedup 与 metadata_only，consolidate 与非合并模式同时使用
+        RuntimeError: 输出文件创建失败
+    """
+    output_format = resolve_format(output, output_format)
+    output = format_output_path(output, output_format)
+    if consolidate and metadata_only:
+        raise ValueError("--consolidate 需要解析表格，不能与 --metadata-only 同时使用")
+    if consolidate and not merge:
+        raise ValueError("--consolidate 只能在合并模式下使用")
+    if dedup and dedup not in DEDUP_MODES:
+        raise ValueError(f"未知的去重方式: {dedup}（可选: {', '.join(DEDUP_MODES)}）")
+    if dedup and metadata_only:
+        raise ValueError("--dedup 用于避免重复解析正文，不能与 --metadata-only 同时使用")
+    for name, value in (('--timeout', timeout), ('--max-memory', max_memory),
+                        ('--max-tasks-per-worker', max_tasks_per_worker)):
+        if value is not None and value <= 0:
+            raise ValueError(f"{name} 必须是正数: {value}")
+    if (timeout or max_memory) and max_tasks_per_worker is None:
+        max_tasks_per_worker = DEFAULT_MAX_TASKS
+    if shard:
+        shard_index, shard_count = parse_shard(shard)
+        output = shard_output_path(output, shard_index, shard_count)
 
     # 查找文档文件
-    if args.verbose:
-        print(f"在目录中查找文件: {args.input_dir}")
-        print(f"使用模式: {args.pattern}")
-
-    docx_files = find_docx_files(args.input_dir, args.pattern)
-
-    if not docx_files:
-        print(f"错误: 未找到匹配的.docx文件: {args.input_dir}/{args.pattern}")
-        sys.exit(1)
-
-    if args.verbose:
-        print(f"找到 {len(docx_files)} 个文档文件")
+    if verbose:
+        print(f"在目录中查找文件: {input_dir}")
+        print(f"使用模式: {pattern}{' (包含子目录)' if recursive else ''}")
+
+    docx_files = find_docx_files(input_dir, pattern, recursive, ordered)
+    first = next(docx_files, None)
+    if first is None:
+        raise FileNotFoundError(f"未找到匹配的.docx文件: {input_dir}/{pattern}")
+    docx_files = chain([first], docx_files)
+    if shard:
+        # 分片中没有文档时仍然写出空的部分结果，合并时才能确认所有分片都已完成
+        docx_files = select_shard(docx_files, input_dir, shard_index, shard_count)
+        print(f"分片 {shard_index}/{shard_count}: 部分结果写入 {output}")
+
+    progress = None
+    if verbose:
+        # 边查找边处理，总数在查找结束时才确定
+        progress = Progress()
+        docx_files = progress.discover(docx_files)
+
+    cache = None
+    if use_cache and is_archive(input_dir) and not Path(input_dir).is_dir():
+        # 缓存以磁盘上的文件路径和修改时间为键，不适用于归档中的文档
+        print("提示: 输入为归档文件，不使用结果缓存")
+    elif use_cache and consolidate:
+        # 缓存只保存文档信息和表格摘要，没有表格数据
+        print("提示: 合并表格数据时不使用结果缓存")
+    elif use_cache:
+        output_path = Path(output)
+        cache_file = cache_file or str(output_path.with_name(f"{output_path.stem}.cache.sqlite"))
+        if verbose:
+            print(f"使用结果缓存: {cache_file}")
+        # 只读取属性的结果与完整分析不同，使用单独的缓存键
+        cache = ResultCache(cache_file, _cache_key(engine, metadata_only, first_paragraph, streaming))
+
+    # 合并模式下每处理完一个文档即写入汇总文件，不在内存中累积结果
+    writer = None
+    if merge:
+        if verbose:
+            print(f"创建合并文件: {output}")
+        writer = SummaryExcelWriter(output, output_format=output_format,
+                                    include_tables=not metadata_only, consolidate=consolidate,
+                                    dedup=bool(dedup))
 
     # 处理每个文档
     documents_info = []
-    all_tables_summary = []
-
-    for doc_path in docx_files:
-        if args.verbose:
+    results = process_documents(docx_files, jobs, engine, cache, ordered, metadata_only,
+                                first_paragraph, streaming, consolidate, timeout, max_memory,
+                                max_tasks_per_worker, dedup)
+    if progress is not None:
+        results = progress.track(results)
+
+    for doc_path, doc_info, tables_info, *batches in results:
+        if verbose:
             print(f"处理: {doc_path.name}")
 
-        # 提取文档信息
-        doc_info = extract_document_info(doc_path)
-        documents_info.append(doc_info)
-
-        # 提取表格摘要
-        tables_info = extract_tables_summary(doc_path)
-        all_tables_summary.extend(tables_info)
+        if writer:
+            with stage('write'):
+                writer.add_document(doc_info, tables_info, *batches)
+        else:
+            documents_info.append(doc_info)
 
-        if args.verbose and '错误' in doc_info:
+        if verbose and '错误' in doc_info:
             print(f"  错误: {doc_info['错误']}")
 
-    # 创建输出
-    if args.merge:
-        # 合并到单个文件
-        if args.verbose:
-            print(f"创建合并文件: {args.output}")
+    if cache:
+        pruned = cache.prune()
+        total = cache.hits + cache.misses
+        print(f"缓存命中: {cache.hits}/{total} ({cache.hit_rate:.1%})，清理已删除文档记录 {pruned} 条")
+        cache.close()
 
-        success = create_summary_excel(documents_info, all_tables_summary, args.output)
-
-        if success:
-            print(f"批量处理完成! 结果保存到: {args.output}")
-            print(f"处理了 {len(docx_files)} 个文档，找到 {len(all_tables_summary)} 个表格")
+    # 创建输出
+    if writer:
+        if not writer.close():
+            raise RuntimeError("创建合并文件失败!")
+        if shard:
+            write_shard_metadata(output, output_format, shard_index, shard_count, writer.column_types())
+
+        print(f"批量处理完成! 结果保存到: {', '.join(writer.output_files)}")
+        if metadata_only:
+            print(f"处理了 {writer.document_count} 个文档 (只读取文档属性)")
+        else:
+            print(f"处理了 {writer.document_count} 个文档，找到 {writer.table_count} 个表格")
+        if consolidate:
+            print(f"合并表格: {len(writer.schemas)} 种表结构，共 {writer.consolidated_rows} 行")
+        if dedup:
+            print(f"重复文档: {writer.duplicate_count} 个，复用了内容相同文档的结果")
+        return {'documents': writer.document_count,
+                'tables': None if metadata_only else writer.table_count,
+                'failed': writer.failed_count, 'output': output, 'files': writer.output_files,
+                'schemas': len(writer.schemas) if consolidate else None,
+                'duplicates': writer.duplicate_count if dedup else None}
+
+    # 创建单独文件
+    output_dir = Path(output).parent / "individual_excels"
+    if verbose:
+        print(f"创建单独文件到目录: {output_dir}")
+
+    if not create_individual_excels(documents_info, str(output_dir), output_format):
+        raise RuntimeError("创建单独文件失败!")
+
+    succeeded = len([d for d in documents_info if '错误' not in d])
+    print(f"批量处理完成! 结果保存到目录: {output_dir}")
+    print(f"为 {succeeded} 个文档创建了单独文件")
+    return {'documents': len(documents_info), 'tables': None,
+            'failed': len(documents_info) - succeeded, 'output': str(output_dir),
+            'files': [str(output_dir)], 'schemas': None, 'duplicates': None}
+
+
+def write_shard_metadata(partial: str, output_format: str, index: int, count: int,
+                         column_types: Dict[str, Dict[str, str]]):
+    """写出部分结果的元数据：格式、分片编号和读回时需要还原的列类型（见 shard_metadata_path）"""
+    metadata = {'format': output_format, 'shard': [index, count], 'column_types': column_types}
+    with open(shard_metadata_path(partial), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+
+def read_shard_metadata(partial: str) -> Dict[str, Any]:
+    """读取部分结果的元数据，没有元数据文件（旧版本写出的部分结果）时返回空字典"""
+    try:
+        with open(shard_metadata_path(partial), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def find_shard_outputs(output: str, output_format: Optional[str] = None) -> List[str]:
+    """
+    查找 output 对应的全部分片部分结果（<输出文件名>.part-I-of-N.<扩展名>）
+
+    部分结果按元数据文件 (<输出文件名>.part-I-of-N.meta.json) 查找，其中记录了部分结果的格式，
+    因此各分片的格式可以与输出格式不同；没有元数据的部分结果只按输出格式查找。
+
+    Raises:
+        FileNotFoundError: 没有部分结果，或 N 个分片不全
+        ValueError: 存在分片总数不同的部分结果
+    """
+    output_format = resolve_format(output, output_format)
+    output = format_output_path(output, output_format)
+    path = Path(output)
+    # 没有元数据时，非 xlsx 格式的部分结果以“文档信息”文件为准
+    marker = path.suffix if output_format == 'xlsx' else f"_文档信息.{output_format}"
+    matcher = re.compile(rf"{re.escape(path.stem)}\.part-(\d+)-of-(\d+)"
+                         rf"(?:(\.meta\.json)|{re.escape(marker)})$")
+
+    shards: Dict[int, set] = {}
+    # 分片编号 -> 部分结果文件，默认为输出格式
+    partials: Dict[Tuple[int, int], str] = {}
+    directory = path.parent
+    for entry in (os.scandir(directory) if directory.is_dir() else ()):
+        match = matcher.match(entry.name)
+        if match:
+            index, count = int(match.group(1)), int(match.group(2))
+            shards.setdefault(count, set()).add(index)
+            partial = shard_output_path(output, index, count)
+            shard_format = read_shard_metadata(partial).get('format') if match.group(3) else None
+            if shard_format:
+                partials[index, count] = format_output_path(partial, shard_format)
+            else:
+                partials.setdefault((index, count), partial)
+
+    if not shards:
+        raise FileNotFoundError(f"未找到分片部分结果: {directory / f'{path.stem}.part-*-of-*{marker}'}")
+    if len(shards) > 1:
+        raise ValueError(f"部分结果的分片总数不一致: {sorted(shards)}")
+    count, found = next(iter(shards.items()))
+    missing = [index for index in range(1, count + 1) if index not in found]
+    if missing:
+        raise FileNotFoundError(f"缺少分片的部分结果: {', '.join(f'{i}/{count}' for i in missing)}")
+    return [partials[index, count] for index in range(1, count + 1)]
+
+
+class PartialResult:
+    """
+    一个分片的部分结果：xlsx 工作簿，或非 xlsx 格式下 <文件名>_<工作表>.<格式> 的一组文件
+
+    xlsx 工作簿只打开一次（只读模式），依次读取其中的各个工作表。
+    csv 的值读回为字符串，按元数据中记录的列类型还原数值列。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.output_format = resolve_format(path)
+        self.column_types: Dict[str, Dict[str, str]] = read_shard_metadata(path).get('column_types', {})
+        self._wb = None
+        if self.output_format == 'xlsx':
+            from openpyxl import load_workbook
+
+            if not Path(path).is_file():
+                raise FileNotFoundError(f"部分结果不存在: {path}")
+            self._wb = load_workbook(path, read_only=True)
+            self.sheet_names = list(self._wb.sheetnames)
         else:
-            print("创建合并文件失败!")
-            sys.exit(1)
+            base = Path(path)
+            prefix = f"{base.stem}_"
+            suffix = f".{self.output_format}"
+            self.sheet_names = [entry.name[len(prefix):-len(suffix)]
+                                for entry in os.scandir(base.parent)
+                                if entry.name.startswith(prefix) and entry.name.endswith(suffix)]
+        if "文档信息" not in self.sheet_names:
+            raise FileNotFoundError(f"部分结果中没有文档信息: {path}")
+
+    def rows(self, sheet_name: str) -> Tuple[List[str], Iterator[list]]:
+        """工作表的 (列名, 逐行生成的值列表)"""
+        if self._wb is None:
+            fields, rows = read_rows(sheet_output_path(self.path, sheet_name, self.output_format),
+                                     self.output_format)
+            types = self.column_types.get(sheet_name)
+            if types:
+                rows = restore_types(rows, [types.get(field) for field in fields])
+            return fields, rows
+        rows = self._wb[sheet_name].iter_rows(values_only=True)
+        header = next(rows, None) or ()
+        # 写出时的空字符串读回为 None，还原为空字符串
+        return ([str(name) for name in header if name is not None],
+                (['' if value is None else value for value in values] for values in rows))
+
+    def close(self):
+        if self._wb is not None:
+            self._wb.close()
+
+
+def _records(fields: List[str], rows: Iterable[list]) -> Iterator[Dict[str, Any]]:
+    """值列表转为记录，空值不计入（与分析结果中不存在的字段一致，如“错误”）"""
+    for values in rows:
+        yield {field: value for field, value in zip(fields, values)
+               if value is not None and value != ''}
+
+
+def run_merge(output: str = 'batch_output.xlsx', partials: Optional[List[str]] = None,
+              output_format: Optional[str] = None, verbose: bool = False) -> Dict[str, Any]:
+    """
+    合并各分片的部分结果（命令行 merge 子命令和常驻服务共用）
+
+    按分片顺序拼接“文档信息”“表格摘要”和合并表格工作表（--consolidate），
+    根据合并后的行重新计算“统计信息”和“表结构”。部分结果的格式由其扩展名判断，
+    可以与输出格式不同。
+
+    Args:
+        output: 最终输出文件
+        partials: 部分结果文件，默认查找 output 对应的 <输出文件名>.part-I-of-N 文件并检查是否齐全
+        output_format: 输出格式，默认按输出文件扩展名判断
+
+    Returns:
+        同 run_batch()：documents、tables、failed、output、files、schemas、duplicates
+
+    Raises:
+        FileNotFoundError: 部分结果不存在或分片不全
+        ValueError: 部分结果的分片总数不一致
+        RuntimeError: 输出文件创建失败
+    """
+    if not partials:
+        partials = find_shard_outputs(output, output_format)
+    output_format = resolve_format(output, output_format)
+    output = format_output_path(output, output_format)
+
+    # 先检查全部部分结果，再开始写输出
+    names = []
+    dedup = False
+    for partial in partials:
+        result = PartialResult(partial)
+        names.append(result.sheet_names)
+        dedup = dedup or DUPLICATE_FIELD in result.rows("文档信息")[0]
+        result.close()
+    include_tables = any("表格摘要" in sheets for sheets in names)
+    consolidate = any(SCHEMA_INDEX_SHEET in sheets for sheets in names)
+
+    writer = SummaryExcelWriter(output, output_format=output_format,
+                                include_tables=include_tables, consolidate=consolidate, dedup=dedup)
+    for partial in partials:
+        if verbose:
+            print(f"合并: {partial}")
+        result = PartialResult(partial)
+        try:
+            with stage('merge'):
+                fields, rows = result.rows("文档信息")
+                for doc_info in _records(fields, rows):
+                    writer.add_document_info(doc_info)
+
+                if "表格摘要" in result.sheet_names:
+                    fields, rows = result.rows("表格摘要")
+                    writer.add_tables_summary(list(_records(fields, rows)))
+
+                if SCHEMA_INDEX_SHEET in result.sheet_names:
+                    _, index_rows = result.rows(SCHEMA_INDEX_SHEET)
+                    for sheet_name, signature, _, table_count, _ in list(index_rows):
+                        fields, rows = result.rows(sheet_name)
+                        writer.add_schema_rows(str(signature),
+                                               fields[len(CONSOLIDATED_SOURCE_FIELDS):],
+                                               int(table_count), rows)
+        finally:
+            result.close()
+
+    if not writer.close():
+        raise RuntimeError("创建合并文件失败!")
+
+    print(f"合并完成! {len(partials)} 个部分结果保存到: {', '.join(writer.output_files)}")
+    if include_tables:
+        print(f"共 {writer.document_count} 个文档，{writer.table_count} 个表格")
     else:
-        # 创建单独文件
-        output_dir = Path(args.output).parent / "individual_excels"
-        if args.verbose:
-            print(f"创建单独文件到目录: {output_dir}")
+        print(f"共 {writer.document_count} 个文档")
+    return {'documents': writer.document_count,
+            'tables': writer.table_count if include_tables else None,
+            'failed': writer.failed_count, 'output': output, 'files': writer.output_files,
+            'schemas': len(writer.schemas) if consolidate else None,
+            'duplicates': writer.duplicate_count if dedup else None}
+
+
+def merge_main(argv: List[str]):
+    """merge 子命令：batch_process.py merge --output 汇总.xlsx [部分结果 ...]"""
+    parser = argparse.ArgumentParser(prog='batch_process.py merge',
+                                     description='合并 --shard 分片运行的部分结果，重新计算统计信息')
+    parser.add_argument('partials', nargs='*',
+                       help='部分结果文件 (默认: 查找输出文件对应的 <输出文件名>.part-I-of-N 文件)')
+    parser.add_argument('--output', '-o', default='batch_output.xlsx', help='合并后的输出文件路径')
+    parser.add_argument('--format', '-F', dest='output_format', choices=OUTPUT_FORMATS,
+                       help='输出格式 (默认: 按输出文件扩展名判断，否则为 xlsx)')
+    parser.add_argument('--verbose', '-v', action='store_true', help='显示合并的每个部分结果')
+
+    args = parser.parse_args(argv)
+    try:
+        run_merge(args.output, args.partials, args.output_format, args.verbose)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"错误: {e}")
+        sys.exit(1)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    sys.exit(0)
 
-        success = create_individual_excels(documents_info, str(output_dir))
 
-        if success:
-            print(f"批量处理完成! 结果保存到目录: {output_dir}")
-            print(f"为 {len([d for d in documents_info if '错误' not in d])} 个文档创建了单独文件")
-        else:
-            print("创建单独文件失败!")
-            sys.exit(1)
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == 'merge':
+        merge_main(sys.argv[2:])
+
+    parser = argparse.ArgumentParser(description='批量处理Word文档并提取信息到Excel',
+                                     epilog='合并 --shard 分片运行的结果: batch_process.py merge --output <输出文件>')
+    parser.add_argument('--input-dir', '-i', required=True,
+                       help='输入目录路径，或 .zip/.tar/.tar.gz 归档文件 (直接读取，不解压)')
+    parser.add_argument('--output', '-o', default='batch_output.xlsx', help='输出Excel文件路径')
+    parser.add_argument('--format', '-F', dest='output_format', choices=OUTPUT_FORMATS,
+                       help='输出格式: xlsx, csv, jsonl, parquet (默认: 按输出文件扩展名判断，否则为 xlsx)；'
+                            '非 xlsx 格式下每个工作表写成一个文件')
+    parser.add_argument('--merge', '-m', action='store_true', default=True,
+                       help='合并所有文档数据到单个文件 (默认: True)')
+    parser.add_argument('--no-merge', action='store_false', dest='merge',
+                       help='为每个文档创建单独文件')
+    parser.add_argument('--pattern', '-p', default='*.docx',
+                       help='文件名匹配模式，不区分大小写 (默认: *.docx)')
+    parser.add_argument('--recursive', '-r', action='store_true',
+                       help='同时查找子目录中的文档')
+    parser.add_argument('--unordered', action='store_false', dest='ordered',
+                       help='按处理完成的顺序输出，不按路径排序 (默认按路径顺序，每次运行一致)')
+    parser.add_argument('--metadata-only', action='store_true',
+                       help='只读取 docProps 中的文档属性 (标题、作者、日期、页数、段落数)，不解析正文和表格')
+    parser.add_argument('--no-first-paragraph', action='store_false', dest='first_paragraph',
+                       help='--metadata-only 时不读取首段')
+    parser.add_argument('--streaming', action='store_true',
+                       help='流式解析超大文档：增量读取XML，处理完的段落和表格行立即释放 (忽略 --engine)')
+    parser.add_argument('--consolidate', action='store_true',
+                       help='按表头合并各文档的表格数据：表头相同的表格行写入同一个工作表，并附来源文档和表格索引')
+    parser.add_argument('--dedup', nargs='?', const='file', choices=DEDUP_MODES,
+                       help='内容相同的文档只解析一次，结果复用到所有副本：file 按文件内容 (默认)，'
+                            'content 按规范化的 word/document.xml (忽略 docProps 和编辑会话标记)')
+    parser.add_argument('--shard', metavar='I/N',
+                       help='只处理第 I 个分片 (共 N 个，按相对路径哈希划分)，结果写入 <输出文件名>.part-I-of-N；'
+                            '全部完成后用 merge 子命令合并')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                       help='并行处理的进程数 (默认: 全部CPU核心，1 表示串行)')
+    parser.add_argument('--timeout', type=float, default=None,
+                       help='单个文档的处理时间上限 (秒)，超时的文档终止其工作进程并记为 错误: timeout')
+    parser.add_argument('--max-memory', type=int, default=None, metavar='MB',
+                       help='每个工作进程的内存上限 (MB，仅 Unix)，超限的文档记为 错误: memory')
+    parser.add_argument('--max-tasks-per-worker', type=int, default=None, metavar='N',
+                       help='每个工作进程处理 N 个文档后换用新进程 (设置 --timeout/--max-memory 时默认 100)')
+    parser.add_argument('--engine', '-e', choices=ENGINES, default=DEFAULT_ENGINE,
+                       help=f'解析引擎: fast 直接读取XML, docx 使用python-docx (默认: {DEFAULT_ENGINE})')
+    parser.add_argument('--cache', action='store_true', default=False,
+                       help='启用结果缓存，未变化的文档直接使用上次的结果')
+    parser.add_argument('--no-cache', action='store_false', dest='cache',
+                       help='不使用结果缓存 (默认)')
+    parser.add_argument('--cache-file',
+                       help='缓存数据库路径 (默认: 输出文件旁的 <输出文件名>.cache.sqlite)')
+    parser.add_argument('--verbose', '-v', action='store_true', help='显示详细信息和实时进度')
+    metrics.add_arguments(parser)
+
+    args = parser.parse_args()
+
+    collector = metrics.from_args(args)
+    try:
+        with metrics.activate(collector):
+            run_batch(args.input_dir, args.output, args.merge, args.pattern, args.jobs,
+                      args.engine, args.cache, args.cache_file, args.verbose, args.output_format,
+                      args.recursive, args.ordered, args.metadata_only, args.first_paragraph,
+                      args.streaming, args.consolidate, args.shard, args.timeout, args.max_memory,
+                      args.max_tasks_per_worker, args.dedup)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"错误: {e}")
+        sys.exit(1)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        metrics.report(collector, args)
 
     sys.exit(0)
 
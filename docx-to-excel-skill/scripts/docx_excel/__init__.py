@@ -0,0 +1,11 @@
+"""
+docx-to-excel 技能脚本共用的文档读取组件
+"""
+
+from .document_cache import DocumentCache, document_cache, open_document
+from .engine import (DEFAULT_ENGINE, ENGINES, DocumentMetadata, FastDocument, GridCell,
+                     StreamingDocument, TableModel, load_document, read_metadata, table_model)
+
+__all__ = ['DEFAULT_ENGINE', 'ENGINES', 'DocumentCache', 'DocumentMetadata', 'FastDocument', 'GridCell',
+           'StreamingDocument', 'TableModel', 'document_cache', 'load_document', 'open_document',
+           'read_metadata', 'table_model']
@@ -0,0 +1,140 @@
+"""
+归档文件（zip、tar、tar.gz 等）中的文档
+
+归档中的文档不解压到磁盘：按归档内的顺序逐个读出成员内容，包装成 ArchiveMember，
+由 load_document() 直接从内存解析。ArchiveMember 提供脚本用到的 Path 属性
+（name、stem），字符串形式为 "<归档路径>!/<成员路径>"，写入结果中的文件路径。
+
+记录的大小超过上限（疑似zip炸弹）的成员不读出内容，ArchiveMember 带有错误信息，打开时抛出
+ValueError，由正常的解析流程记为该文档的错误，归档中的其他文档照常处理。
+"""
+
+import io
+import tarfile
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Iterator, Optional
+
+from .discovery import LOCK_FILE_PREFIX, name_matcher
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+
+class ArchiveMember:
+    """归档中的一个文档：成员路径和内容"""
+
+    __slots__ = ('archive', 'member', 'data', 'size', 'error')
+
+    def __init__(self, archive: str, member: str, data: bytes,
+                 size: Optional[int] = None, error: Optional[str] = None):
+        self.archive = archive
+        self.member = member
+        self.data = data
+        # 未读出内容的成员为归档中记录的大小
+        self.size = len(data) if size is None else size
+        self.error = error
+
+    @property
+    def name(self) -> str:
+        return PurePosixPath(self.member).name
+
+    @property
+    def stem(self) -> str:
+        return PurePosixPath(self.member).stem
+
+    def open(self) -> io.BytesIO:
+        """
+        以二进制文件对象读取成员内容
+
+        Raises:
+            ValueError: 成员因大小超过上限未读出内容
+        """
+        if self.error:
+            raise ValueError(self.error)
+        return io.BytesIO(self.data)
+
+    def __str__(self) -> str:
+        return f"{self.archive}!/{self.member}"
+
+    def __repr__(self) -> str:
+        return f"ArchiveMember({str(self)!r})"
+
+
+def is_archive(path: str) -> bool:
+    """按扩展名判断是否为支持的归档文件"""
+    return str(path).lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def document_size(source) -> int:
+    """文档大小（字节），source 为路径或 ArchiveMember"""
+    if isinstance(source, ArchiveMember):
+        return source.size
+    return Path(source).stat().st_size
+
+
+def iter_archive_documents(archive_path: str, pattern: str = '*.docx') -> Iterator[ArchiveMember]:
+    """
+    按归档内的顺序逐个读出文件名匹配 pattern 的文档（包括子目录中的文档）
+
+    文件名匹配不区分大小写，跳过 Word 临时锁文件 (~$*) 和 macOS 生成的 __MACOSX 目录。
+    同一时刻只有一个成员的内容由本函数持有；tar.gz 等压缩 tar 以流方式顺序读取。
+    读出成员之前按归档目录（zip）或成员头（tar）中记录的大小检查，上限与 check_package 相同，
+    超过上限的成员不读出内容，返回带有错误信息的 ArchiveMember（见模块说明）。
+
+    Raises:
+        FileNotFoundError: 归档文件不存在
+        ValueError: 文件不是有效的归档
+    """
+    path = Path(archive_path)
+    if not path.is_file():
+        raise FileNotFoundError(f"归档文件不存在: {archive_path}")
+
+    matches = name_matcher(pattern)
+
+    def wanted(member: str) -> bool:
+        parts = PurePosixPath(member).parts
+        name = parts[-1] if parts else ''
+        return (bool(name) and not name.startswith(LOCK_FILE_PREFIX)
+                and '__MACOSX' not in parts and bool(matches(name)))
+
+    if path.suffix.lower() == '.zip':
+        try:
+            zf = zipfile.ZipFile(path)
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"无效的zip归档 {archive_path}: {e}") from None
+        with zf:
+            for info in zf.infolist():
+                if not info.is_dir() and wanted(info.filename):
+                    member = str(PurePosixPath(info.filename))
+                    error = _size_error(member, info.file_size, info.compress_size)
+                    data = b'' if error else zf.read(info)
+                    yield ArchiveMember(str(path), member, data, info.file_size, error)
+        return
+
+    try:
+        # 'r|*' 为流模式：按顺序读取，不需要在压缩流中来回定位
+        tf = tarfile.open(path, 'r|*')
+    except tarfile.TarError as e:
+        raise ValueError(f"无效的tar归档 {archive_path}: {e}") from None
+    with tf:
+        for info in tf:
+            if info.isfile() and wanted(info.name):
+                # 成员名可能带有 ./ 前缀，统一为规范形式
+                member = str(PurePosixPath(info.name))
+                # 压缩 tar 整体压缩，没有单个成员的压缩大小，只检查解压后的大小；
+                # 流模式下未读出的成员内容在读取下一个成员时跳过
+                error = _size_error(member, info.size)
+                data = b'' if error else tf.extractfile(info).read()
+                yield ArchiveMember(str(path), member, data, info.size, error)
+
+
+def _size_error(member: str, size: int, compress_size: Optional[int] = None) -> Optional[str]:
+    """按记录的大小检查归档成员（见 engine.check_compressed_size），超过上限时返回错误信息"""
+    # engine 导入本模块中的 ArchiveMember，在函数内导入以避免循环导入
+    from .engine import check_compressed_size
+
+    try:
+        check_compressed_size(member, size, compress_size)
+    except ValueError as e:
+        return str(e)
+    return None
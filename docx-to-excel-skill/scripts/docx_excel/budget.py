@@ -0,0 +1,338 @@
+"""
+单个文档的时间和内存预算
+
+BudgetPool 是按文档预算执行任务的进程池，submit()/shutdown() 与 ProcessPoolExecutor 对应，
+返回标准的 Future。每个工作进程同一时刻只处理一个文档，因此超出预算时可以只终止这一个进程：
+- 时间：文档处理超过 timeout 秒时终止其工作进程，Future 以 BudgetExceeded('timeout') 结束
+- 内存：工作进程用 RLIMIT_AS 限制地址空间（仅 Unix），分配失败抛出的 MemoryError 或
+  进程因内存耗尽被杀死时，Future 以 BudgetExceeded('memory') 结束。lxml 等 C 扩展分配失败时
+  可能报告为其他错误，因此失败时地址空间峰值已接近上限的也按内存超限处理（见 memory_exhausted）
+- 回收：每个进程处理 max_tasks 个文档后、或超出预算后退出，由新进程替代，
+  避免内存碎片和泄漏在长时间运行中累积
+
+被终止或退出的进程立即由新进程替代，其余文档不受影响，整批处理保持满并发。
+调度线程本身出错时，全部未完成的 Future 以 RuntimeError 结束，进程池随之关闭，不会一直等待。
+"""
+
+import multiprocessing
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+from typing import Any, Callable, Deque, List, Optional, Tuple
+
+TIMEOUT_ERROR = 'timeout'
+MEMORY_ERROR = 'memory'
+
+# 启用预算时每个工作进程默认处理的文档数
+DEFAULT_MAX_TASKS = 100
+
+# 地址空间峰值达到上限的这一比例即视为内存耗尽
+_EXHAUSTED_RATIO = 0.9
+
+# limit_memory() 设置的上限（字节）
+_memory_limit: Optional[int] = None
+
+# 超出内存限制时进程可能被这些信号终止（内核 OOM killer 为 SIGKILL，C 扩展分配失败时可能 abort）
+_MEMORY_SIGNALS = tuple(-getattr(signal, name) for name in ('SIGKILL', 'SIGSEGV', 'SIGABRT', 'SIGBUS')
+                        if hasattr(signal, name))
+
+
+class BudgetExceeded(Exception):
+    """文档超出时间或内存预算，str() 为 'timeout' 或 'memory'"""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def limit_memory(memory_mb: int) -> bool:
+    """把当前进程的地址空间限制为 memory_mb MB；平台不支持时返回 False"""
+    global _memory_limit
+    try:
+        import resource
+    except ImportError:
+        return False
+    limit = memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    _memory_limit = limit
+    return True
+
+
+def _peak_address_space() -> Optional[int]:
+    """当前进程的地址空间峰值（字节），读取 /proc/self/status 的 VmPeak，不支持的平台返回 None"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmPeak:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def memory_exhausted() -> bool:
+    """当前进程设置了内存上限 (limit_memory) 且地址空间峰值已接近上限"""
+    if _memory_limit is None:
+        return False
+    peak = _peak_address_space()
+    return peak is not None and peak >= _memory_limit * _EXHAUSTED_RATIO
+
+
+def _worker_main(conn, memory_mb: Optional[int], max_tasks: Optional[int],
+                 initializer: Optional[Callable[[], Any]]):
+    """
+    工作进程：逐个接收 (函数, 参数)，返回 (是否成功, 结果或异常, 是否退出)
+
+    达到任务数上限、超出预算或地址空间峰值接近上限时处理完当前任务即退出，
+    由“是否退出”通知主进程换用新进程（新进程的峰值从零开始计算）。
+    """
+    if memory_mb:
+        limit_memory(memory_mb)
+    if initializer is not None:
+        initializer()
+    done = 0
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        fn, args = task
+        ok = False
+        try:
+            value = fn(*args)
+            ok = True
+        except MemoryError:
+            value = BudgetExceeded(MEMORY_ERROR)
+        except BaseException as e:
+            value = BudgetExceeded(MEMORY_ERROR) if memory_exhausted() else e
+        done += 1
+        retire = (isinstance(value, BudgetExceeded) or memory_exhausted()
+                  or (max_tasks is not None and done >= max_tasks))
+        try:
+            conn.send((ok, value, retire))
+        except Exception as e:
+            # 结果或异常无法序列化
+            conn.send((False, RuntimeError(f"无法返回处理结果: {e}"), retire))
+        if retire:
+            return
+
+
+class _Worker:
+    """一个工作进程及其正在处理的任务"""
+
+    __slots__ = ('process', 'conn', 'task', 'deadline')
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.task: Optional[Tuple[Future, Callable, tuple]] = None
+        self.deadline: Optional[float] = None
+
+
+class BudgetPool:
+    """
+    按文档预算执行任务的进程池（见模块说明）
+
+    Args:
+        max_workers: 工作进程数
+        timeout: 单个任务的墙钟时间上限（秒），None 表示不限
+        memory_mb: 每个工作进程的地址空间上限（MB），None 表示不限
+        max_tasks: 每个工作进程处理的任务数上限，之后由新进程替代；None 表示不回收
+        initializer: 每个工作进程启动时调用的函数（模块级函数），同 ProcessPoolExecutor
+    """
+
+    def __init__(self, max_workers: int, timeout: Optional[float] = None,
+                 memory_mb: Optional[int] = None, max_tasks: Optional[int] = None,
+                 initializer: Optional[Callable[[], Any]] = None):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.max_tasks = max_tasks
+        self.initializer = initializer
+        # 调度线程运行时再创建工作进程，fork 会复制主线程持有的锁，改用 forkserver/spawn
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context(
+            'forkserver' if 'forkserver' in methods else 'spawn')
+        self._queue: Deque[Tuple[Future, Callable, tuple]] = deque()
+        self._lock = threading.Lock()
+        self._wakeup_r, self._wakeup_w = multiprocessing.Pipe(duplex=False)
+        self._workers: List[_Worker] = []
+        self._shutdown = False
+        self._thread = threading.Thread(target=self._run, name='BudgetPool', daemon=True)
+        self._thread.start()
+
+    def submit(self, fn: Callable, *args: Any) -> Future:
+        """提交一个任务，fn 和参数必须可以序列化（模块级函数）"""
+        future: Future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("进程池已关闭")
+            self._queue.append((future, fn, args))
+        self._wakeup_w.send(None)
+        return future
+
+    def shutdown(self, wait: bool = True):
+        """停止接受任务；已提交的任务执行完后退出全部工作进程"""
+        with self._lock:
+            self._shutdown = True
+        if self._thread.is_alive():
+            self._wakeup_w.send(None)
+        if wait:
+            self._thread.join()
+
+    def __enter__(self) -> 'BudgetPool':
+        return self
+
+    def __exit__(self, *exc_info):
+        if exc_info[0] is not None:
+            # 异常退出时取消尚未开始的任务
+            with self._lock:
+                pending, self._queue = list(self._queue), deque()
+            for future, _, _ in pending:
+                future.cancel()
+        self.shutdown(wait=True)
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=_worker_main,
+                                        args=(child_conn, self.memory_mb, self.max_tasks, self.initializer),
+                                        daemon=True)
+        process.start()
+        child_conn.close()
+        worker = _Worker(process, parent_conn)
+        self._workers.append(worker)
+        return worker
+
+    def _retire(self, worker: _Worker, kill: bool = False):
+        if kill and worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join()
+        worker.conn.close()
+        self._workers.remove(worker)
+
+    def _assign(self):
+        """把排队的任务分配给空闲进程，必要时启动新进程"""
+        while True:
+            with self._lock:
+                if not self._queue:
+                    return
+                idle = next((w for w in self._workers if w.task is None), None)
+                if idle is None and len(self._workers) >= self.max_workers:
+                    return
+                future, fn, args = self._queue.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            worker = idle or self._spawn()
+            worker.task = (future, fn, args)
+            worker.deadline = time.monotonic() + self.timeout if self.timeout else None
+            try:
+                worker.conn.send((fn, args))
+            except Exception as e:
+                worker.task = None
+                future.set_exception(e)
+                self._retire(worker, kill=True)
+
+    def _finish(self, worker: _Worker):
+        """读取已完成任务的结果"""
+        future = worker.task[0]
+        worker.task = None
+        worker.deadline = None
+        try:
+            ok, value, retire = worker.conn.recv()
+        except (EOFError, OSError):
+            self._lost(worker, future)
+            return
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+        if retire:
+            self._retire(worker)
+
+    def _lost(self, worker: _Worker, future: Future):
+        """工作进程在处理任务时退出"""
+        self._retire(worker, kill=True)
+        exitcode = worker.process.exitcode
+        if self.memory_mb and exitcode in _MEMORY_SIGNALS:
+            future.set_exception(BudgetExceeded(MEMORY_ERROR))
+        else:
+            future.set_exception(RuntimeError(f"工作进程异常退出 (退出码 {exitcode})"))
+
+    def _run(self):
+        try:
+            self._dispatch()
+        except BaseException as e:
+            self._abort(e)
+            raise
+        self._close_pipes()
+
+    def _abort(self, error: BaseException):
+        """调度线程出错：关闭进程池，终止全部工作进程，未完成的任务以 RuntimeError 结束"""
+        with self._lock:
+            self._shutdown = True
+            pending, self._queue = list(self._queue), deque()
+        futures = [future for future, _, _ in pending]
+        for worker in list(self._workers):
+            if worker.task is not None:
+                futures.append(worker.task[0])
+                worker.task = None
+            try:
+                self._retire(worker, kill=True)
+            except Exception:
+                pass
+        for future in futures:
+            if not future.done():
+                exception = RuntimeError(f"进程池调度线程异常退出: {error!r}")
+                exception.__cause__ = error
+                future.set_exception(exception)
+        self._close_pipes()
+
+    def _close_pipes(self):
+        self._wakeup_r.close()
+        self._wakeup_w.close()
+
+    def _dispatch(self):
+        while True:
+            self._assign()
+            busy = [w for w in self._workers if w.task is not None]
+            with self._lock:
+                if self._shutdown and not self._queue and not busy:
+                    break
+
+            deadlines = [w.deadline for w in busy if w.deadline is not None]
+            delay = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            handles = [self._wakeup_r] + [w.conn for w in busy] + [w.process.sentinel for w in busy]
+            ready = wait(handles, delay)
+
+            if self._wakeup_r in ready:
+                while self._wakeup_r.poll():
+                    self._wakeup_r.recv()
+
+            now = time.monotonic()
+            for worker in busy:
+                if worker.conn in ready or worker.conn.poll():
+                    self._finish(worker)
+                elif worker.process.sentinel in ready or not worker.process.is_alive():
+                    future = worker.task[0]
+                    worker.task = None
+                    self._lost(worker, future)
+                elif worker.deadline is not None and now >= worker.deadline:
+                    future = worker.task[0]
+                    worker.task = None
+                    self._retire(worker, kill=True)
+                    future.set_exception(BudgetExceeded(TIMEOUT_ERROR))
+
+        for worker in list(self._workers):
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            self._retire(worker)
@@ -0,0 +1,192 @@
+"""
+单元格类型推断与转换（配置文件中的 output_settings.format_numbers）
+
+从Word中读出的值都是文本。CellConverter 按列批量识别并转换其中的数字、金额、百分比和日期，
+写入 xlsx 时成为原生的数值或日期单元格，并带有相应的数字格式：
+- 数字和金额：1234、-12.5、1,234,567.89、1,234.50元、¥1,234.50（“元”“¥”保留在数字格式中）
+- 百分比：12.5% 转为 0.125，格式 0.0%
+- 日期：2024年3月5日、2024-03-05、2024/3/5，格式按 date_format（默认 yyyy-mm-dd）
+
+以下值保持文本：以0开头的多位整数（编号、邮编）、整数部分超过15位的数（身份证号等，Excel
+只保留15位有效数字）、带“万元”等其他单位的数、不存在的日期，以及含换行的单元格。
+
+转换按列批量进行：列中重复的值只识别一次；待识别的值以换行连接，由一个正则表达式的 findall()
+一次扫描完毕，数字经 str.translate 一次去除千位分隔符后再批量转换，不对每个单元格单独匹配。
+同一列的数字使用相同的小数位数：指定 number_precision 时四舍五入到该位数，否则取该列中最多的位数。
+"""
+
+import datetime as dt
+import re
+from itertools import compress, repeat, zip_longest
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 数值的整数部分：0，或不以0开头、不超过15位（Excel 的双精度数只保留15位有效数字），可带千位分隔符
+_INTEGER = r'(?:0|[1-9]\d{0,2}(?:,\d{3}){1,4}|[1-9]\d{0,14})'
+
+# 一行对应一个待识别的值：依次尝试数字、百分比、日期（最常见的放在前面），都不匹配时由最后的
+# ^.*$ 匹配整行，因此 findall() 对每个值恰好返回一组，未参与匹配的分组为空字符串
+_CELL_PATTERN = re.compile(rf'''
+    ^(?:
+        ([¥￥])?([-+]?{_INTEGER}(?:\.\d+)?)(元)?          # 货币符号、数字、“元”
+      | ([-+]?{_INTEGER}(?:\.\d+)?)%                     # 百分比
+      | (\d{{4}}(?:年\d{{1,2}}月\d{{1,2}}日               # 日期：年月日
+                |([-/])\d{{1,2}}\6\d{{1,2}}))             # 或以 - / 分隔
+    )$
+    |^.*$''', re.MULTILINE | re.VERBOSE)
+
+# 日期中的年、月、日
+_DIGITS = re.compile(r'\d+')
+
+# 数字文本中的小数部分
+_DECIMALS = re.compile(r'\.(\d+)')
+
+# 转换前从数字文本中去除的字符
+_NUMBER_NOISE = str.maketrans('', '', ',+')
+
+DEFAULT_DATE_FORMAT = 'yyyy-mm-dd'
+
+
+def excel_date_format(date_format: Optional[str]) -> str:
+    """把配置中的日期格式（如 YYYY-MM-DD、YYYY年MM月DD日）转为 Excel 数字格式，非ASCII字符加引号"""
+    if not date_format:
+        return DEFAULT_DATE_FORMAT
+    return ''.join(ch if ch.isascii() else f'"{ch}"' for ch in date_format.lower())
+
+
+def _number_format(decimals: int, grouping: bool) -> str:
+    base = '#,##0' if grouping else '0'
+    return f"{base}.{'0' * decimals}" if decimals else base
+
+
+class CellConverter:
+    """
+    按列把文本值转换为数字、百分比和日期（见模块说明）
+
+    Args:
+        precision: 数字的小数位数（validation_rules.number_precision），None 表示按原值
+        date_format: 日期的显示格式（validation_rules.date_format），默认 yyyy-mm-dd
+    """
+
+    def __init__(self, precision: Optional[int] = None, date_format: Optional[str] = None):
+        if precision is not None and (not isinstance(precision, int) or precision < 0):
+            raise ValueError(f"number_precision 必须是非负整数: {precision}")
+        self.precision = precision
+        self.date_format = excel_date_format(date_format)
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional['CellConverter']:
+        """由配置文件内容创建；output_settings.format_numbers 未开启时返回 None"""
+        if not (config.get('output_settings') or {}).get('format_numbers'):
+            return None
+        rules = config.get('validation_rules') or {}
+        return cls(rules.get('number_precision'), rules.get('date_format'))
+
+    def convert_column(self, values: Sequence[Any]) -> Tuple[List[Any], List[Optional[str]]]:
+        """
+        转换一列值
+
+        Returns:
+            (转换后的值, 各单元格的数字格式)；未转换的值原样返回，其数字格式为 None
+        """
+        texts = [value for value in dict.fromkeys(values)
+                 if isinstance(value, str) and value and '\n' not in value]
+        if not texts:
+            return list(values), [None] * len(values)
+        stripped = list(map(str.strip, texts))
+        found = _CELL_PATTERN.findall('\n'.join(stripped))
+        if len(found) != len(texts):
+            # 去除首尾空白后仍含其他换行符等特殊情况，逐个匹配
+            found = [(_CELL_PATTERN.findall(text) or [('',) * _CELL_PATTERN.groups])[0] for text in stripped]
+
+        # 按分组取出各列后用 compress() 选出各类值，除日期外不再逐个处理
+        num, pct, date = (list(map(itemgetter(group), found)) for group in (1, 3, 4))
+        value_map: Dict[str, Any] = {}
+        format_map: Dict[str, str] = {}
+        if any(num):
+            self._convert_numbers(list(compress(texts, num)), list(compress(num, num)),
+                                  list(map(itemgetter(0, 2), compress(found, num))),
+                                  value_map, format_map)
+        if any(pct):
+            self._convert_percents(list(compress(texts, pct)), list(compress(pct, pct)),
+                                   value_map, format_map)
+        if any(date):
+            self._convert_dates(list(compress(texts, date)), list(compress(date, date)),
+                                value_map, format_map)
+
+        # 非文本值和未转换的文本原样保留
+        return list(map(value_map.get, values, values)), list(map(format_map.get, values))
+
+    def convert_rows(self, rows: List[list], header_rows: int = 0
+                     ) -> Tuple[List[list], List[List[Optional[str]]]]:
+        """
+        按列转换一个表格的行，前 header_rows 行（表头）保持文本
+
+        Returns:
+            (转换后的行, 各单元格的数字格式)，每行的长度与输入相同
+        """
+        body = rows[header_rows:]
+        lengths = [len(row) for row in body]
+        if not any(lengths):
+            return rows, [[None] * len(row) for row in rows]
+        columns = [self.convert_column(column) for column in zip_longest(*body, fillvalue='')]
+        values = [list(row[:n]) for row, n in zip(zip(*(c[0] for c in columns)), lengths)]
+        formats = [list(row[:n]) for row, n in zip(zip(*(c[1] for c in columns)), lengths)]
+        return ([list(row) for row in rows[:header_rows]] + values,
+                [[None] * len(row) for row in rows[:header_rows]] + formats)
+
+    def _decimals(self, texts: List[str]) -> int:
+        """该列使用的小数位数：全部为整数时为0，否则为 precision 或列中最多的小数位数"""
+        seen = max(map(len, _DECIMALS.findall('\n'.join(texts))), default=0)
+        if seen and self.precision is not None:
+            return self.precision
+        return seen
+
+    def _parse(self, texts: List[str]) -> List[Any]:
+        """批量转换数字文本：整数为 int，其余为 float（指定 precision 时四舍五入）"""
+        joined = '\n'.join(texts).translate(_NUMBER_NOISE)
+        cleaned = joined.split('\n')
+        if '.' not in joined:
+            return list(map(int, cleaned))
+        parsed = list(map(float, cleaned))
+        if self.precision is not None:
+            parsed = list(map(round, parsed, repeat(self.precision, len(parsed))))
+        return parsed
+
+    def _convert_numbers(self, texts: List[str], numbers: List[str], styles: List[Tuple[str, str]],
+                         value_map: Dict[str, Any], format_map: Dict[str, str]):
+        base = _number_format(self._decimals(numbers), any(',' in text for text in numbers))
+        value_map.update(zip(texts, self._parse(numbers)))
+        # styles 为各值的 (货币符号, “元”)，同一列中只有少数几种组合
+        formats = {(currency, yuan): (f'"{currency}"' if currency else '') + base + ('"元"' if yuan else '')
+                   for currency, yuan in set(styles)}
+        if len(formats) == 1:
+            format_map.update(dict.fromkeys(texts, formats.popitem()[1]))
+        else:
+            format_map.update(zip(texts, map(formats.__getitem__, styles)))
+
+    def _convert_percents(self, texts: List[str], percents: List[str],
+                          value_map: Dict[str, Any], format_map: Dict[str, str]):
+        decimals = self._decimals(percents)
+        # 除以100后按显示位数取整，消除二进制浮点误差（如 33.3% 得到 0.33299999999999996）
+        ratios = [round(value / 100, decimals + 2) for value in self._parse(percents)]
+        value_map.update(zip(texts, ratios))
+        format_map.update(dict.fromkeys(texts, f"{_number_format(decimals, False)}%"))
+
+    def _convert_dates(self, texts: List[str], dates: List[str],
+                       value_map: Dict[str, Any], format_map: Dict[str, str]):
+        parts = iter(list(map(int, _DIGITS.findall('\n'.join(dates)))))
+        try:
+            parsed = list(map(dt.date, parts, parts, parts))
+        except ValueError:
+            # 含不存在的日期（如2月30日）时逐个转换，这些值保持文本
+            parsed = []
+            for digits in dates:
+                try:
+                    parsed.append(dt.date(*map(int, _DIGITS.findall(digits))))
+                except ValueError:
+                    parsed.append(None)
+            texts = list(compress(texts, parsed))
+            parsed = list(filter(None, parsed))
+        value_map.update(zip(texts, parsed))
+        format_map.update(dict.fromkeys(texts, self.date_format))
@@ -0,0 +1,71 @@
+"""
+跨文档表格合并
+
+按表头（第一行）计算表结构签名，表头相同的表格视为同一种表。每个表格的数据行
+转置为按列存放的批次 (TableBatch)，由写入方按签名追加到同一个工作表或文件：
+- 表头文本去除首尾空白、连续空白合并为一个空格后计算签名，细微的排版差异不影响归类
+- 行按 python-docx row.cells 的语义展开，合并单元格的值在其覆盖的每个位置重复
+- 数据行按表头的列数对齐：不足的补空，多出的列舍弃
+"""
+
+import hashlib
+import re
+from typing import Iterable, List, Optional
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_header(header: Iterable[str]) -> List[str]:
+    """规范化表头文本：去除首尾空白，连续空白合并为一个空格"""
+    return [_WHITESPACE.sub(' ', text).strip() for text in header]
+
+
+def header_signature(header: Iterable[str]) -> str:
+    """表结构签名：规范化后的表头文本（含列数和顺序）的 SHA-1 摘要前16位"""
+    joined = '\x1f'.join(normalize_header(header))
+    return hashlib.sha1(joined.encode('utf-8')).hexdigest()[:16]
+
+
+def column_names(header: Iterable[str]) -> List[str]:
+    """由表头生成列名：空表头记为 列N，重复的列名（如横向合并的表头）追加 _2、_3"""
+    names = []
+    seen = {}
+    for idx, text in enumerate(normalize_header(header), 1):
+        name = text or f'列{idx}'
+        count = seen.get(name, 0) + 1
+        seen[name] = count
+        names.append(name if count == 1 else f'{name}_{count}')
+    return names
+
+
+class TableBatch:
+    """一个表格的数据行，按列存放：columns[i] 为第 i 列自上而下的值"""
+
+    __slots__ = ('signature', 'header', 'table_index', 'columns', 'row_count')
+
+    def __init__(self, signature: str, header: List[str], table_index: int,
+                 columns: List[List[str]], row_count: int):
+        self.signature = signature
+        self.header = header
+        self.table_index = table_index
+        self.columns = columns
+        self.row_count = row_count
+
+    @classmethod
+    def from_rows(cls, table_index: int, rows: Iterable[List[str]]) -> Optional['TableBatch']:
+        """
+        由表格的文本行（第一行为表头）生成批次；table_index 从1开始
+
+        空表格返回 None；只有表头的表格返回 0 行的批次，仍会登记其表结构。
+        """
+        rows = iter(rows)
+        header = next(rows, None)
+        if header is None:
+            return None
+        header = [text.strip() for text in header]
+        width = len(header)
+        padding = [''] * width
+        data = [([text.strip() for text in row] + padding)[:width] for row in rows]
+        # 一次转置为按列存放
+        columns = [list(column) for column in zip(*data)] if data else [[] for _ in range(width)]
+        return cls(header_signature(header), header, table_index, columns, len(data))
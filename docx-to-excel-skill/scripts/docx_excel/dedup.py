@@ -0,0 +1,65 @@
+"""
+批量处理中重复文档的识别
+
+同一批输入中常有内容相同的文档副本（重复上传、多个目录中的拷贝、只有保存时间不同的
+另存文件）。document_digest() 为文档计算指纹，指纹相同的文档只需解析一次：
+- file: 整个文件内容的 SHA-1，只识别逐字节相同的副本
+- content: 主文档部件（word/document.xml）规范化后的 SHA-1，不比较 docProps 等其他部件；
+  规范化时去除 Word 每次编辑保存都会改变、但不影响文本和表格的标记（修订会话 rsid、
+  段落 ID、拼写检查标记、上次排版的分页位置）
+
+content 指纹相同的文档，文档属性（标题、作者、日期）可能不同，使用方需要单独读取。
+"""
+
+import hashlib
+import re
+import zipfile
+from pathlib import Path
+from typing import Any, Optional
+
+from .archive import ArchiveMember
+from .engine import check_package, document_part
+from .result_cache import file_hash
+
+DEDUP_MODES = ('file', 'content')
+
+# 不影响文本和表格、但随编辑会话变化的属性和空元素
+_VOLATILE_MARKUP = re.compile(
+    rb'\s(?:w:rsid\w*|w14:paraId|w14:textId)="[^"]*"'
+    rb'|<w:proofErr\b[^>]*/>'
+    rb'|<w:lastRenderedPageBreak/>')
+
+
+def normalize_document_xml(data: bytes) -> bytes:
+    """去除主文档XML中随编辑会话变化的标记"""
+    return _VOLATILE_MARKUP.sub(b'', data)
+
+
+def content_digest(source: Any) -> str:
+    """主文档部件规范化后的 SHA-1；source 为路径或 ArchiveMember"""
+    if isinstance(source, ArchiveMember):
+        source = source.open()
+    elif isinstance(source, Path):
+        source = str(source)
+    with zipfile.ZipFile(source) as zf:
+        check_package(zf)
+        data = zf.read(document_part(zf))
+    return hashlib.sha1(normalize_document_xml(data)).hexdigest()
+
+
+def document_digest(source: Any, mode: str) -> Optional[str]:
+    """
+    按 mode ('file' 或 'content') 计算文档指纹
+
+    文档无法读取（损坏、不是zip包、疑似zip炸弹等）时返回 None，由正常的解析流程报告错误。
+    """
+    if mode not in DEDUP_MODES:
+        raise ValueError(f"未知的去重方式: {mode}")
+    try:
+        if mode == 'content':
+            return f"content:{content_digest(source)}"
+        if isinstance(source, ArchiveMember):
+            return f"file:{hashlib.sha1(source.open().getbuffer()).hexdigest()}"
+        return f"file:{file_hash(Path(source))}"
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
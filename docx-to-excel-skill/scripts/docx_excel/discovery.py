@@ -0,0 +1,154 @@
+"""
+输入文档查找
+
+用 os.scandir 逐个目录扫描，找到一个文档即返回一个，批量处理不必等整个目录树扫描完才开始：
+- 文件名匹配不区分大小写（*.docx 同时匹配 .DOCX），同一文件只返回一次
+- 跳过 Word 打开文档时生成的临时锁文件 (~$*)
+- recursive 为 True 时进入子目录（不进入指向目录的符号链接，避免循环）
+- ordered 为 True 时每个目录内按名称排序、深度优先，结果顺序在每次运行中一致；
+  为 False 时按文件系统返回的顺序，省去排序
+- 输入为 zip/tar 归档时从归档中逐个读出文档（见 archive.py）
+- select_shard() 按路径的稳定哈希把文档分到 N 个分片，多台机器各处理一片
+"""
+
+import fnmatch
+import glob
+import os
+import re
+import zlib
+from pathlib import Path
+from typing import Iterable, Iterator, Set, Tuple
+
+LOCK_FILE_PREFIX = '~$'
+
+# 模式以 **/ 开头时按递归查找处理，与 Path.glob 的写法一致
+_RECURSIVE_PREFIX = '**/'
+
+
+def name_matcher(pattern: str):
+    """不区分大小写的文件名匹配函数；模式开头的 **/ 被忽略"""
+    if pattern.startswith(_RECURSIVE_PREFIX):
+        pattern = pattern[len(_RECURSIVE_PREFIX):]
+    return re.compile(fnmatch.translate(pattern), re.IGNORECASE).match
+
+
+def scan_directory(root: str, pattern: str = '*.docx', recursive: bool = False,
+                   ordered: bool = True) -> Iterator[Path]:
+    """
+    逐个返回目录中文件名匹配 pattern 的文档
+
+    无法读取的子目录输出警告后跳过；根目录不存在或不是目录时抛出 FileNotFoundError。
+    """
+    if not os.path.isdir(root):
+        raise FileNotFoundError(f"输入目录不存在: {root}")
+
+    if pattern.startswith(_RECURSIVE_PREFIX):
+        recursive = True
+    matches = name_matcher(pattern)
+
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it) if ordered else it
+                if ordered:
+                    entries.sort(key=lambda entry: entry.name)
+                subdirs = []
+                for entry in entries:
+                    name = entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                subdirs.append(entry.path)
+                            continue
+                        if not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
+                    if name.startswith(LOCK_FILE_PREFIX) or not matches(name):
+                        continue
+                    yield Path(entry.path)
+        except OSError as e:
+            if directory == root:
+                raise
+            print(f"警告: 无法读取目录 {directory}: {e}")
+            continue
+        # 后进先出，逆序压栈使子目录按名称顺序处理
+        stack.extend(reversed(subdirs))
+
+
+def _unique(paths: Iterable[Path]) -> Iterator[Path]:
+    """按不区分大小写的路径去重"""
+    seen: Set[str] = set()
+    for path in paths:
+        key = os.path.normpath(str(path)).lower()
+        if key not in seen:
+            seen.add(key)
+            yield path
+
+
+def iter_documents(input_spec: str, pattern: str = '*.docx', recursive: bool = False,
+                   ordered: bool = True) -> Iterator[Path]:
+    """
+    解析批量处理的输入：目录（按 pattern 匹配文件名）、归档文件或通配符表达式（如 data/**/*.docx）
+
+    归档文件返回 ArchiveMember，按归档内的顺序（本身是确定的）返回其中全部匹配的文档。
+    通配符表达式在 ordered 为 True 时需要先收集全部匹配再按路径排序。
+    """
+    if os.path.isdir(input_spec):
+        return _unique(scan_directory(input_spec, pattern, recursive, ordered))
+    if os.path.isfile(input_spec):
+        from .archive import is_archive, iter_archive_documents
+        if is_archive(input_spec):
+            return iter_archive_documents(input_spec, pattern)
+
+    candidates = (Path(p) for p in glob.iglob(input_spec, recursive=True))
+    files = _unique(path for path in candidates
+                    if not path.name.startswith(LOCK_FILE_PREFIX) and path.is_file())
+    return iter(sorted(files)) if ordered else files
+
+
+def input_root(input_spec: str) -> str:
+    """
+    批量输入中文档相对路径的起点（见 shard_key）
+
+    目录为其本身；通配符表达式为第一个含通配符的部分之前的目录；其他输入为所在目录。
+    """
+    if os.path.isdir(input_spec):
+        return input_spec
+    parts = Path(input_spec).parts
+    for i, part in enumerate(parts):
+        if any(c in part for c in '*?['):
+            return str(Path(*parts[:i])) if i else '.'
+    return str(Path(input_spec).parent)
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """解析 I/N 形式的分片参数（I 从1开始，1 <= I <= N），格式错误时抛出 ValueError"""
+    try:
+        index, count = (int(part) for part in str(spec).split('/'))
+    except ValueError:
+        raise ValueError(f"分片参数应为 I/N 形式 (如 2/4): {spec}") from None
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"分片序号应在 1 到 {count} 之间: {spec}")
+    return index, count
+
+
+def shard_key(path, root: str) -> str:
+    """
+    文档在分片中的标识：相对输入目录的 POSIX 路径（归档中的文档为成员路径）
+
+    不含输入目录本身，各主机挂载共享文件系统的位置不同也得到相同的划分。
+    """
+    member = getattr(path, 'member', None)
+    if member is not None:
+        return member
+    return Path(os.path.relpath(str(path), root)).as_posix()
+
+
+def select_shard(paths: Iterable, root: str, index: int, count: int) -> Iterator:
+    """只返回属于第 index 个分片（共 count 个）的文档，按 CRC-32 哈希划分，每次运行结果相同"""
+    for path in paths:
+        if zlib.crc32(shard_key(path, root).encode('utf-8')) % count == index - 1:
+            yield path
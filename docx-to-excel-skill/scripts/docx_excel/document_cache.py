@@ -0,0 +1,127 @@
+"""
+已解析文档的进程内缓存
+
+同一进程中反复处理同一个文档时（例如先 extract_tables 再 extract_fields，或常驻服务
+收到针对同一文件的多次请求），open_document() 直接返回上次解析得到的文档对象：
+- 键为 (绝对路径, 引擎)，并记录文件的修改时间和大小；两者任一变化即重新解析
+- 按最近使用顺序淘汰 (LRU)，文档数和估算内存两个上限同时生效
+- 估算内存按zip包中XML部件的解压后大小乘以解析树的膨胀系数计算，超过上限的单个文档不缓存
+- 归档成员和文件对象没有可比较的修改时间，总是重新解析
+
+缓存的文档对象由多个调用方共享，调用方只能读取，不能修改。
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+from .engine import DEFAULT_ENGINE, load_document, load_document_measured
+
+# 默认最多缓存的文档数
+DEFAULT_MAX_DOCUMENTS = 16
+
+# 默认的缓存内存上限（MB，估算值）
+DEFAULT_MAX_MB = 256
+
+# lxml 解析树（以及 python-docx 代理对象）占用的内存约为XML文本的数倍
+_TREE_FACTOR = 4
+
+
+class DocumentCache:
+    """
+    已解析文档的 LRU 缓存（见模块说明）
+
+    Args:
+        max_documents: 最多缓存的文档数
+        max_mb: 缓存文档的估算内存上限（MB）
+    """
+
+    def __init__(self, max_documents: int = DEFAULT_MAX_DOCUMENTS, max_mb: int = DEFAULT_MAX_MB):
+        self.max_documents = max_documents
+        self.max_bytes = max_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        # (路径, 引擎) -> (修改时间, 大小, 估算内存, 文档对象)
+        self._entries: 'OrderedDict[Tuple[str, str], Tuple[int, int, int, Any]]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """已缓存文档的估算内存（字节）"""
+        return self._bytes
+
+    def open(self, source: Any, engine: str = DEFAULT_ENGINE):
+        """
+        打开文档，文件未变化时返回缓存的文档对象
+
+        Args:
+            source: 文档路径；其他来源（归档成员、文件对象）直接交给 load_document()
+            engine: 'fast' 或 'docx'
+
+        Returns:
+            FastDocument 或 python-docx 的 Document 对象
+        """
+        if not isinstance(source, (str, Path)) or self.max_documents <= 0:
+            return load_document(source, engine)
+
+        path = Path(source).resolve()
+        stat = path.stat()
+        key = (str(path), engine)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[3]
+            self.misses += 1
+
+        # 解析时不持有锁，同一文档被并发打开时各自解析，以后存入的为准
+        # 估算内存使用打开文档时已经读取的zip目录（见 check_package），不再打开zip包
+        doc, xml_size = load_document_measured(path, engine)
+        size = xml_size * _TREE_FACTOR
+        with self._lock:
+            self._discard(key)
+            if size <= self.max_bytes:
+                self._entries[key] = (stat.st_mtime_ns, stat.st_size, size, doc)
+                self._bytes += size
+                while len(self._entries) > self.max_documents or self._bytes > self.max_bytes:
+                    self._discard(next(iter(self._entries)))
+        return doc
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _discard(self, key: Tuple[str, str]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+
+_default_cache = DocumentCache()
+
+
+def document_cache() -> DocumentCache:
+    """open_document() 使用的进程级缓存，可修改其 max_documents、max_bytes 或 clear()"""
+    return _default_cache
+
+
+def open_document(source: Any, engine: str = DEFAULT_ENGINE, cache: Optional[DocumentCache] = None):
+    """
+    打开Word文档，同一进程中重复打开未变化的文件时复用已解析的文档对象
+
+    脚本中的 extract_tables_from_docx()、extract_fields() 和批量处理都经由此函数打开文档。
+
+    Args:
+        source: 文档路径、二进制文件对象或归档中的文档 (ArchiveMember)
+        engine: 'fast' 或 'docx'
+        cache: 使用的缓存，默认为进程级缓存 document_cache()
+    """
+    return (cache if cache is not None else _default_cache).open(source, engine)
@@ -0,0 +1,881 @@
+"""
+Word文档解析引擎
+
+提供两种可选引擎：
+- docx: 使用 python-docx 对象模型，作为参考实现
+- fast: 直接从zip包中读取 word/document.xml，用 lxml 单次遍历解析段落和表格，
+        不为每个单元格创建 python-docx 代理对象，大表格的解析时间为线性
+
+FastDocument 实现了脚本中用到的 python-docx 接口子集（paragraphs、tables、
+inline_shapes、core_properties），两种引擎返回的文档对象可以互换使用。
+
+StreamingDocument 用 iterparse 按文档顺序增量解析，不在内存中保留整棵XML树，
+供 --streaming 模式处理超大文档；read_metadata() 只读取文档属性部件。
+
+打开文档时先按zip目录中记录的大小检查各部件（check_package），解压后明显过大的
+文档（zip炸弹）在解析之前即被拒绝。
+"""
+
+import datetime as dt
+import posixpath
+import re
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from lxml import etree
+
+from .archive import ArchiveMember
+from .metrics import stage
+
+ENGINES = ('fast', 'docx')
+DEFAULT_ENGINE = 'fast'
+
+_W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+_WP_NS = 'http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing'
+_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_DC_NS = 'http://purl.org/dc/elements/1.1/'
+_DCTERMS_NS = 'http://purl.org/dc/terms/'
+
+_RT_OFFICE_DOCUMENT = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument'
+_RT_STYLES = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles'
+_RT_CORE_PROPERTIES = 'http://schemas.openxmlformats.org/package/2006/relationships/metadata/core-properties'
+_RT_EXTENDED_PROPERTIES = ('http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+                           'extended-properties')
+_EP_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/extended-properties'
+
+
+def _w(tag: str) -> str:
+    return f'{{{_W_NS}}}{tag}'
+
+
+W_BODY = _w('body')
+W_P = _w('p')
+W_R = _w('r')
+W_T = _w('t')
+W_BR = _w('br')
+W_HYPERLINK = _w('hyperlink')
+W_DRAWING = _w('drawing')
+W_TBL = _w('tbl')
+W_TBLGRID = _w('tblGrid')
+W_GRIDCOL = _w('gridCol')
+W_TR = _w('tr')
+W_TRPR = _w('trPr')
+W_GRIDBEFORE = _w('gridBefore')
+W_TC = _w('tc')
+W_TCPR = _w('tcPr')
+W_GRIDSPAN = _w('gridSpan')
+W_VMERGE = _w('vMerge')
+W_PPR = _w('pPr')
+W_PSTYLE = _w('pStyle')
+W_STYLE = _w('style')
+W_NAME = _w('name')
+W_VAL = _w('val')
+W_TYPE = _w('type')
+W_STYLEID = _w('styleId')
+W_DEFAULT = _w('default')
+WP_INLINE = f'{{{_WP_NS}}}inline'
+
+# 与 python-docx 一致：run 内这些元素对应的文本
+_RUN_CHARS = {
+    _w('tab'): '\t',
+    _w('ptab'): '\t',
+    _w('cr'): '\n',
+    _w('noBreakHyphen'): '-',
+}
+
+# python-docx 将 styles.xml 中的内部样式名转换为界面名称
+_UI_STYLE_NAMES = {
+    'caption': 'Caption',
+    'footer': 'Footer',
+    'header': 'Header',
+    **{f'heading {i}': f'Heading {i}' for i in range(1, 10)},
+}
+
+_XML_PARSER = etree.XMLParser(remove_blank_text=True, resolve_entities=False)
+_INLINE_SHAPES = etree.XPath('//w:p/w:r/w:drawing/wp:inline',
+                             namespaces={'w': _W_NS, 'wp': _WP_NS})
+
+
+def _run_text(r) -> str:
+    parts = []
+    for child in r:
+        tag = child.tag
+        if tag == W_T:
+            parts.append(child.text or '')
+        elif tag == W_BR:
+            # 只有换行符类型的 w:br 转换为换行，分页/分栏符忽略
+            if child.get(W_TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+        else:
+            text = _RUN_CHARS.get(tag)
+            if text:
+                parts.append(text)
+    return ''.join(parts)
+
+
+def paragraph_text(p) -> str:
+    """段落文本，包含超链接中的文本"""
+    parts = []
+    for child in p:
+        if child.tag == W_R:
+            parts.append(_run_text(child))
+        elif child.tag == W_HYPERLINK:
+            for r in child.iterchildren(W_R):
+                parts.append(_run_text(r))
+    return ''.join(parts)
+
+
+def cell_text(tc) -> str:
+    """单元格文本：各段落文本以换行连接（嵌套表格不计入）"""
+    return '\n'.join(paragraph_text(p) for p in tc.iterchildren(W_P))
+
+
+def _int_val(parent, tag: str, default: int) -> int:
+    if parent is None:
+        return default
+    el = parent.find(tag)
+    if el is None:
+        return default
+    return int(el.get(W_VAL, default))
+
+
+class GridCell:
+    """
+    表格网格中的一个单元格
+
+    合并区域只对应一个对象，文本只读取一次。row、col 为左上角所在的行号和行内位置（0起始），
+    row_span、col_span 为覆盖的行数和列数；同一对象出现在它覆盖的每个网格位置上。
+    """
+
+    __slots__ = ('text', 'row', 'col', 'row_span', 'col_span')
+
+    def __init__(self, text: str, row: int, col: int, col_span: int = 1):
+        self.text = text
+        self.row = row
+        self.col = col
+        self.row_span = 1
+        self.col_span = col_span
+
+    def is_origin(self, row: int, col: int) -> bool:
+        """(row, col) 是否为该单元格的左上角"""
+        return self.row == row and self.col == col
+
+    def __repr__(self) -> str:
+        return (f"GridCell({self.text!r}, row={self.row}, col={self.col}, "
+                f"row_span={self.row_span}, col_span={self.col_span})")
+
+
+def _resolve_row(tr, above: Dict[int, GridCell], row_idx: int,
+                 merged: Optional[List[GridCell]] = None
+                 ) -> Tuple[List[GridCell], Dict[int, GridCell]]:
+    """
+    展开一行：返回 (按 row.cells 语义排列的单元格, 本行 网格偏移 -> 单元格 的映射)
+
+    纵向合并的单元格沿用上一行的对象并增加其 row_span；
+    merged 不为 None 时，每个合并区域在首次确定为合并时追加到其中。
+    """
+    offset = _int_val(tr.find(W_TRPR), W_GRIDBEFORE, 0)
+    current: Dict[int, GridCell] = {}
+    row: List[GridCell] = []
+
+    for tc in tr.iterchildren(W_TC):
+        tc_pr = tc.find(W_TCPR)
+        span = _int_val(tc_pr, W_GRIDSPAN, 1)
+        v_merge = tc_pr.find(W_VMERGE) if tc_pr is not None else None
+
+        if v_merge is not None and v_merge.get(W_VAL, 'continue') == 'continue':
+            cell = above.get(offset)
+            if cell is None:
+                raise ValueError(f"纵向合并单元格在上一行中找不到起始单元格 (网格偏移 {offset})")
+            if cell.row + cell.row_span == row_idx:
+                cell.row_span += 1
+                if cell.row_span == 2 and cell.col_span == 1 and merged is not None:
+                    merged.append(cell)
+        else:
+            cell = GridCell(cell_text(tc), row_idx, len(row), span)
+            if span > 1 and merged is not None:
+                merged.append(cell)
+
+        current[offset] = cell
+        row.extend([cell] * cell.col_span)
+        offset += span
+
+    return row, current
+
+
+def iter_table_cells(tbl, merged: Optional[List[GridCell]] = None) -> Iterator[List[GridCell]]:
+    """
+    逐行解析表格网格，每行为 GridCell 列表
+
+    按 python-docx ``row.cells`` 的语义排列：gridSpan 横向合并的单元格按跨越的列数重复，
+    vMerge="continue" 的单元格为上一行同一网格位置的单元格。每个单元格的文本只读取一次；
+    每行只保存 网格偏移 -> 单元格 的映射，整体为线性时间，且只需保留上一行的状态。
+    merged 不为 None 时收集合并区域（见 _resolve_row）。
+    """
+    above: Dict[int, GridCell] = {}
+    for row_idx, tr in enumerate(tbl.iterchildren(W_TR)):
+        row, above = _resolve_row(tr, above, row_idx, merged)
+        yield row
+
+
+def iter_docx_table_cells(table, merged: Optional[List[GridCell]] = None) -> Iterator[List[GridCell]]:
+    """
+    逐行读取 python-docx 表格，每行为 GridCell 列表（docx 引擎，与 iter_table_cells() 结果相同）
+
+    直接使用 python-docx 的 ``row.cells``，不解析XML：横向合并的单元格在一行中重复出现，
+    纵向合并的续接单元格与上一行对应的是同一个 w:tc 元素，行列跨度由此推出。
+    每行只保存 w:tc -> 单元格 的映射；merged 的含义见 _resolve_row()。
+    """
+    above: Dict[Any, GridCell] = {}
+    for row_idx, docx_row in enumerate(table.rows):
+        current: Dict[Any, GridCell] = {}
+        row: List[GridCell] = []
+        for docx_cell in docx_row.cells:
+            tc = docx_cell._tc
+            cell = current.get(tc)
+            if cell is not None:
+                if cell.row == row_idx:
+                    # 同一行中重复出现：横向合并
+                    cell.col_span += 1
+                    if cell.col_span == 2 and merged is not None:
+                        merged.append(cell)
+            else:
+                cell = above.get(tc)
+                if cell is not None:
+                    # 上一行的同一单元格：纵向合并
+                    cell.row_span += 1
+                    if cell.row_span == 2 and cell.col_span == 1 and merged is not None:
+                        merged.append(cell)
+                else:
+                    cell = GridCell(docx_cell.text, row_idx, len(row))
+                current[tc] = cell
+            row.append(cell)
+        above = current
+        yield row
+
+
+def iter_table_rows(tbl) -> Iterator[List[str]]:
+    """逐行生成表格的单元格文本（合并单元格的文本在其覆盖的每个位置重复），见 iter_table_cells()"""
+    for row in iter_table_cells(tbl):
+        yield [cell.text for cell in row]
+
+
+def table_grid(tbl) -> List[List[str]]:
+    """表格的完整文本网格，见 iter_table_rows()"""
+    return list(iter_table_rows(tbl))
+
+
+def origin_count(row: List[GridCell], row_idx: int) -> int:
+    """一行中以该行为左上角的单元格数（合并区域只计一次）"""
+    return sum(1 for col, cell in enumerate(row) if cell.is_origin(row_idx, col))
+
+
+class TableModel:
+    """
+    表格的网格模型：一次线性遍历读取全部行，并记录合并区域
+
+    rows 为 GridCell 行列表（row.cells 语义），merged_cells 为合并区域（row_span 或
+    col_span 大于1的单元格），column_count 为 w:tblGrid 的列数。
+    两种引擎各自读取表格（from_xml / from_docx），只共用这一结构。
+    """
+
+    def __init__(self, rows: List[List[GridCell]], merged_cells: List[GridCell], column_count: int):
+        self.rows = rows
+        self.merged_cells = merged_cells
+        self.column_count = column_count
+
+    @classmethod
+    def from_xml(cls, tbl) -> 'TableModel':
+        """由 w:tbl 元素构建（fast 引擎）"""
+        merged: List[GridCell] = []
+        rows = list(iter_table_cells(tbl, merged))
+        grid = tbl.find(W_TBLGRID)
+        return cls(rows, merged, len(grid.findall(W_GRIDCOL)) if grid is not None else 0)
+
+    @classmethod
+    def from_docx(cls, table) -> 'TableModel':
+        """由 python-docx 的 Table 构建（docx 引擎）"""
+        merged: List[GridCell] = []
+        rows = list(iter_docx_table_cells(table, merged))
+        return cls(rows, merged, len(table.columns))
+
+    @property
+    def cell_count(self) -> int:
+        """不同单元格数，合并区域计为一个"""
+        return sum(origin_count(row, row_idx) for row_idx, row in enumerate(self.rows))
+
+    def texts(self) -> List[List[str]]:
+        """文本网格，与 table_grid() 相同"""
+        return [[cell.text for cell in row] for row in self.rows]
+
+
+def table_model(table) -> TableModel:
+    """取 FastTable 或 python-docx Table 的网格模型（python-docx 表格按 row.cells 读取）"""
+    if isinstance(table, FastTable):
+        return table.model
+    return TableModel.from_docx(table)
+
+
+class FastStyle:
+    """段落样式（仅包含名称）"""
+
+    __slots__ = ('name',)
+
+    def __init__(self, name: Optional[str]):
+        self.name = name
+
+
+class FastParagraph:
+    """段落：提供 text 和 style 属性"""
+
+    __slots__ = ('text', 'style')
+
+    def __init__(self, text: str, style: Optional[FastStyle]):
+        self.text = text
+        self.style = style
+
+
+class FastCell:
+    """表格单元格：提供 text 属性"""
+
+    __slots__ = ('text',)
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FastRow:
+    """表格行：提供 cells 属性"""
+
+    __slots__ = ('cells',)
+
+    def __init__(self, texts: List[str]):
+        self.cells = [FastCell(text) for text in texts]
+
+
+class FastTable:
+    """表格：提供 rows 和 columns 属性，网格模型在首次访问时构建"""
+
+    def __init__(self, tbl):
+        grid = tbl.find(W_TBLGRID)
+        col_count = len(grid.findall(W_GRIDCOL)) if grid is not None else 0
+        self.columns = range(col_count)
+        self._tbl = tbl
+        self._model: Optional[TableModel] = None
+        self._rows: Optional[List[FastRow]] = None
+
+    @property
+    def model(self) -> TableModel:
+        if self._model is None:
+            self._model = TableModel.from_xml(self._tbl)
+        return self._model
+
+    @property
+    def rows(self) -> List['FastRow']:
+        if self._rows is None:
+            self._rows = [FastRow(texts) for texts in self.model.texts()]
+        return self._rows
+
+
+class FastCoreProperties:
+    """文档核心属性 (docProps/core.xml)"""
+
+    def __init__(self, root=None):
+        self.title = ''
+        self.author = ''
+        self.created = None
+        self.modified = None
+
+        if root is None:
+            # 与 python-docx 一致：缺少核心属性部件时使用默认值
+            self.title = 'Word Document'
+            self.modified = dt.datetime.now(dt.timezone.utc)
+            return
+
+        self.title = self._text(root, f'{{{_DC_NS}}}title')
+        self.author = self._text(root, f'{{{_DC_NS}}}creator')
+        self.created = self._datetime(root, f'{{{_DCTERMS_NS}}}created')
+        self.modified = self._datetime(root, f'{{{_DCTERMS_NS}}}modified')
+
+    @staticmethod
+    def _text(root, tag: str) -> str:
+        el = root.find(tag)
+        return (el.text or '') if el is not None else ''
+
+    @staticmethod
+    def _datetime(root, tag: str) -> Optional[dt.datetime]:
+        el = root.find(tag)
+        if el is None or not el.text:
+            return None
+        try:
+            return parse_w3cdtf(el.text)
+        except ValueError:
+            return None
+
+
+_OFFSET_PATTERN = re.compile(r'([+-])(\d\d):(\d\d)')
+
+
+def parse_w3cdtf(value: str) -> dt.datetime:
+    """解析 W3CDTF 日期时间字符串，带时区偏移时换算为UTC（与 python-docx 相同）"""
+    parseable, offset = value[:19], value[19:]
+    parsed = None
+    for template in ('%Y-%m-%dT%H:%M:%S', '%Y-%m-%d', '%Y-%m', '%Y'):
+        try:
+            parsed = dt.datetime.strptime(parseable, template)
+            break
+        except ValueError:
+            continue
+    if parsed is None:
+        raise ValueError(f"无法解析日期时间: {value}")
+
+    if len(offset) == 6:
+        match = _OFFSET_PATTERN.match(offset)
+        if match is None:
+            raise ValueError(f"无效的时区偏移: {offset}")
+        sign, hours, minutes = match.groups()
+        factor = -1 if sign == '+' else 1
+        parsed += dt.timedelta(hours=int(hours) * factor, minutes=int(minutes) * factor)
+    return parsed.replace(tzinfo=dt.timezone.utc)
+
+
+def _rels_path(part_name: str) -> str:
+    directory, filename = posixpath.split(part_name)
+    return posixpath.join(directory, '_rels', f'{filename}.rels')
+
+
+# 文档包解压后的总大小上限，以及单个部件的压缩比上限（只检查解压后超过 RATIO_MIN_SIZE 的部件）。
+# 正常文档的 XML 压缩比约为 5-20，zip炸弹通常在 1000 以上
+MAX_PACKAGE_SIZE = 2 * 1024 ** 3
+MAX_COMPRESSION_RATIO = 200
+RATIO_MIN_SIZE = 16 * 1024 ** 2
+
+_XML_SUFFIXES = ('.xml', '.rels')
+
+
+def check_compressed_size(name: str, size: int, compress_size: Optional[int] = None):
+    """
+    按记录的大小检查一个压缩成员（文档包的部件，或归档中的文档），不读取内容
+
+    compress_size 为 None（如压缩 tar 中的成员，没有单独的压缩大小）时只检查解压后的大小。
+
+    Raises:
+        ValueError: 解压后超过 MAX_PACKAGE_SIZE，或压缩比超过 MAX_COMPRESSION_RATIO（疑似zip炸弹）
+    """
+    if size > MAX_PACKAGE_SIZE:
+        raise ValueError(f"疑似zip炸弹: {name} 解压后 {size} 字节，超过上限 {MAX_PACKAGE_SIZE} 字节")
+    if (compress_size is not None and size > RATIO_MIN_SIZE
+            and size > MAX_COMPRESSION_RATIO * max(compress_size, 1)):
+        raise ValueError(f"疑似zip炸弹: {name} 解压后 {size} 字节，压缩比超过 {MAX_COMPRESSION_RATIO}")
+
+
+def check_package(zf: zipfile.ZipFile) -> int:
+    """
+    按zip目录中记录的大小检查文档包，不解压任何部件
+
+    zipfile 读取部件时不会返回超过记录大小的数据，因此记录的大小即是解压后的上限。
+
+    Returns:
+        XML部件（.xml、.rels）解压后的总大小，供估算解析后占用的内存（见 document_cache）
+
+    Raises:
+        ValueError: 解压后总大小或某个部件的压缩比超过上限（疑似zip炸弹）
+    """
+    total = 0
+    xml_bytes = 0
+    for info in zf.infolist():
+        total += info.file_size
+        check_compressed_size(f"部件 {info.filename}", info.file_size, info.compress_size)
+        if info.filename.lower().endswith(_XML_SUFFIXES):
+            xml_bytes += info.file_size
+    if total > MAX_PACKAGE_SIZE:
+        raise ValueError(f"疑似zip炸弹: 解压后共 {total} 字节，超过上限 {MAX_PACKAGE_SIZE} 字节")
+    return xml_bytes
+
+
+def _related_part(zf: zipfile.ZipFile, source_part: str, rel_type: str) -> Optional[str]:
+    """根据关系类型查找目标部件在zip中的名称，source_part 为空表示包级关系"""
+    rels_name = _rels_path(source_part) if source_part else '_rels/.rels'
+    try:
+        rels = etree.fromstring(zf.read(rels_name), _XML_PARSER)
+    except KeyError:
+        return None
+
+    base = posixpath.dirname(source_part)
+    for rel in rels.iterchildren(f'{{{_REL_NS}}}Relationship'):
+        if rel.get('Type') == rel_type and rel.get('TargetMode') != 'External':
+            target = rel.get('Target', '')
+            if target.startswith('/'):
+                return target[1:]
+            return posixpath.normpath(posixpath.join(base, target))
+    return None
+
+
+def document_part(zf: zipfile.ZipFile) -> str:
+    """主文档部件在zip中的名称（按包级关系查找，缺少关系时为 word/document.xml）"""
+    return _related_part(zf, '', _RT_OFFICE_DOCUMENT) or 'word/document.xml'
+
+
+def _read_xml(zf: zipfile.ZipFile, part_name: Optional[str]):
+    if not part_name:
+        return None
+    try:
+        with stage('unzip'):
+            data = zf.read(part_name)
+    except KeyError:
+        return None
+    with stage('parse'):
+        return etree.fromstring(data, _XML_PARSER)
+
+
+class FastDocument:
+    """
+    基于 zipfile + lxml 的轻量文档对象
+
+    打开时只解析主文档、样式和核心属性三个部件；段落和表格在首次访问时构建。
+    """
+
+    def __init__(self, source: Any):
+        if isinstance(source, Path):
+            source = str(source)
+
+        with zipfile.ZipFile(source) as zf:
+            # XML部件解压后的总大小，document_cache 据此估算解析后占用的内存
+            self.xml_size = check_package(zf)
+            main_part = document_part(zf)
+            root = _read_xml(zf, main_part)
+            if root is None:
+                raise ValueError(f"文档缺少主文档部件: {main_part}")
+            styles_root = _read_xml(zf, _related_part(zf, main_part, _RT_STYLES))
+            core_root = _read_xml(zf, _related_part(zf, '', _RT_CORE_PROPERTIES))
+
+        self._root = root
+        self._body = root.find(W_BODY)
+        if self._body is None:
+            raise ValueError("文档缺少 w:body 元素")
+        self._styles_root = styles_root
+        self._paragraphs: Optional[List[FastParagraph]] = None
+        self._tables: Optional[List[FastTable]] = None
+        self.core_properties = FastCoreProperties(core_root)
+
+    @property
+    def paragraphs(self) -> List[FastParagraph]:
+        """正文中的顶层段落（不含表格内段落）"""
+        if self._paragraphs is None:
+            styles, default_style = self._paragraph_styles()
+            paragraphs = []
+            for p in self._body.iterchildren(W_P):
+                style_id = None
+                p_pr = p.find(W_PPR)
+                if p_pr is not None:
+                    p_style = p_pr.find(W_PSTYLE)
+                    if p_style is not None:
+                        style_id = p_style.get(W_VAL)
+                style = (styles.get(style_id) if style_id else None) or default_style
+                paragraphs.append(FastParagraph(paragraph_text(p), style))
+            self._paragraphs = paragraphs
+        return self._paragraphs
+
+    @property
+    def tables(self) -> List[FastTable]:
+        """正文中的顶层表格（不含嵌套表格）"""
+        if self._tables is None:
+            self._tables = [FastTable(tbl) for tbl in self._body.iterchildren(W_TBL)]
+        return self._tables
+
+    def iter_tables(self) -> Iterator[Iterator[List[str]]]:
+        """逐个生成顶层表格的行迭代器，不缓存已生成的表格文本"""
+        for tbl in self._body.iterchildren(W_TBL):
+            yield iter_table_rows(tbl)
+
+    def iter_table_cells(self) -> Iterator[Iterator[List[GridCell]]]:
+        """逐个生成顶层表格的 GridCell 行迭代器，见 iter_table_cells()"""
+        for tbl in self._body.iterchildren(W_TBL):
+            yield iter_table_cells(tbl)
+
+    @property
+    def inline_shapes(self) -> list:
+        """嵌入式图形元素列表"""
+        return _INLINE_SHAPES(self._root)
+
+    def _paragraph_styles(self) -> Tuple[Dict[str, Optional[FastStyle]], Optional[FastStyle]]:
+        if self._styles_root is None:
+            # python-docx 在缺少样式部件时使用内置默认样式，其默认段落样式为 Normal
+            return {}, FastStyle('Normal')
+
+        # 同一 styleId 以第一个为准；非段落样式记为 None，引用时回退到默认样式
+        styles: Dict[str, Optional[FastStyle]] = {}
+        default_style = None
+        for el in self._styles_root.iterchildren(W_STYLE):
+            style = None
+            if el.get(W_TYPE, 'paragraph') == 'paragraph':
+                name_el = el.find(W_NAME)
+                name = name_el.get(W_VAL) if name_el is not None else None
+                style = FastStyle(_UI_STYLE_NAMES.get(name, name) if name is not None else None)
+                if el.get(W_DEFAULT) in ('1', 'true', 'on'):
+                    # 规范要求以文档顺序中最后一个默认样式为准
+                    default_style = style
+            style_id = el.get(W_STYLEID)
+            if style_id is not None and style_id not in styles:
+                styles[style_id] = style
+        return styles, default_style
+
+
+def _iterparse(stream, events: Tuple[str, ...], tags: Tuple[str, ...]):
+    """只报告 tags 中元素事件的增量解析器；huge_tree 允许超大文本节点"""
+    return etree.iterparse(stream, events=events, tag=tags, resolve_entities=False, huge_tree=True)
+
+
+def _release(el):
+    """清除已处理的元素及其之前的兄弟元素，使增量解析的内存占用保持有界"""
+    el.clear()
+    parent = el.getparent()
+    if parent is not None:
+        while el.getprevious() is not None:
+            del parent[0]
+
+
+def _is_body_child(el) -> bool:
+    parent = el.getparent()
+    return parent is not None and parent.tag == W_BODY
+
+
+class StreamingTable:
+    """
+    StreamingDocument 中的一个顶层表格，迭代时逐行生成单元格文本（语义同 iter_table_rows）
+
+    必须在读取下一个正文元素之前遍历；未遍历的行会被跳过。iter_cells() 改为逐行生成
+    GridCell，两种迭代方式只能选用一种。column_count 为 w:tblGrid 的列数，读出第一行时
+    已经确定；merged_cells 为已读出行中的合并区域，遍历结束后完整。
+    """
+
+    def __init__(self, document: 'StreamingDocument', tbl, events):
+        self.column_count = 0
+        self.merged_cells: List[GridCell] = []
+        self._document = document
+        self._tbl = tbl
+        self._events = events
+        self._rows = self._iter_cells()
+
+    def __iter__(self) -> Iterator[List[str]]:
+        return ([cell.text for cell in row] for row in self._rows)
+
+    def iter_cells(self) -> Iterator[List[GridCell]]:
+        """逐行生成 GridCell，见 iter_table_cells()"""
+        return self._rows
+
+    def _iter_cells(self) -> Iterator[List[GridCell]]:
+        tbl = self._tbl
+        above: Dict[int, GridCell] = {}
+        row_idx = 0
+        for event, el in self._events:
+            if event != 'end':
+                continue
+            if el is tbl:
+                return
+            tag = el.tag
+            if tag == WP_INLINE:
+                self._document._count_inline_shape(el)
+            elif tag == W_TBLGRID and el.getparent() is tbl:
+                self.column_count = len(el.findall(W_GRIDCOL))
+            elif tag == W_TR and el.getparent() is tbl:
+                row, above = _resolve_row(el, above, row_idx, self.merged_cells)
+                _release(el)
+                row_idx += 1
+                yield row
+
+    def skip(self):
+        """跳过剩余的行"""
+        for _ in self._rows:
+            pass
+
+
+class StreamingDocument:
+    """
+    用 iterparse 增量解析主文档的只读文档，用于无法整体载入内存的超大文档
+
+    iter_blocks() 按文档顺序逐个生成正文段落文本 (str) 和顶层表格 (StreamingTable)，
+    已处理的段落和表格行随即从树中清除，峰值内存只与单个段落或表格行的大小有关，
+    与文档大小无关。每次调用 iter_blocks() 都从头解析一遍。
+    """
+
+    def __init__(self, source: Any):
+        if isinstance(source, ArchiveMember):
+            source = source.open()
+        elif isinstance(source, Path):
+            source = str(source)
+        self._source = source
+        self.inline_shape_count = 0
+
+        with zipfile.ZipFile(source) as zf:
+            check_package(zf)
+            self._document_part = document_part(zf)
+            if self._document_part not in zf.NameToInfo:
+                raise ValueError(f"文档缺少主文档部件: {self._document_part}")
+            core_root = _read_xml(zf, _related_part(zf, '', _RT_CORE_PROPERTIES))
+        self.core_properties = FastCoreProperties(core_root)
+
+    def iter_blocks(self) -> Iterator[Any]:
+        """
+        逐个生成正文段落文本和顶层表格
+
+        inline_shape_count 在遍历过程中累加（路径与 FastDocument.inline_shapes 相同）。
+        """
+        self.inline_shape_count = 0
+        with zipfile.ZipFile(self._source) as zf, zf.open(self._document_part) as stream:
+            events = _iterparse(stream, ('start', 'end'), (W_P, W_TBL, W_TBLGRID, W_TR, WP_INLINE))
+            for event, el in events:
+                tag = el.tag
+                if tag == WP_INLINE:
+                    if event == 'end':
+                        self._count_inline_shape(el)
+                    continue
+                if not _is_body_child(el):
+                    continue
+                if tag == W_P and event == 'end':
+                    yield paragraph_text(el)
+                    _release(el)
+                elif tag == W_TBL and event == 'start':
+                    table = StreamingTable(self, el, events)
+                    yield table
+                    table.skip()
+                    _release(el)
+
+    def iter_tables(self) -> Iterator[StreamingTable]:
+        """逐个生成顶层表格；每个表格须在请求下一个表格之前遍历完"""
+        for block in self.iter_blocks():
+            if isinstance(block, StreamingTable):
+                yield block
+
+    def count_tables(self, limit: Optional[int] = None) -> int:
+        """单独解析一遍统计顶层表格数，达到 limit 即停止"""
+        count = 0
+        with zipfile.ZipFile(self._source) as zf, zf.open(self._document_part) as stream:
+            for _, el in _iterparse(stream, ('end',), (W_P, W_TBL)):
+                if not _is_body_child(el):
+                    continue
+                if el.tag == W_TBL:
+                    count += 1
+                    if limit is not None and count >= limit:
+                        break
+                _release(el)
+        return count
+
+    def _count_inline_shape(self, inline):
+        drawing = inline.getparent()
+        run = drawing.getparent() if drawing is not None and drawing.tag == W_DRAWING else None
+        if run is not None and run.tag == W_R:
+            paragraph = run.getparent()
+            if paragraph is not None and paragraph.tag == W_P:
+                self.inline_shape_count += 1
+
+
+class DocumentMetadata:
+    """
+    只读取文档属性部件得到的元数据
+
+    core_properties 来自 docProps/core.xml；pages、paragraphs、words 来自 docProps/app.xml，
+    是 Word 保存文档时记录的统计值，部件缺失或未记录时为 None。
+    first_paragraph 为正文第一个非空段落的文本（未读取或没有时为 None）。
+    """
+
+    __slots__ = ('core_properties', 'pages', 'paragraphs', 'words', 'first_paragraph')
+
+    def __init__(self, core_properties: FastCoreProperties, app_root=None,
+                 first_paragraph: Optional[str] = None):
+        self.core_properties = core_properties
+        self.pages = self._count(app_root, 'Pages')
+        self.paragraphs = self._count(app_root, 'Paragraphs')
+        self.words = self._count(app_root, 'Words')
+        self.first_paragraph = first_paragraph
+
+    @staticmethod
+    def _count(root, name: str) -> Optional[int]:
+        if root is None:
+            return None
+        el = root.find(f'{{{_EP_NS}}}{name}')
+        try:
+            return int(el.text) if el is not None else None
+        except (TypeError, ValueError):
+            return None
+
+
+def _first_paragraph_text(zf: zipfile.ZipFile, document_part: str) -> Optional[str]:
+    """
+    增量解析主文档，返回正文第一个非空段落的文本（已去除首尾空白）
+
+    找到后立即停止，不读取文档其余部分；已处理的元素随即清除，内存占用与文档大小无关。
+    """
+    try:
+        stream = zf.open(document_part)
+    except KeyError:
+        return None
+    with stream, stage('parse'):
+        for _, el in _iterparse(stream, ('end',), (W_P, W_TBL)):
+            if not _is_body_child(el):
+                continue  # 表格内的段落：随所在表格一起清除
+            if el.tag == W_P:
+                text = paragraph_text(el).strip()
+                if text:
+                    return text
+            _release(el)
+    return None
+
+
+def read_metadata(source: Any, first_paragraph: bool = True) -> DocumentMetadata:
+    """
+    只读取文档属性部件，不解析正文
+
+    Args:
+        source: 文档路径、二进制文件对象或归档中的文档 (ArchiveMember)
+        first_paragraph: 是否读取正文第一个非空段落（读到即停止）
+    """
+    if isinstance(source, ArchiveMember):
+        source = source.open()
+    elif isinstance(source, Path):
+        source = str(source)
+
+    with stage('open'), zipfile.ZipFile(source) as zf:
+        check_package(zf)
+        core_root = _read_xml(zf, _related_part(zf, '', _RT_CORE_PROPERTIES))
+        app_root = _read_xml(zf, _related_part(zf, '', _RT_EXTENDED_PROPERTIES))
+        text = None
+        if first_paragraph:
+            text = _first_paragraph_text(zf, document_part(zf))
+    return DocumentMetadata(FastCoreProperties(core_root), app_root, text)
+
+
+def load_document(source: Any, engine: str = DEFAULT_ENGINE):
+    """
+    用指定引擎打开Word文档
+
+    Args:
+        source: 文档路径、二进制文件对象或归档中的文档 (ArchiveMember)
+        engine: 'fast' 或 'docx'
+
+    Returns:
+        FastDocument 或 python-docx 的 Document 对象
+    """
+    return load_document_measured(source, engine)[0]
+
+
+def load_document_measured(source: Any, engine: str = DEFAULT_ENGINE) -> Tuple[Any, int]:
+    """同 load_document()，同时返回打开时检查文档包得到的XML部件总大小（见 check_package）"""
+    if isinstance(source, ArchiveMember):
+        source = source.open()
+    if engine == 'fast':
+        with stage('open'):
+            doc = FastDocument(source)
+        return doc, doc.xml_size
+    if engine == 'docx':
+        from docx import Document
+        with stage('open'):
+            if isinstance(source, Path):
+                source = str(source)
+            with zipfile.ZipFile(source) as zf:
+                xml_size = check_package(zf)
+            if hasattr(source, 'seek'):
+                source.seek(0)
+            return Document(source), xml_size
+    raise ValueError(f"未知的解析引擎: {engine}")
@@ -0,0 +1,92 @@
+"""
+Excel模板占位符填充
+
+模板文件中形如 {字段名} 的占位符会被替换为提取结果。每个模板文件只扫描一次，
+建立 占位符 -> (工作表, 单元格) 的索引并缓存；之后每填充一个文档只修改含占位符的单元格，
+保存后恢复原值，同一个已加载的工作簿可以反复使用。
+"""
+
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+PLACEHOLDER_PATTERN = re.compile(r'\{([^{}\n]+)\}')
+
+# 缓存的模板数量上限（每个模板占用一个已加载的工作簿）
+MAX_CACHED_TEMPLATES = 8
+
+
+class ExcelTemplate:
+    """已索引的Excel模板"""
+
+    def __init__(self, template_path: str):
+        from openpyxl import load_workbook
+
+        self.template_path = template_path
+        self.wb = load_workbook(template_path)
+
+        # (工作表, 单元格坐标, 模板原始文本)
+        self.cells: List[Tuple[str, str, str]] = []
+        # 占位符名称 -> [(工作表, 单元格坐标)]
+        self.placeholders: Dict[str, List[Tuple[str, str]]] = {}
+
+        for ws in self.wb.worksheets:
+            for row in ws.iter_rows():
+                for cell in row:
+                    value = cell.value
+                    if not isinstance(value, str) or '{' not in value:
+                        continue
+                    names = PLACEHOLDER_PATTERN.findall(value)
+                    if not names:
+                        continue
+                    self.cells.append((ws.title, cell.coordinate, value))
+                    for name in names:
+                        self.placeholders.setdefault(name, []).append((ws.title, cell.coordinate))
+
+    def fill(self, data: Dict[str, str], output_path: str):
+        """用 data 替换占位符并保存到 output_path，未提供值的占位符保持原样"""
+        def replace(match):
+            name = match.group(1)
+            return str(data[name]) if name in data else match.group(0)
+
+        try:
+            for sheet, coordinate, template_value in self.cells:
+                self.wb[sheet][coordinate].value = PLACEHOLDER_PATTERN.sub(replace, template_value)
+            self.wb.save(output_path)
+        finally:
+            # 恢复模板原值，供下一个文档使用
+            for sheet, coordinate, template_value in self.cells:
+                self.wb[sheet][coordinate].value = template_value
+
+
+_template_cache: 'OrderedDict[str, Tuple[Tuple[int, int], ExcelTemplate]]' = OrderedDict()
+
+
+def get_template(template_path: str) -> ExcelTemplate:
+    """
+    获取已索引的模板，按 (修改时间, 大小) 判断模板文件是否变化
+
+    进程内缓存，最近最少使用的模板在超过 MAX_CACHED_TEMPLATES 时被淘汰。
+    """
+    path = Path(template_path)
+    stat = path.stat()
+    key = str(path.resolve())
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _template_cache.get(key)
+    if cached is not None and cached[0] == version:
+        _template_cache.move_to_end(key)
+        return cached[1]
+
+    template = ExcelTemplate(str(path))
+    _template_cache[key] = (version, template)
+    _template_cache.move_to_end(key)
+    while len(_template_cache) > MAX_CACHED_TEMPLATES:
+        _template_cache.popitem(last=False)
+    return template
+
+
+def fill_template(template_path: str, data: Dict[str, str], output_path: str):
+    """用提取结果填充模板并保存"""
+    get_template(template_path).fill(data, output_path)
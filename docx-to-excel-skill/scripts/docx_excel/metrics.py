@@ -0,0 +1,329 @@
+"""
+分阶段计时和吞吐量统计
+
+脚本在 main() 中创建 Metrics 并用 activate() 激活；处理代码通过模块级的 stage()、count()、
+timed() 记录各阶段耗时和行列数，未激活时这些调用不做任何事，开销可以忽略。
+
+阶段耗时为“自身耗时”：嵌套阶段的时间只计入最内层阶段，各阶段之和不超过总耗时。
+每个文档的记录在 document() 中生成；多进程时在工作进程内用 profile_document() 收集，
+随结果返回主进程后用 Metrics.add_document() 合并。
+"""
+
+import csv
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 每个文档记录中的计数项
+COUNT_KEYS = ('tables', 'rows', 'cells', 'fields')
+
+_active: Optional['Metrics'] = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """当前进程的峰值常驻内存，单位MB；不支持的平台返回 None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以KB为单位，macOS 以字节为单位
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+class Metrics:
+    """一次运行的计时和计数收集器"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages: Dict[str, List[float]] = {}  # 阶段 -> [耗时, 次数]
+        self.documents: List[Dict[str, Any]] = []
+        self._stack: List[list] = []  # [阶段, 开始时间, 子阶段耗时]
+        self._current: Optional[Dict[str, Any]] = None
+
+    def begin(self, name: str):
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def end(self):
+        name, started, child_time = self._stack.pop()
+        elapsed = time.perf_counter() - started
+        if self._stack:
+            self._stack[-1][2] += elapsed
+        self._add_stage(name, elapsed - child_time)
+
+    def _add_stage(self, name: str, seconds: float, calls: int = 1):
+        totals = self.stages.setdefault(name, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += calls
+        if self._current is not None:
+            stages = self._current['stages']
+            stages[name] = stages.get(name, 0.0) + seconds
+
+    def count(self, **values: int):
+        if self._current is not None:
+            for key, value in values.items():
+                self._current[key] = self._current.get(key, 0) + value
+
+    @contextmanager
+    def document(self, name: str):
+        """记录一个文档的处理过程"""
+        record = {'file': name, 'seconds': 0.0, 'stages': {}}
+        previous, self._current = self._current, record
+        started = time.perf_counter()
+        try:
+            yield record
+        except Exception as e:
+            record['error'] = str(e)
+            raise
+        finally:
+            record['seconds'] = time.perf_counter() - started
+            record['peak_rss_mb'] = peak_rss_mb()
+            self._current = previous
+            self.documents.append(record)
+
+    def add_document(self, record: Dict[str, Any]):
+        """合并其他进程中收集的文档记录"""
+        self.documents.append(record)
+        for name, seconds in record['stages'].items():
+            totals = self.stages.setdefault(name, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """汇总结果（可直接序列化为JSON）"""
+        elapsed = time.perf_counter() - self.start
+        peaks = [r['peak_rss_mb'] for r in self.documents if r.get('peak_rss_mb') is not None]
+        own_peak = peak_rss_mb()
+        if own_peak is not None:
+            peaks.append(own_peak)
+        totals = {key: sum(r.get(key, 0) for r in self.documents) for key in COUNT_KEYS}
+        return {
+            'total_seconds': round(elapsed, 4),
+            'documents': len(self.documents),
+            'docs_per_sec': round(len(self.documents) / elapsed, 2) if elapsed else None,
+            'cells_per_sec': round(totals['cells'] / elapsed, 1) if elapsed else None,
+            'peak_rss_mb': max(peaks) if peaks else None,
+            **totals,
+            'stages': {name: {'seconds': round(seconds, 4), 'calls': calls}
+                       for name, (seconds, calls) in self.stages.items()},
+            'per_document': [_rounded(r) for r in self.documents],
+        }
+
+    def slowest(self, n: int) -> List[Dict[str, Any]]:
+        """耗时最长的 n 个文档"""
+        return sorted(self.documents, key=lambda r: r['seconds'], reverse=True)[:n]
+
+    def print_report(self, slowest: int = 10):
+        """输出各阶段耗时占比和最慢的文档"""
+        summary = self.summary()
+        # 多进程时各阶段耗时是所有进程的累计值，占比按各阶段耗时之和计算
+        total = sum(seconds for seconds, _ in self.stages.values()) or 1.0
+        print(f"性能统计: 共 {summary['total_seconds']:.3f} 秒，{summary['documents']} 个文档，"
+              f"{summary['docs_per_sec']} 文档/秒，峰值内存 {summary['peak_rss_mb']} MB")
+        print(f"  {'阶段':<16}{'耗时(秒)':>12}{'占比':>9}{'次数':>9}")
+        for name, (seconds, calls) in sorted(self.stages.items(), key=lambda item: -item[1][0]):
+            print(f"  {name:<16}{seconds:>12.4f}{seconds / total:>9.1%}{calls:>9}")
+
+        if slowest and self.documents:
+            print(f"最慢的 {min(slowest, len(self.documents))} 个文档:")
+            for record in self.slowest(slowest):
+                stages = sorted(record['stages'].items(), key=lambda item: -item[1])
+                top = '，'.join(f"{name} {seconds:.3f}" for name, seconds in stages[:3])
+                counts = ' '.join(f"{key}={record[key]}" for key in COUNT_KEYS if key in record)
+                print(f"  {record['seconds']:.3f}s  {record['file']}  ({top}) {counts}")
+
+    def write(self, path: str):
+        """写出统计结果：.csv 为每个文档一行，其余格式为完整JSON"""
+        output = Path(path)
+        if output.suffix.lower() == '.csv':
+            stage_names = sorted(self.stages)
+            with open(output, 'w', newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                writer.writerow(['file', 'seconds', *COUNT_KEYS, 'peak_rss_mb', 'error',
+                                 *stage_names])
+                for record in self.documents:
+                    writer.writerow([record['file'], round(record['seconds'], 4),
+                                     *(record.get(key, '') for key in COUNT_KEYS),
+                                     record.get('peak_rss_mb', ''), record.get('error', ''),
+                                     *(round(record['stages'].get(name, 0.0), 4)
+                                       for name in stage_names)])
+        else:
+            output.write_text(json.dumps(self.summary(), ensure_ascii=False, indent=2) + '\n',
+                              encoding='utf-8')
+
+
+def _rounded(record: Dict[str, Any]) -> Dict[str, Any]:
+    result = dict(record)
+    result['seconds'] = round(record['seconds'], 4)
+    result['stages'] = {name: round(seconds, 4) for name, seconds in record['stages'].items()}
+    return result
+
+
+def current() -> Optional[Metrics]:
+    """当前激活的收集器"""
+    return _active
+
+
+@contextmanager
+def activate(metrics: Optional[Metrics]):
+    """在上下文中激活收集器；metrics 为 None 时不做任何事"""
+    global _active
+    previous = _active
+    if metrics is not None:
+        _active = metrics
+    try:
+        yield metrics
+    finally:
+        _active = previous
+
+
+@contextmanager
+def stage(name: str):
+    """记录一个阶段的耗时"""
+    metrics = _active
+    if metrics is None:
+        yield
+        return
+    metrics.begin(name)
+    try:
+        yield
+    finally:
+        metrics.end()
+
+
+@contextmanager
+def document(name: str):
+    """记录一个文档的处理过程；未激活收集器时不做任何事"""
+    if _active is None:
+        yield None
+        return
+    with _active.document(name) as record:
+        yield record
+
+
+def count(**values: int):
+    """为当前文档累加计数（tables、rows、cells、fields）"""
+    if _active is not None:
+        _active.count(**values)
+
+
+def timed(iterable: Iterable, name: str) -> Iterable:
+    """把从 iterable 取下一项的耗时计入 name 阶段，用于惰性生成的数据"""
+    if _active is None:
+        return iterable
+    return _timed(iter(iterable), _active, name)
+
+
+def _timed(iterator: Iterator, metrics: Metrics, name: str) -> Iterator:
+    while True:
+        metrics.begin(name)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            metrics.end()
+        yield item
+
+
+def profile_document(name: str, func: Callable, *args, **kwargs) -> Tuple[Any, Dict[str, Any]]:
+    """
+    在独立的收集器中处理一个文档，返回 (func 的结果, 文档记录)
+
+    用于工作进程：记录随结果一起返回，由主进程的 Metrics.add_document() 合并。
+    """
+    metrics = Metrics()
+    with activate(metrics), metrics.document(name):
+        result = func(*args, **kwargs)
+    return result, metrics.documents[0]
+
+
+class Progress:
+    """
+    批量处理的实时进度：已处理数、文档/秒和预计剩余时间
+
+    边查找边处理时总数未知，用 discover() 包装文档迭代器：查找过程中按已发现的文档数估计
+    剩余时间（显示为下限），查找结束后即得到总数。total 和已发现数都未知时只显示已处理数和速度。
+    """
+
+    def __init__(self, total: Optional[int] = None, interval: float = 1.0):
+        self.total = total
+        self.interval = interval
+        self.found: Optional[int] = None
+        self.done = 0
+        self.start = time.perf_counter()
+        self._last_print = 0.0
+        self._printed = 0
+
+    def update(self, n: int = 1):
+        self.done += n
+        now = time.perf_counter()
+        if self.done != self.total and now - self._last_print < self.interval:
+            return
+        self._print(now)
+
+    def _print(self, now: float):
+        self._last_print = now
+        self._printed = self.done
+        elapsed = now - self.start
+        rate = self.done / elapsed if elapsed else 0.0
+        if self.total is None and self.found is not None:
+            eta = max(self.found - self.done, 0) / rate if rate else 0.0
+            print(f"进度: {self.done}/{self.found}+ (仍在查找文档)，"
+                  f"{rate:.1f} 文档/秒，预计剩余至少 {eta:.0f} 秒")
+            return
+        if self.total is None:
+            print(f"进度: {self.done} 个文档，{rate:.1f} 文档/秒")
+            return
+        eta = (self.total - self.done) / rate if rate else 0.0
+        print(f"进度: {self.done}/{self.total} ({self.done / self.total:.1%})，"
+              f"{rate:.1f} 文档/秒，预计剩余 {eta:.0f} 秒")
+
+    def discover(self, iterable: Iterable) -> Iterator:
+        """逐项返回待处理的文档并计数，迭代结束时把已发现数作为总数"""
+        self.found = 0
+        for item in iterable:
+            self.found += 1
+            yield item
+        self.total = self.found
+
+    def track(self, iterable: Iterable) -> Iterator:
+        """逐项返回 iterable 的元素，每项处理完后更新进度"""
+        for item in iterable:
+            yield item
+            self.update()
+        # 串行处理时查找在最后一个结果之后才结束，此时才能输出含总数的最终进度
+        if self.done and self._printed != self.done:
+            self._print(time.perf_counter())
+
+
+def add_arguments(parser):
+    """为脚本添加 --profile、--metrics-out、--slowest 参数"""
+    parser.add_argument('--profile', action='store_true',
+                       help='处理结束后输出各阶段耗时占比和最慢的文档')
+    parser.add_argument('--metrics-out',
+                       help='性能统计输出文件路径 (.json 为完整统计，.csv 为每个文档一行)')
+    parser.add_argument('--slowest', type=int, default=10,
+                       help='--profile 时列出的最慢文档数 (默认: 10)')
+
+
+def from_args(args) -> Optional[Metrics]:
+    """按命令行参数创建收集器，未要求统计时返回 None"""
+    return Metrics() if args.profile or args.metrics_out else None
+
+
+def report(metrics: Optional[Metrics], args):
+    """按命令行参数输出或保存统计结果"""
+    if metrics is None:
+        return
+    if args.profile:
+        metrics.print_report(args.slowest)
+    if args.metrics_out:
+        try:
+            metrics.write(args.metrics_out)
+            print(f"性能统计已保存: {args.metrics_out}")
+        except OSError as e:
+            print(f"保存性能统计失败: {e}")
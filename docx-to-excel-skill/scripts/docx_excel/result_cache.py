@@ -0,0 +1,170 @@
+"""
+批量处理结果缓存
+
+以 SQLite 保存每个文档的分析结果（文档信息和表格摘要），键为文档路径，
+并记录文件大小、修改时间和内容哈希：
+- 大小和修改时间都未变化时直接命中，不读取文件内容
+- 大小或修改时间变化时计算内容哈希，内容未变（例如仅被 touch 或复制）仍然命中
+- 本次运行中未出现的路径（文件已删除）在 prune() 时清除
+
+保存的大小、修改时间和哈希在解析之前取得 (stamp)，解析期间被修改的文件下次运行时不会命中。
+"""
+
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 分析结果的结构发生变化时递增，使旧缓存全部失效
+CACHE_VERSION = 2
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_hash(path: Path) -> str:
+    """计算文件内容的 SHA-1 哈希"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    文档分析结果的持久化缓存
+
+    用法：对每个文档先调用 lookup()，未命中时先调用 stamp()，再解析文档并把结果和 stamp()
+    的返回值交给 store()，全部处理完后调用 prune() 清除已删除文件的记录，最后 close()。
+    """
+
+    def __init__(self, db_path: str, engine: str):
+        self.db_path = db_path
+        self.engine = engine
+        self.hits = 0
+        self.misses = 0
+        self._seen: List[str] = []
+        self._pending_writes = 0
+
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT NOT NULL,
+                engine TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                info TEXT NOT NULL,
+                tables TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def lookup(self, doc_path: Path) -> Optional[Tuple[Dict[str, Any], List[Dict[str, Any]]]]:
+        """
+        查询缓存
+
+        Returns:
+            命中时返回 (文档信息, 表格摘要列表)，否则返回 None
+        """
+        key = str(doc_path)
+        self._seen.append(key)
+
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, content_hash, engine, version, info, tables "
+            "FROM documents WHERE path = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        size, mtime_ns, content_hash, engine, version, info, tables = row
+        if engine != self.engine or version != CACHE_VERSION:
+            self.misses += 1
+            return None
+
+        try:
+            stat = doc_path.stat()
+            if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+                if stat.st_size != size or file_hash(doc_path) != content_hash:
+                    self.misses += 1
+                    return None
+                # 内容未变，只更新修改时间，下次无需再计算哈希
+                self.conn.execute("UPDATE documents SET mtime_ns = ? WHERE path = ?",
+                                  (stat.st_mtime_ns, key))
+                self._count_write()
+        except OSError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return json.loads(info), json.loads(tables)
+
+    def stamp(self, doc_path: Path, content_hash: Optional[str] = None) -> Optional[Tuple[int, int, str]]:
+        """
+        解析之前取得文档的 (大小, 修改时间, 内容哈希)，解析完成后传给 store()
+
+        content_hash 为已经计算的文件内容 SHA-1（如按文件内容去重时的指纹），此时不再读取文件。
+        文件无法读取时返回 None，结果不缓存。
+        """
+        try:
+            stat = doc_path.stat()
+            return stat.st_size, stat.st_mtime_ns, content_hash or file_hash(doc_path)
+        except OSError:
+            return None
+
+    def store(self, doc_path: Path, doc_info: Dict[str, Any], tables_info: List[Dict[str, Any]],
+              stamp: Optional[Tuple[int, int, str]]):
+        """保存分析结果，stamp 为解析之前 stamp() 的返回值；处理失败的文档不缓存，下次运行时重试"""
+        if '错误' in doc_info or stamp is None:
+            return
+
+        size, mtime_ns, content_hash = stamp
+        self.conn.execute(
+            "INSERT OR REPLACE INTO documents "
+            "(path, size, mtime_ns, content_hash, engine, version, info, tables) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (str(doc_path), size, mtime_ns, content_hash, self.engine,
+             CACHE_VERSION, json.dumps(doc_info, ensure_ascii=False),
+             json.dumps(tables_info, ensure_ascii=False)))
+        self._count_write()
+
+    def prune(self, seen_paths: Optional[Iterable[str]] = None) -> int:
+        """
+        删除本次运行中未出现的文档记录
+
+        Args:
+            seen_paths: 本次运行中出现的路径，默认为所有调用过 lookup() 的路径
+
+        Returns:
+            删除的记录数
+        """
+        paths = self._seen if seen_paths is None else [str(p) for p in seen_paths]
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS seen_paths (path TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM seen_paths")
+        self.conn.executemany("INSERT OR IGNORE INTO seen_paths (path) VALUES (?)",
+                              ((p,) for p in paths))
+        cursor = self.conn.execute(
+            "DELETE FROM documents WHERE path NOT IN (SELECT path FROM seen_paths)")
+        self.conn.commit()
+        return cursor.rowcount
+
+    @property
+    def hit_rate(self) -> float:
+        """缓存命中率"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self):
+        """提交并关闭数据库"""
+        self.conn.commit()
+        self.conn.close()
+
+    def _count_write(self):
+        # 定期提交，中途中断时已完成的结果不会丢失
+        self._pending_writes += 1
+        if self._pending_writes >= 500:
+            self.conn.commit()
+            self._pending_writes = 0
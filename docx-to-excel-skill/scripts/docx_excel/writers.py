@@ -0,0 +1,382 @@
+"""
+xlsx 以外的流式输出格式
+
+csv、jsonl、parquet 三种格式按记录逐条写出，不创建 openpyxl 单元格对象，
+写入开销与数据量成正比，适合数据仓库导入和 pandas 处理：
+- csv: UTF-8 编码并带 BOM，Excel 可以直接打开中文内容；值读回时都是字符串，写入器记录各列的
+  类型 (column_types)，分片运行把它写入部分结果的元数据，合并时据此还原数值列
+- jsonl: 每行一个 JSON 对象，键为列名
+- parquet: 需要安装 pyarrow，按批写入行组；列类型由第一批数据推断（整数、浮点数或字符串），
+  之后的值与列类型不符时把该列放宽（整数 -> 浮点数 -> 字符串）并重写已写出的行组，不丢弃数据
+
+写入器的接口与 StreamingSheet 使用的只写工作表对应：先 write_header() 确定列，
+再逐行 append()（或用 append_columns() 追加按列存放的一批行），最后 close()。
+read_rows() 按同样的结构读回已写出的文件，用于合并分片结果。
+"""
+
+import csv
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+OUTPUT_FORMATS = ('xlsx', 'csv', 'jsonl', 'parquet')
+DEFAULT_FORMAT = 'xlsx'
+
+
+def resolve_format(output_path: str, output_format: Optional[str] = None) -> str:
+    """确定输出格式：未指定时按输出文件扩展名判断，无法判断时为 xlsx"""
+    if output_format:
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的流式输出格式: {output_format}")
+        return output_format
+    suffix = Path(output_path).suffix.lower().lstrip('.')
+    return suffix if suffix in OUTPUT_FORMATS else DEFAULT_FORMAT
+
+
+def format_output_path(output_path: str, output_format: str) -> str:
+    """输出路径的扩展名是其他已知格式时（如默认的 .xlsx）改为对应格式的扩展名"""
+    path = Path(output_path)
+    suffix = path.suffix.lower().lstrip('.')
+    if suffix in OUTPUT_FORMATS and suffix != output_format:
+        return str(path.with_suffix(f'.{output_format}'))
+    return str(path)
+
+
+def sheet_output_path(output_path: str, sheet_name: str, output_format: str) -> str:
+    """多工作表输出在非 xlsx 格式下每个工作表写成一个文件：<文件名>_<工作表>.<格式>"""
+    path = Path(output_path)
+    return str(path.with_name(f"{path.stem}_{sheet_name}.{output_format}"))
+
+
+def shard_output_path(output_path: str, index: int, count: int) -> str:
+    """分片运行的部分结果文件：<文件名>.part-<I>-of-<N>.<扩展名>"""
+    path = Path(output_path)
+    return str(path.with_name(f"{path.stem}.part-{index}-of-{count}{path.suffix}"))
+
+
+def shard_metadata_path(partial_path: str) -> str:
+    """部分结果的元数据文件：<文件名>.part-<I>-of-<N>.meta.json，与部分结果的格式无关"""
+    path = Path(partial_path)
+    return str(path.with_name(f"{path.stem}.meta.json"))
+
+
+def column_type(values: List[Any], current: Optional[str] = None) -> Optional[str]:
+    """
+    一列值的类型：'int'、'float' 或 'str'，空值不计入，没有非空值时为 None
+
+    current 为此前各批值的类型，返回合并后的类型（整数与浮点数合并为浮点数，其他组合为字符串）。
+    """
+    kind = current
+    for value in values:
+        if value is None or value == '':
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return 'str'
+        value_kind = 'int' if isinstance(value, int) else 'float'
+        if kind is None or kind == value_kind:
+            kind = value_kind
+        else:
+            kind = 'float'
+    return kind
+
+
+def restore_types(rows: Iterator[list], types: List[Optional[str]]) -> Iterator[list]:
+    """把按字符串读回的值按列类型还原为整数或浮点数，空字符串保持不变"""
+    converters = [int if kind == 'int' else float if kind == 'float' else None for kind in types]
+    if not any(converters):
+        yield from rows
+        return
+    for values in rows:
+        yield [value if convert is None or value == '' else convert(value)
+               for value, convert in zip(values, converters)] + list(values[len(converters):])
+
+
+class RecordWriter:
+    """逐行写出记录的写入器基类"""
+
+    def __init__(self, path: str, title: str = ''):
+        self.path = path
+        self.title = title or Path(path).stem
+        self.fields: List[str] = []
+
+    def write_header(self, fields: List[str]):
+        """确定列并写出表头（每个写入器只调用一次）"""
+        self.fields = list(fields)
+
+    def append(self, values: List[Any]):
+        raise NotImplementedError
+
+    def append_columns(self, columns: List[List[Any]]):
+        """追加按列存放的一批行：columns[i] 为第 i 列的值，各列等长"""
+        for values in zip(*columns):
+            self.append(list(values))
+
+    def column_types(self) -> Dict[str, str]:
+        """读回时会丢失的列类型（列名 -> 'int'/'float'/'str'），格式本身保留类型时为空"""
+        return {}
+
+    def close(self):
+        pass
+
+
+class CsvRecordWriter(RecordWriter):
+    """CSV 写入器：同时记录各列写入值的类型"""
+
+    def write_header(self, fields: List[str]):
+        super().write_header(fields)
+        self._types: List[Optional[str]] = [None] * len(self.fields)
+        self._file = open(self.path, 'w', newline='', encoding='utf-8-sig')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.fields)
+
+    def append(self, values: List[Any]):
+        self._observe([[value] for value in values])
+        self._writer.writerow(['' if value is None else value for value in values])
+
+    def append_columns(self, columns: List[List[Any]]):
+        self._observe(columns)
+        self._writer.writerows(zip(*(['' if value is None else value for value in column]
+                                     for column in columns)))
+
+    def _observe(self, columns: List[List[Any]]):
+        types = self._types
+        for index, column in enumerate(columns[:len(types)]):
+            if types[index] != 'str':
+                types[index] = column_type(column, types[index])
+
+    def column_types(self) -> Dict[str, str]:
+        return {field: kind for field, kind in zip(self.fields, self._types) if kind is not None}
+
+    def close(self):
+        self._file.close()
+
+
+class JsonlRecordWriter(RecordWriter):
+    """JSON Lines 写入器"""
+
+    def write_header(self, fields: List[str]):
+        super().write_header(fields)
+        self._file = open(self.path, 'w', encoding='utf-8')
+
+    def append(self, values: List[Any]):
+        record = dict(zip(self.fields, values))
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetRecordWriter(RecordWriter):
+    """Parquet 写入器：按列缓存，每 batch_rows 行写出一个行组"""
+
+    def __init__(self, path: str, title: str = '', batch_rows: int = 10000):
+        super().__init__(path, title)
+        self.batch_rows = batch_rows
+        self._columns: List[List[Any]] = []
+        self._buffered = 0
+        self._schema = None
+        self._writer = None
+
+    def write_header(self, fields: List[str]):
+        try:
+            import pyarrow  # noqa: F401
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise RuntimeError("parquet 格式需要安装 pyarrow: pip install pyarrow") from None
+        super().write_header(fields)
+        self._columns = [[] for _ in self.fields]
+
+    def append(self, values: List[Any]):
+        for column, value in zip(self._columns, values):
+            column.append(value)
+        self._buffered += 1
+        if self._buffered >= self.batch_rows:
+            self._flush()
+
+    def append_columns(self, columns: List[List[Any]]):
+        for column, values in zip(self._columns, columns):
+            column.extend(values)
+        self._buffered += len(columns[0]) if columns else 0
+        if self._buffered >= self.batch_rows:
+            self._flush()
+
+    def close(self):
+        self._flush()
+        if self._writer is None:
+            # 没有任何数据行时也写出只有列结构的文件
+            self._open_writer(self._columns)
+        self._writer.close()
+
+    def _flush(self):
+        if not self._buffered:
+            return
+        columns = self._columns
+        self._columns = [[] for _ in self.fields]
+        self._buffered = 0
+        if self._writer is None:
+            self._open_writer(columns)
+        else:
+            schema = _widen_schema(self._schema, columns)
+            if not schema.equals(self._schema):
+                self._rewrite(schema)
+        self._write(columns)
+
+    def _write(self, columns: List[List[Any]]):
+        import pyarrow as pa
+
+        arrays = [pa.array([_coerce(value, field.type) for value in column], type=field.type)
+                  for column, field in zip(columns, self._schema)]
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+
+    def _open_writer(self, columns: List[List[Any]]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._schema = pa.schema([(name, _infer_type(column))
+                                  for name, column in zip(self.fields, columns)])
+        self._writer = pq.ParquetWriter(self.path, self._schema)
+
+    def _rewrite(self, schema):
+        """parquet 文件的列类型在打开时确定：按放宽后的 schema 逐个行组重写已写出的数据"""
+        import pyarrow.parquet as pq
+
+        self._writer.close()
+        previous = f"{self.path}.widen"
+        os.replace(self.path, previous)
+        self._schema = schema
+        self._writer = pq.ParquetWriter(self.path, schema)
+        with pq.ParquetFile(previous) as parquet_file:
+            for batch in parquet_file.iter_batches():
+                self._write([column.to_pylist() for column in batch.columns])
+        os.remove(previous)
+
+
+def _infer_type(values: List[Any]):
+    import pyarrow as pa
+
+    present = [value for value in values if value is not None and value != '']
+    if present and all(isinstance(value, int) and not isinstance(value, bool) for value in present):
+        return pa.int64()
+    if present and all(isinstance(value, (int, float)) and not isinstance(value, bool)
+                       for value in present):
+        return pa.float64()
+    return pa.string()
+
+
+def _fits(values: List[Any], arrow_type) -> bool:
+    """一列值是否都能无损地写为 arrow_type（空值总是可以）"""
+    import pyarrow as pa
+
+    if arrow_type == pa.string():
+        return True
+    numeric = (int,) if arrow_type == pa.int64() else (int, float)
+    return all(value is None or value == '' or (isinstance(value, numeric) and not isinstance(value, bool))
+               for value in values)
+
+
+def _widen_schema(schema, columns: List[List[Any]]):
+    """放宽容纳不下新一批值的列：整数列遇到浮点数时改为浮点数，其他情况改为字符串"""
+    import pyarrow as pa
+
+    fields = []
+    for field, column in zip(schema, columns):
+        arrow_type = field.type
+        if not _fits(column, arrow_type):
+            arrow_type = pa.float64() if arrow_type == pa.int64() and _fits(column, pa.float64()) else pa.string()
+        fields.append((field.name, arrow_type))
+    return pa.schema(fields)
+
+
+def _coerce(value: Any, arrow_type) -> Any:
+    """把值转换为列类型（值已由 _widen_schema 保证与列类型相容），空值记为 null"""
+    import pyarrow as pa
+
+    if value is None or value == '':
+        return None
+    if arrow_type == pa.string():
+        return str(value)
+    return int(value) if arrow_type == pa.int64() else float(value)
+
+
+_WRITER_TYPES = {
+    'csv': CsvRecordWriter,
+    'jsonl': JsonlRecordWriter,
+    'parquet': ParquetRecordWriter,
+}
+
+
+def open_record_writer(path: str, output_format: str, title: str = '') -> RecordWriter:
+    """创建指定格式的写入器（xlsx 使用 openpyxl 只写工作表，不在此处理）"""
+    writer_type = _WRITER_TYPES.get(output_format)
+    if writer_type is None:
+        raise ValueError(f"不支持的流式输出格式: {output_format}")
+    return writer_type(path, title)
+
+
+def write_records(path: str, output_format: str, fields: List[str], rows) -> int:
+    """把一组行写成单个文件，返回写入的行数"""
+    writer = open_record_writer(path, output_format)
+    writer.write_header(fields)
+    count = 0
+    try:
+        for values in rows:
+            writer.append(values)
+            count += 1
+    finally:
+        writer.close()
+    return count
+
+
+def read_rows(path: str, output_format: str) -> Tuple[List[str], Iterator[list]]:
+    """
+    读回写出的 csv/jsonl/parquet 文件：返回 (列名, 逐行生成的值列表)
+
+    csv 的值均为字符串；没有数据行的 jsonl 文件不记录列名，返回空列名。
+
+    Raises:
+        FileNotFoundError: 文件不存在
+    """
+    if not Path(path).is_file():
+        raise FileNotFoundError(f"文件不存在: {path}")
+
+    if output_format == 'csv':
+        def csv_rows() -> Iterator[list]:
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                yield from reader
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            header = next(csv.reader(f), [])
+        return header, csv_rows()
+
+    if output_format == 'jsonl':
+        with open(path, encoding='utf-8') as f:
+            first = f.readline()
+        fields = list(json.loads(first)) if first.strip() else []
+
+        def jsonl_rows() -> Iterator[list]:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        yield [record.get(field) for field in fields]
+        return fields, jsonl_rows()
+
+    if output_format == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("parquet 格式需要安装 pyarrow: pip install pyarrow") from None
+
+        parquet_file = pq.ParquetFile(path)
+        fields = list(parquet_file.schema_arrow.names)
+
+        def parquet_rows() -> Iterator[list]:
+            for batch in parquet_file.iter_batches():
+                columns = [column.to_pylist() for column in batch.columns]
+                for values in zip(*columns):
+                    yield list(values)
+        return fields, parquet_rows()
+
+    raise ValueError(f"不支持的流式输出格式: {output_format}")
@@ -5,21 +5,115 @@
 """
 
 import argparse
+import contextlib
 import json
+import os
 import re
 import sys
-from pathlib import Path
-from typing import List, Dict, Any, Optional
-import pandas as pd
-from docx import Document
-from openpyxl import Workbook, load_workbook
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import chain, islice
+from pathlib import Path, PurePosixPath
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sized, Union
+
+from docx_excel import DEFAULT_ENGINE, ENGINES, TableModel, metrics, open_document, table_model
+from docx_excel.archive import is_archive
+from docx_excel.cell_types import CellConverter
+from docx_excel.discovery import input_root, iter_documents, shard_key
+from docx_excel.metrics import Progress, stage
+from docx_excel.writers import (OUTPUT_FORMATS, format_output_path, open_record_writer, resolve_format,
+                                write_records)
+from docx_excel.excel_template import fill_template
+
+
+# regex 类型字段的匹配标志
+REGEX_FIELD_FLAGS = re.IGNORECASE | re.MULTILINE
+
+_HEADING_LOCATION = re.compile(r'标题(\d+)\[(\d+)\]')
+
+# 批量结果转换数字时每次按列转换的文档数（同一批中各字段列的小数位数一致）
+CONVERT_CHUNK_ROWS = 1000
+
+
+def _compiled_pattern(field_config: Dict[str, Any], flags: int = 0):
+    """取字段配置中预编译的正则，未经 FieldPlan 编译的配置在此编译"""
+    if '_regex' in field_config:
+        return field_config['_regex']
+    pattern = field_config.get('pattern')
+    return re.compile(pattern, flags) if pattern else None
+
+
+def _heading_location(field_config: Dict[str, Any]):
+    """解析 '标题N[i]' 格式的位置，返回 (级别, 索引) 或 None"""
+    if '_heading' in field_config:
+        return field_config['_heading']
+    match = _HEADING_LOCATION.match(field_config.get('location', ''))
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+class DocumentIndex:
+    """
+    文档的单次遍历索引，供所有字段提取器共享
+
+    段落文本、样式名称、标题级别位置表和全文只计算一次，
+    提取 N 个字段的开销为 O(段落数 + 字段数)，而不是 O(段落数 × 字段数)。
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.paragraphs = list(doc.paragraphs)
+        self.texts = [para.text for para in self.paragraphs]
+
+        # 全文，供正则表达式字段一次搜索
+        self.full_text = '\n'.join(self.texts)
+
+        self._style_names: Optional[List[Optional[str]]] = None
+        self._headings: Dict[int, List[int]] = {}
+        self._tables = None
+        self._table_models: Dict[int, TableModel] = {}
+
+    @property
+    def style_names(self) -> List[Optional[str]]:
+        """各段落的样式名称，首次使用时解析"""
+        if self._style_names is None:
+            names = []
+            for para in self.paragraphs:
+                style = para.style
+                names.append(style.name if style is not None else None)
+            self._style_names = names
+        return self._style_names
+
+    @property
+    def tables(self) -> list:
+        """文档中的表格列表"""
+        if self._tables is None:
+            self._tables = list(self.doc.tables)
+        return self._tables
+
+    def table_model(self, table_index: int) -> TableModel:
+        """表格的网格模型，首次使用时一次解析整个表格（合并单元格的文本只读取一次）"""
+        model = self._table_models.get(table_index)
+        if model is None:
+            model = self._table_models[table_index] = table_model(self.tables[table_index])
+        return model
+
+    def headings(self, level: int) -> List[int]:
+        """指定级别标题（样式名以 'Heading N' 开头）的段落位置列表"""
+        positions = self._headings.get(level)
+        if positions is None:
+            prefix = f'Heading {level}'
+            positions = [idx for idx, name in enumerate(self.style_names)
+                         if name is not None and name.startswith(prefix)]
+            self._headings[level] = positions
+        return positions
 
 
 class FieldExtractor:
     """字段提取器基类"""
 
-    def __init__(self, doc: Document):
-        self.doc = doc
+    def __init__(self, index: DocumentIndex):
+        self.index = index
+        self.doc = index.doc
 
     def extract(self, field_config: Dict[str, Any]) -> str:
         """提取字段值"""
@@ -36,18 +130,14 @@ class ParagraphExtractor(FieldExtractor):
 
         try:
             # 解析位置格式：标题级别[索引]
-            match = re.match(r'标题(\d+)\[(\d+)\]', location)
-            if match:
-                level = int(match.group(1))
-                index = int(match.group(2))
+            heading = _heading_location(field_config)
+            if heading:
+                level, index = heading
 
                 # 查找指定标题级别的段落
-                found_count = 0
-                for para in self.doc.paragraphs:
-                    if para.style.name.startswith(f'Heading {level}'):
-                        if found_count == index:
-                            return para.text.strip()
-                        found_count += 1
+                positions = self.index.headings(level)
+                if index < len(positions):
+                    return self.index.texts[positions[index]].strip()
 
             # 如果未找到，尝试其他定位方式
             return self._find_by_text_pattern(field_config)
@@ -57,17 +147,17 @@ class ParagraphExtractor(FieldExtractor):
 
     def _find_by_text_pattern(self, field_config: Dict[str, Any]) -> str:
         """通过文本模式查找"""
-        pattern = field_config.get('pattern')
+        pattern = _compiled_pattern(field_config)
         if not pattern:
             return ""
 
-        for para in self.doc.paragraphs:
-            if re.search(pattern, para.text):
+        for text in self.index.texts:
+            match = pattern.search(text)
+            if match:
                 # 提取匹配的部分
-                match = re.search(pattern, para.text)
-                if match and match.groups():
+                if match.groups():
                     return match.group(1).strip()
-                return para.text.strip()
+                return text.strip()
         return field_config.get('default', '')
 
 
@@ -80,15 +170,16 @@ class TableExtractor(FieldExtractor):
         column = field_config.get('column', 0)
 
         try:
-            if table_index >= len(self.doc.tables):
+            tables = self.index.tables
+            if table_index >= len(tables):
                 return field_config.get('default', '')
 
-            table = self.doc.tables[table_index]
-            if row >= len(table.rows) or column >= len(table.rows[row].cells):
+            # 行列号为网格位置（同 python-docx 的 row.cells），合并单元格在其覆盖的每个位置返回同一文本
+            rows = self.index.table_model(table_index).rows
+            if row >= len(rows) or column >= len(rows[row]):
                 return field_config.get('default', '')
 
-            cell = table.rows[row].cells[column]
-            return cell.text.strip()
+            return rows[row][column].text.strip()
         except Exception as e:
             print(f"表格提取错误: {e}")
             return field_config.get('default', '')
@@ -98,14 +189,14 @@ class RegexExtractor(FieldExtractor):
     """正则表达式提取器"""
 
     def extract(self, field_config: Dict[str, Any]) -> str:
-        pattern = field_config.get('pattern')
-        if not pattern:
+        if not field_config.get('pattern'):
             return field_config.get('default', '')
 
         try:
+            pattern = _compiled_pattern(field_config, REGEX_FIELD_FLAGS)
+
             # 在整个文档中搜索
-            full_text = '\n'.join([para.text for para in self.doc.paragraphs])
-            match = re.search(pattern, full_text, re.IGNORECASE | re.MULTILINE)
+            match = pattern.search(self.index.full_text)
 
             if match:
                 # 返回第一个捕获组，如果没有捕获组则返回整个匹配
@@ -118,6 +209,64 @@ class RegexExtractor(FieldExtractor):
             return field_config.get('default', '')
 
 
+EXTRACTOR_TYPES = {
+    'paragraph': ParagraphExtractor,
+    'table': TableExtractor,
+    'regex': RegexExtractor
+}
+
+
+class FieldPlan:
+    """
+    编译后的字段提取计划
+
+    字段配置只校验一次，正则表达式和标题位置只解析一次，可在多个文档间复用。
+    配置有误的字段在提取时直接返回默认值。
+    """
+
+    def __init__(self, field_configs: List[Dict[str, Any]]):
+        self.fields: List[Dict[str, Any]] = []
+        self.errors: List[str] = []
+
+        for config in field_configs:
+            field_name = config.get('name', '')
+            if not field_name:
+                continue
+
+            field = dict(config)
+            field_type = field.get('type', 'paragraph')
+            if field_type not in EXTRACTOR_TYPES:
+                self._invalid(field, f"未知的字段类型: {field_type}")
+
+            pattern = field.get('pattern')
+            if pattern:
+                flags = REGEX_FIELD_FLAGS if field_type == 'regex' else 0
+                try:
+                    field['_regex'] = re.compile(pattern, flags)
+                except re.error as e:
+                    self._invalid(field, f"正则表达式错误: {e}")
+
+            if field_type == 'paragraph':
+                field['_heading'] = _heading_location(field)
+
+            if field_type == 'table':
+                for key in ('table_index', 'row', 'column'):
+                    value = field.get(key, 0)
+                    if not isinstance(value, int) or value < 0:
+                        self._invalid(field, f"{key} 必须是非负整数: {value}")
+
+            self.fields.append(field)
+
+    @property
+    def names(self) -> List[str]:
+        """字段名称（即输出列）"""
+        return [field['name'] for field in self.fields]
+
+    def _invalid(self, field: Dict[str, Any], message: str):
+        field['_invalid'] = True
+        self.errors.append(f"{field['name']}: {message}")
+
+
 def load_field_config(config_path: Optional[str] = None,
                      fields_str: Optional[str] = None) -> List[Dict[str, Any]]:
     """加载字段配置"""
@@ -145,75 +294,386 @@ def load_field_config(config_path: Optional[str] = None,
     return []
 
 
-def extract_fields(doc_path: str, field_configs: List[Dict[str, Any]]) -> Dict[str, str]:
-    """提取所有字段"""
-    try:
-        doc = Document(doc_path)
-        results = {}
-
-        # 创建提取器映射
-        extractors = {
-            'paragraph': ParagraphExtractor(doc),
-            'table': TableExtractor(doc),
-            'regex': RegexExtractor(doc)
-        }
+def load_cell_converter(config_path: Optional[str] = None,
+                        format_numbers: Optional[bool] = None,
+                        number_precision: Optional[int] = None) -> Optional[CellConverter]:
+    """
+    按配置文件的 output_settings.format_numbers 和 validation_rules 创建单元格转换器
 
-        for config in field_configs:
-            field_name = config.get('name', '')
+    format_numbers、number_precision 不为 None 时覆盖配置文件中的值。
+    不转换数字时返回 None；配置文件无法读取时按未配置处理（错误已由 load_field_config 输出）。
+    """
+    config: Dict[str, Any] = {}
+    if config_path:
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except Exception:
+            config = {}
+    settings = dict(config.get('output_settings') or {})
+    rules = dict(config.get('validation_rules') or {})
+    if format_numbers is not None:
+        settings['format_numbers'] = format_numbers
+    if number_precision is not None:
+        rules['number_precision'] = number_precision
+    return CellConverter.from_config({'output_settings': settings, 'validation_rules': rules})
+
+
+def extract_fields_from_document(doc, field_configs: Union[FieldPlan, List[Dict[str, Any]]]
+                                 ) -> Dict[str, str]:
+    """从已打开的文档对象提取所有字段"""
+    plan = field_configs if isinstance(field_configs, FieldPlan) else FieldPlan(field_configs)
+    results = {}
+
+    # 所有提取器共享同一个文档索引
+    with stage('index'):
+        index = DocumentIndex(doc)
+    extractors = {field_type: extractor_class(index)
+                  for field_type, extractor_class in EXTRACTOR_TYPES.items()}
+
+    with stage('fields'):
+        for config in plan.fields:
+            field_name = config['name']
             field_type = config.get('type', 'paragraph')
 
-            if not field_name:
-                continue
-
             extractor = extractors.get(field_type)
-            if extractor:
+            if extractor and not config.get('_invalid'):
                 value = extractor.extract(config)
                 results[field_name] = value
             else:
-                print(f"警告: 未知的字段类型: {field_type}")
+                if not extractor:
+                    print(f"警告: 未知的字段类型: {field_type}")
                 results[field_name] = config.get('default', '')
 
-        return results
+    metrics.count(fields=len(plan.fields))
+    return results
+
+
+def extract_fields(doc_path: str, field_configs: Union[FieldPlan, List[Dict[str, Any]]],
+                  engine: str = DEFAULT_ENGINE) -> Dict[str, str]:
+    """提取所有字段"""
+    try:
+        doc = open_document(doc_path, engine)
+        return extract_fields_from_document(doc, field_configs)
 
     except Exception as e:
         print(f"提取字段失败: {e}")
         return {}
 
 
-def save_to_excel(data: Dict[str, str], output_path: str,
-                 template_path: Optional[str] = None) -> bool:
-    """保存数据到Excel"""
+def find_input_documents(input_spec: str, pattern: str = "*.docx", recursive: bool = False,
+                         ordered: bool = True) -> Iterator[Path]:
+    """
+    解析批量模式的输入：目录（按 pattern 匹配）、zip/tar 归档或通配符表达式
+
+    边扫描边返回文档，跳过 Word 临时锁文件 (~$*)，见 docx_excel.discovery。
+    """
+    return iter_documents(input_spec, pattern, recursive, ordered)
+
+
+def is_batch_input(input_spec: str) -> bool:
+    """
+    输入为目录、zip/tar 归档或通配符表达式时使用批量模式
+
+    已存在的普通文件（归档除外）总是单文档模式，即使文件名中含有 [、?、*。
+    """
+    path = Path(input_spec)
+    if path.is_file() and not is_archive(input_spec):
+        return False
+    return path.is_dir() or is_archive(input_spec) or any(c in input_spec for c in '*?[')
+
+
+# 边查找边处理时每批提交的文档数
+_STREAM_CHUNK_SIZE = 8
+
+# 批量模式下每个工作进程持有一份提取计划，避免随每个任务重复传输
+_worker_args: Dict[str, Any] = {}
+
+
+def _init_batch_worker(plan: FieldPlan, engine: str, template_path: Optional[str],
+                       template_output_dir: Optional[str], root: Optional[str]):
+    _worker_args.update(plan=plan, engine=engine, template_path=template_path,
+                        template_output_dir=template_output_dir, root=root)
+
+
+def _extract_batch_row(doc_path: Path) -> Dict[str, Any]:
+    return extract_fields_row(doc_path, **_worker_args)
+
+
+def _extract_batch_row_profiled(doc_path: Path):
+    return metrics.profile_document(doc_path.name, extract_fields_row, doc_path, **_worker_args)
+
+
+def _extract_batch_chunk(doc_paths: List[Path], profile: bool) -> List:
+    worker = _extract_batch_row_profiled if profile else _extract_batch_row
+    return [worker(doc_path) for doc_path in doc_paths]
+
+
+def template_output_file(doc_path: Path, template_output_dir: Optional[str],
+                         root: Optional[str] = None) -> Path:
+    """
+    文档填充后模板的保存路径
+
+    给出输入根目录 root 时按文档的相对路径（归档中的文档为成员路径）建立子目录，
+    不同目录或归档中的同名文档不会互相覆盖；否则直接保存在 template_output_dir 下。
+    """
+    relative = PurePosixPath(shard_key(doc_path, root) if root else doc_path.name)
+    # 不允许相对路径（如归档成员路径）跳出输出目录
+    subdirs = [part for part in relative.parent.parts if part not in ('/', '.', '..')]
+    return Path(template_output_dir or '.', *subdirs, f"{relative.stem}.xlsx")
+
+
+def extract_fields_row(doc_path: Path, plan: FieldPlan,
+                       engine: str = DEFAULT_ENGINE,
+                       template_path: Optional[str] = None,
+                       template_output_dir: Optional[str] = None,
+                       root: Optional[str] = None) -> Dict[str, Any]:
+    """
+    提取一个文档的所有字段，返回一行结果（失败时包含 '错误' 字段）
+
+    指定 template_path 时同时将结果填入模板，保存到 template_output_file() 给出的 .xlsx 文件。
+    """
+    row = {'文件名': doc_path.name, '文件路径': str(doc_path)}
     try:
-        if template_path and Path(template_path).exists():
-            # 使用模板
-            wb = load_workbook(template_path)
-            ws = wb.active
-
-            # 查找并填充字段占位符
-            for row in ws.iter_rows():
-                for cell in row:
-                    if cell.value and isinstance(cell.value, str):
-                        for field_name, field_value in data.items():
-                            placeholder = f"{{{field_name}}}"
-                            if placeholder in cell.value:
-                                cell.value = cell.value.replace(placeholder, field_value)
+        doc = open_document(doc_path, engine)
+        data = extract_fields_from_document(doc, plan)
+        row.update(data)
+        if template_path:
+            output_file = template_output_file(doc_path, template_output_dir, root)
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            with stage('template'):
+                fill_template(template_path, data, str(output_file))
+            row['输出文件'] = str(output_file)
+    except Exception as e:
+        print(f"提取字段失败 {doc_path.name}: {e}")
+        row['错误'] = str(e)
+    return row
+
+
+def extract_fields_batch(doc_paths: Iterable[Path], plan: FieldPlan,
+                         engine: str = DEFAULT_ENGINE,
+                         jobs: Optional[int] = None,
+                         template_path: Optional[str] = None,
+                         template_output_dir: Optional[str] = None,
+                         ordered: bool = True,
+                         root: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    对多个文档应用同一提取计划，逐行返回结果
+
+    doc_paths 可以是边查找边产生的迭代器；多进程时按批提交，在途的批数有上限。
+
+    Args:
+        doc_paths: 文档路径
+        plan: 编译后的字段提取计划
+        engine: 解析引擎
+        jobs: 工作进程数，None 表示使用全部CPU核心，1 表示串行
+        template_path: Excel模板路径，指定时为每个文档生成一份填充后的模板
+        template_output_dir: 填充后模板的输出目录
+        ordered: True 时按输入顺序返回；False 时按完成顺序返回
+        root: 输入根目录，填充后的模板按文档相对它的路径保存（见 template_output_file）
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    # 文档数少于进程数时不启动多余的进程
+    paths_iter = iter(doc_paths)
+    head = list(islice(paths_iter, jobs))
+    jobs = max(1, min(jobs, len(head)))
+    paths_iter = chain(head, paths_iter)
+
+    if template_path:
+        Path(template_output_dir or '.').mkdir(parents=True, exist_ok=True)
+
+    # 激活了性能统计时，每个文档的计时记录随结果返回并合并
+    collector = metrics.current()
+
+    if jobs == 1:
+        row_args = (plan, engine, template_path, template_output_dir, root)
+        if collector is None:
+            for doc_path in paths_iter:
+                yield extract_fields_row(doc_path, *row_args)
+        else:
+            yield from _merge_records(
+                (metrics.profile_document(doc_path.name, extract_fields_row, doc_path, *row_args)
+                 for doc_path in paths_iter), collector)
+        return
+
+    # 文档总数已知时按总数确定每批大小，边查找边处理时使用固定大小
+    if isinstance(doc_paths, Sized):
+        chunksize = max(1, min(32, len(doc_paths) // (jobs * 8)))
+    else:
+        chunksize = _STREAM_CHUNK_SIZE
+    chunks = iter(lambda: list(islice(paths_iter, chunksize)), [])
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_batch_worker,
+                             initargs=(plan, engine, template_path, template_output_dir, root)) as executor:
+        results = _map_bounded(executor, _extract_batch_chunk, chunks, jobs * 4, ordered,
+                               collector is not None)
+        rows = (row for chunk in results for row in chunk)
+        yield from rows if collector is None else _merge_records(rows, collector)
+
+
+def _map_bounded(executor: ProcessPoolExecutor, func, items: Iterable, limit: int,
+                 ordered: bool, *args) -> Iterator:
+    """逐个提交 func(item, *args)，在途任务不超过 limit 个；ordered 为 False 时按完成顺序返回结果"""
+    pending = deque()
+
+    def next_result():
+        if ordered:
+            future = pending.popleft()
         else:
-            # 创建新工作簿
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Extracted Data"
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            future = next(iter(done))
+            pending.remove(future)
+        return future.result()
+
+    for item in items:
+        pending.append(executor.submit(func, item, *args))
+        if len(pending) >= limit:
+            yield next_result()
+    while pending:
+        yield next_result()
+
+
+def _merge_records(results: Iterable, collector) -> Iterator[Dict[str, Any]]:
+    for row, record in results:
+        if '错误' in row:
+            record['error'] = row['错误']
+        collector.add_document(record)
+        yield row
+
+
+def save_batch_to_excel(rows: Iterable[Dict[str, Any]], field_names: List[str],
+                        output_path: str, verbose: bool = False,
+                        with_output_files: bool = False,
+                        output_format: str = 'xlsx',
+                        converter: Optional[CellConverter] = None) -> int:
+    """
+    流式写入批量结果：每个文档一行，每个字段一列
+
+    output_format 为 csv/jsonl/parquet 时每处理完一个文档即写出一条记录。
+    xlsx 给出 converter 时字段列中的数字、金额、百分比和日期写为数值单元格，
+    为此每 CONVERT_CHUNK_ROWS 个文档按列转换一次后写出。
+
+    Returns:
+        写入的文档数
+    """
+    columns = ['文件名', '文件路径'] + field_names + ['错误']
+    if with_output_files:
+        columns.append('输出文件')
+
+    if output_format != 'xlsx':
+        writer = open_record_writer(output_path, output_format)
+        writer.write_header(columns)
+        count = 0
+        try:
+            for row in rows:
+                with stage('write'):
+                    writer.append([row.get(column, '') for column in columns])
+                count += 1
+                if verbose:
+                    print(f"处理: {row['文件名']}")
+        finally:
+            with stage('save'):
+                writer.close()
+        return count
+
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title="Extracted Data")
+    for col_idx, column in enumerate(columns, 1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = 40 if column == '文件路径' else 20
+
+    header = []
+    for column in columns:
+        cell = WriteOnlyCell(ws, value=column)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    ws.append(header)
+
+    fields = slice(2, 2 + len(field_names))
+    chunk_size = 1 if converter is None else CONVERT_CHUNK_ROWS
+    count = 0
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        with stage('write'):
+            values = [[row.get(column, '') for column in columns] for row in chunk]
+            if converter is None:
+                ws.append(values[0])
+            else:
+                converted, formats = converter.convert_rows([row[fields] for row in values])
+                for row, field_values, field_formats in zip(values, converted, formats):
+                    row[fields] = field_values
+                    for col_idx, number_format in enumerate(field_formats, fields.start):
+                        if number_format:
+                            cell = WriteOnlyCell(ws, value=row[col_idx])
+                            cell.number_format = number_format
+                            row[col_idx] = cell
+                    ws.append(row)
+        count += len(chunk)
+        if verbose:
+            for row in chunk:
+                print(f"处理: {row['文件名']}")
+
+    with stage('save'):
+        wb.save(output_path)
+    return count
 
-            # 写入数据
-            ws.append(["字段名称", "字段值"])
-            for field_name, field_value in data.items():
-                ws.append([field_name, field_value])
 
-            # 设置列宽
-            ws.column_dimensions['A'].width = 20
-            ws.column_dimensions['B'].width = 40
+def save_to_excel(data: Dict[str, str], output_path: str,
+                 template_path: Optional[str] = None,
+                 output_format: str = 'xlsx',
+                 converter: Optional[CellConverter] = None) -> bool:
+    """
+    保存数据到Excel；output_format 为 csv/jsonl/parquet 时写出 (字段名称, 字段值) 记录
+
+    新建工作簿时给出 converter 则把数字、金额、百分比和日期形式的字段值写为数值单元格
+    （每个字段单独转换，小数位数互不影响）；填充模板时总是写入原文本。
+    """
+    try:
+        if output_format != 'xlsx':
+            if template_path:
+                print(f"警告: {output_format} 格式不使用Excel模板: {template_path}")
+            with stage('save'):
+                write_records(output_path, output_format, ["字段名称", "字段值"],
+                              ([name, value] for name, value in data.items()))
+            return True
+
+        if template_path and Path(template_path).exists():
+            # 使用模板：按缓存的占位符索引只修改含占位符的单元格（所有工作表）
+            with stage('template'):
+                fill_template(template_path, data, output_path)
+            return True
+
+        from openpyxl import Workbook
+
+        # 创建新工作簿
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Extracted Data"
+
+        # 写入数据
+        ws.append(["字段名称", "字段值"])
+        for field_name, field_value in data.items():
+            number_format = None
+            if converter is not None:
+                (field_value,), (number_format,) = converter.convert_column([field_value])
+            ws.append([field_name, field_value])
+            if number_format:
+                ws.cell(row=ws.max_row, column=2).number_format = number_format
+
+        # 设置列宽
+        ws.column_dimensions['A'].width = 20
+        ws.column_dimensions['B'].width = 40
 
         # 保存文件
-        wb.save(output_path)
+        with stage('save'):
+            wb.save(output_path)
         return True
 
     except Exception as e:
@@ -221,57 +681,185 @@ def save_to_excel(data: Dict[str, str], output_path: str,
         return False
 
 
-def main():
-    parser = argparse.ArgumentParser(description='从Word文档提取指定字段到Excel')
-    parser.add_argument('input', help='输入Word文档路径 (.docx)')
-    parser.add_argument('--output', '-o', required=True, help='输出Excel文件路径')
-    parser.add_argument('--fields', '-f', help='要提取的字段列表，逗号分隔')
-    parser.add_argument('--config', '-c', help='字段映射配置文件路径 (JSON)')
-    parser.add_argument('--template', '-t', help='Excel模板文件路径')
-    parser.add_argument('--verbose', '-v', action='store_true', help='显示详细信息')
-
-    args = parser.parse_args()
-
-    # 检查输入文件
-    input_path = Path(args.input)
-    if not input_path.exists():
-        print(f"错误: 输入文件不存在: {args.input}")
-        sys.exit(1)
+def run_extract_fields(input: str, output: Optional[str] = None,
+                       fields: Union[str, List[str], None] = None,
+                       config: Optional[str] = None,
+                       template: Optional[str] = None,
+                       pattern: str = '*.docx', jobs: Optional[int] = None,
+                       engine: str = DEFAULT_ENGINE, verbose: bool = False,
+                       field_configs: Optional[List[Dict[str, Any]]] = None,
+                       output_format: Optional[str] = None, recursive: bool = False,
+                       ordered: bool = True, format_numbers: Optional[bool] = None,
+                       number_precision: Optional[int] = None) -> Dict[str, Any]:
+    """
+    按字段配置提取单个文档或批量提取（命令行和常驻服务共用）
+
+    Args:
+        input: 文档路径，或目录/通配符表达式（批量模式）
+        output: 输出Excel文件路径；单文档模式下为空时只返回提取结果
+        fields: 字段名列表或逗号分隔的字段名
+        config: 字段映射配置文件路径
+        field_configs: 直接传入的字段配置列表，优先于 fields 和 config
+        output_format: 输出格式 xlsx/csv/jsonl/parquet，默认按输出文件扩展名判断
+        recursive: 批量模式下是否查找子目录中的文档
+        ordered: 批量模式下 True 时按路径顺序输出，False 时按处理完成的顺序输出
+        format_numbers: xlsx 中是否把数字、金额、百分比和日期写为数值单元格，
+            None 时按配置文件的 output_settings.format_numbers
+        number_precision: 数字的小数位数，None 时按配置文件的 validation_rules.number_precision
+
+    Returns:
+        单文档模式：data（字段值）、output；批量模式：documents（文档数）、output、template_output_dir
+
+    Raises:
+        FileNotFoundError: 输入文件不存在或未找到匹配的文档
+        ValueError: 字段配置缺失或无效
+        RuntimeError: 保存Excel失败
+    """
+    if output:
+        output_format = resolve_format(output, output_format)
+        output = format_output_path(output, output_format)
+
+    # 检查输入
+    batch_mode = is_batch_input(input)
+    input_path = Path(input)
+    if not batch_mode and not input_path.exists():
+        raise FileNotFoundError(f"输入文件不存在: {input}")
 
     # 加载字段配置
-    if not args.fields and not args.config:
-        print("错误: 必须指定 --fields 或 --config 参数")
-        sys.exit(1)
-
-    field_configs = load_field_config(args.config, args.fields)
+    if field_configs is None:
+        if not fields and not config:
+            raise ValueError("必须指定 --fields 或 --config 参数")
+        if isinstance(fields, (list, tuple)):
+            fields = ','.join(fields)
+        field_configs = load_field_config(config, fields)
 
     if not field_configs:
-        print("错误: 未加载到有效的字段配置")
-        sys.exit(1)
+        raise ValueError("未加载到有效的字段配置")
+
+    # 数字格式只作用于 xlsx，其他格式保持原文本（parquet 的列类型须一致）
+    converter = None
+    if output and output_format == 'xlsx':
+        converter = load_cell_converter(config, format_numbers, number_precision)
 
-    if args.verbose:
+    if verbose:
         print(f"加载了 {len(field_configs)} 个字段配置")
 
+    # 配置只校验和编译一次
+    plan = FieldPlan(field_configs)
+    for error in plan.errors:
+        print(f"警告: {error}")
+
+    if batch_mode:
+        if not output:
+            raise ValueError("批量模式必须指定输出文件")
+
+        doc_paths = find_input_documents(input, pattern, recursive, ordered)
+        first = next(doc_paths, None)
+        if first is None:
+            raise FileNotFoundError(f"未找到匹配的.docx文件: {input}")
+        doc_paths = chain([first], doc_paths)
+
+        template_path = None
+        template_output_dir = None
+        if template:
+            if Path(template).exists():
+                # 每个文档填充一份模板，汇总表仍写入 output
+                template_path = template
+                template_output_dir = str(Path(output).parent / "filled_templates")
+            else:
+                print(f"警告: 模板文件不存在: {template}")
+
+        try:
+            progress = Progress() if verbose else None
+            if progress is not None:
+                doc_paths = progress.discover(doc_paths)
+            rows = extract_fields_batch(doc_paths, plan, engine, jobs,
+                                        template_path, template_output_dir, ordered, input_root(input))
+            if progress is not None:
+                rows = progress.track(rows)
+            count = save_batch_to_excel(rows, plan.names, output, verbose,
+                                        with_output_files=template_path is not None,
+                                        output_format=output_format, converter=converter)
+        except Exception as e:
+            print(f"保存Excel文件失败: {e}")
+            raise RuntimeError("保存失败!") from e
+
+        print(f"数据已保存到: {output}")
+        if template_output_dir:
+            print(f"填充后的模板保存到目录: {template_output_dir}")
+        print(f"处理了 {count} 个文档，每个文档 {len(plan.fields)} 个字段")
+        return {'documents': count, 'output': output, 'template_output_dir': template_output_dir}
+
     # 提取字段
-    if args.verbose:
+    if verbose:
         print(f"正在提取字段...")
 
-    extracted_data = extract_fields(str(input_path), field_configs)
+    extracted_data = extract_fields(str(input_path), plan, engine)
 
-    if args.verbose:
+    if verbose:
         print(f"提取结果:")
         for field, value in extracted_data.items():
             print(f"  {field}: {value}")
 
     # 保存到Excel
-    success = save_to_excel(extracted_data, args.output, args.template)
+    if output:
+        if not save_to_excel(extracted_data, output, template, output_format, converter):
+            raise RuntimeError("保存失败!")
+        print(f"数据已保存到: {output}")
 
-    if success:
-        print(f"数据已保存到: {args.output}")
-        sys.exit(0)
-    else:
-        print("保存失败!")
+    return {'data': extracted_data, 'output': output}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='从Word文档提取指定字段到Excel')
+    parser.add_argument('input', help='输入Word文档路径 (.docx)，或目录/归档文件/通配符表达式 (批量模式)')
+    parser.add_argument('--output', '-o', required=True, help='输出Excel文件路径')
+    parser.add_argument('--fields', '-f', help='要提取的字段列表，逗号分隔')
+    parser.add_argument('--config', '-c', help='字段映射配置文件路径 (JSON)')
+    parser.add_argument('--template', '-t', help='Excel模板文件路径')
+    parser.add_argument('--format', '-F', dest='output_format', choices=OUTPUT_FORMATS,
+                       help='输出格式: xlsx, csv, jsonl, parquet (默认: 按输出文件扩展名判断，否则为 xlsx)')
+    parser.add_argument('--pattern', '-p', default='*.docx',
+                       help='批量模式下目录内的文件名匹配模式，不区分大小写 (默认: *.docx)')
+    parser.add_argument('--recursive', '-r', action='store_true',
+                       help='批量模式下同时查找子目录中的文档')
+    parser.add_argument('--unordered', action='store_false', dest='ordered',
+                       help='批量模式下按处理完成的顺序输出，不按路径排序')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                       help='批量模式下并行处理的进程数 (默认: 全部CPU核心，1 表示串行)')
+    parser.add_argument('--engine', '-e', choices=ENGINES, default=DEFAULT_ENGINE,
+                       help=f'解析引擎: fast 直接读取XML, docx 使用python-docx (默认: {DEFAULT_ENGINE})')
+    parser.add_argument('--format-numbers', action='store_true', default=None,
+                       help='xlsx 中把数字、金额、百分比和日期形式的字段值写为数值单元格 '
+                            '(默认: 按配置文件的 output_settings.format_numbers)')
+    parser.add_argument('--number-precision', type=int, metavar='N',
+                       help='数字统一保留 N 位小数 (默认: 按配置文件的 validation_rules.number_precision)')
+    parser.add_argument('--verbose', '-v', action='store_true', help='显示详细信息 (批量模式下显示实时进度)')
+    metrics.add_arguments(parser)
+
+    args = parser.parse_args()
+
+    # 单文档模式整个运行记为一个文档；批量模式由各文档的记录汇总
+    collector = metrics.from_args(args)
+    scope = (contextlib.nullcontext() if is_batch_input(args.input)
+             else metrics.document(Path(args.input).name))
+    try:
+        with metrics.activate(collector), scope:
+            run_extract_fields(args.input, args.output, args.fields, args.config, args.template,
+                               args.pattern, args.jobs, args.engine, args.verbose,
+                               output_format=args.output_format, recursive=args.recursive,
+                               ordered=args.ordered, format_numbers=args.format_numbers,
+                               number_precision=args.number_precision)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"错误: {e}")
+        sys.exit(1)
+    except RuntimeError as e:
+        print(e)
         sys.exit(1)
+    finally:
+        metrics.report(collector, args)
+
+    sys.exit(0)
 
 
 if __name__ == "__main__":
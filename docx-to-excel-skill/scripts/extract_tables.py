@@ -5,132 +5,290 @@
 """
 
 import argparse
+import itertools
 import sys
 import os
+import unicodedata
 from pathlib import Path
-from typing import List, Dict, Any
-import pandas as pd
-from docx import Document
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
-from openpyxl.utils import get_column_letter
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 
+from docx_excel import DEFAULT_ENGINE, ENGINES, FastDocument, GridCell, StreamingDocument, metrics, open_document
+from docx_excel.cell_types import CellConverter
+from docx_excel.engine import iter_docx_table_cells
+from docx_excel.metrics import stage
+from docx_excel.writers import OUTPUT_FORMATS, format_output_path, open_record_writer, resolve_format
 
-def extract_tables_from_docx(docx_path: str) -> List[List[List[str]]]:
+
+def strip_rows(rows: Iterable[List[str]]) -> Iterator[List[str]]:
+    """去除每个单元格文本的首尾空白"""
+    for row in rows:
+        yield [text.strip() for text in row]
+
+
+def iter_table_cells_from_docx(docx_path: str, engine: str = DEFAULT_ENGINE, streaming: bool = False
+                               ) -> Iterator[Iterator[List[GridCell]]]:
+    """
+    逐个生成Word文档中的表格，每个表格是按行惰性生成的 GridCell 行迭代器
+
+    fast 引擎解析表格的XML元素，docx 引擎读取 python-docx 的 row.cells；合并单元格在其覆盖的
+    每个网格位置上是同一个 GridCell，文本只读取一次，行列跨度见 GridCell.row_span/col_span。
+    文档的打开方式和 streaming 的限制同 iter_tables_from_docx()。
+    """
+    if streaming:
+        doc = StreamingDocument(docx_path)
+        return (table.iter_cells() for table in doc.iter_tables())
+
+    doc = open_document(docx_path, engine)
+    if isinstance(doc, FastDocument):
+        return doc.iter_table_cells()
+    return (iter_docx_table_cells(table) for table in doc.tables)
+
+
+def iter_tables_from_docx(docx_path: str, engine: str = DEFAULT_ENGINE, streaming: bool = False
+                          ) -> Iterator[Iterator[List[str]]]:
+    """
+    逐个生成Word文档中的表格，每个表格是按行惰性生成的迭代器
+
+    文档在调用时即由 open_document() 打开（打开失败立即抛出异常），同一进程中再次处理
+    未修改的文档时复用已解析的文档；表格和行在迭代时才展开，已消费的表格文本不会保留在内存中。
+    合并单元格的文本在其覆盖的每个位置重复。
+
+    streaming 为 True 时用 StreamingDocument 增量解析，不载入整个XML树（忽略 engine）；
+    此时每个表格必须在请求下一个表格之前遍历完。
+
+    Args:
+        docx_path: Word文档路径
+        engine: 解析引擎，'fast' 直接读取XML，'docx' 使用python-docx
+        streaming: 是否使用流式解析
+
+    Returns:
+        表格迭代器，每个元素是该表格的行迭代器（每行为去除首尾空白的单元格文本列表）
+    """
+    return (strip_rows([cell.text for cell in row] for row in rows)
+            for rows in iter_table_cells_from_docx(docx_path, engine, streaming))
+
+
+def extract_tables_from_docx(docx_path: str, engine: str = DEFAULT_ENGINE) -> List[List[List[str]]]:
     """
     从Word文档提取所有表格
 
     Args:
         docx_path: Word文档路径
+        engine: 解析引擎，'fast' 直接读取XML，'docx' 使用python-docx
 
     Returns:
         表格数据列表，每个表格是二维列表
     """
     try:
-        doc = Document(docx_path)
-        tables_data = []
-
-        for table in doc.tables:
-            table_data = []
-            for row in table.rows:
-                row_data = []
-                for cell in row.cells:
-                    # 提取单元格文本，去除多余空白
-                    text = cell.text.strip()
-                    row_data.append(text)
-                table_data.append(row_data)
-            tables_data.append(table_data)
-
-        return tables_data
+        return [list(rows) for rows in iter_tables_from_docx(docx_path, engine)]
     except Exception as e:
         print(f"读取Word文档失败: {e}")
         return []
 
 
-def create_excel_with_tables(tables_data: List[List[List[str]]],
+# --preserve-format 使用的命名样式，每个工作簿只注册一次
+TITLE_STYLE = 'docx_table_title'
+HEADER_STYLE = 'docx_table_header'
+CELL_STYLE = 'docx_table_cell'
+
+
+def register_table_styles(wb):
+    """在工作簿中注册表格标题、表头和单元格的命名样式"""
+    from openpyxl.styles import Font, Alignment, Border, Side, PatternFill, NamedStyle
+
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
+
+    wb.add_named_style(NamedStyle(
+        name=TITLE_STYLE,
+        font=Font(bold=True, size=14),
+        fill=PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")))
+    wb.add_named_style(NamedStyle(
+        name=HEADER_STYLE,
+        font=Font(bold=True),
+        fill=PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid"),
+        border=border, alignment=alignment))
+    wb.add_named_style(NamedStyle(name=CELL_STYLE, border=border, alignment=alignment))
+
+
+def display_width(text: str) -> int:
+    """文本显示宽度：中日韩等全角字符按2计算，多行文本取最长一行"""
+    if text.isascii():
+        return max((len(line) for line in text.split('\n')), default=0)
+    return max((sum(2 if unicodedata.east_asian_width(ch) in ('W', 'F') else 1 for ch in line)
+                for line in text.split('\n')), default=0)
+
+
+# 流式写入时用于计算列宽的采样行数（只写工作表必须在写入第一行前设置列宽）
+WIDTH_SAMPLE_ROWS = 1000
+
+
+def _layout_rows(tables_data: Iterable[Iterable[list]],
+                 stats: Dict[str, Any],
+                 with_titles: Optional[bool] = None,
+                 converter: Optional[CellConverter] = None
+                 ) -> Iterator[Tuple[Optional[str], list, Optional[list]]]:
+    """
+    将表格序列展开为工作表行：(样式名, 行值, 各单元格的数字格式)
+
+    表格之间插入两行空行；多于一个表格时每个表格前添加标题行。
+    with_titles 为 None 时预读一个表格（不展开其行）来判断是否需要标题；
+    流式读取的表格必须按顺序遍历，不能预读，此时由调用方给出。
+
+    表格行可以是单元格文本列表，也可以是 GridCell 列表（见 iter_table_cells_from_docx）。
+    后者只在合并区域的左上角写入文本，合并区域以 (表格起始行号, GridCell) 追加到
+    stats['merges']，写完全部行后其行列跨度才完整，由调用方转换为工作表的合并区域。
+
+    给出 converter 时按列转换表头以外的数字、金额、百分比和日期（见 CellConverter），
+    为此缓存一个表格的全部行后再输出；否则数字格式为 None，表格逐行输出。
+    """
+    tables = iter(tables_data)
+    if with_titles is None:
+        lookahead = list(itertools.islice(tables, 2))
+        with_titles = len(lookahead) > 1
+        tables = itertools.chain(lookahead, tables)
+
+    merges = stats.setdefault('merges', [])
+    sheet_row = 0
+    for table_idx, table in enumerate(tables):
+        if table_idx > 0:
+            # 表格之间添加空行
+            yield None, [], None
+            yield None, [], None
+            sheet_row += 2
+
+        # 添加表格标题
+        if with_titles:
+            yield TITLE_STYLE, [f"表格 {table_idx + 1}"], None
+            sheet_row += 1
+
+        # 写入表格数据
+        start_row = sheet_row + 1
+        rows = _table_values(table, start_row, merges)
+        if converter is not None:
+            values, formats = converter.convert_rows(list(rows), header_rows=1)
+            rows = iter(values)
+        else:
+            formats = None
+        for row_idx, row in enumerate(rows):
+            yield (HEADER_STYLE if row_idx == 0 else CELL_STYLE), row, formats and formats[row_idx]
+            sheet_row += 1
+
+        stats['tables'] = table_idx + 1
+
+
+def _table_values(table: Iterable[list], start_row: int, merges: list) -> Iterator[list]:
+    """表格的行值；GridCell 行转换为文本，合并区域以 (start_row, GridCell) 追加到 merges"""
+    for row_idx, row in enumerate(table):
+        if row and isinstance(row[0], GridCell):
+            values = []
+            for col_idx, cell in enumerate(row):
+                if cell.is_origin(row_idx, col_idx):
+                    values.append(cell.text.strip())
+                    if cell.col_span > 1:
+                        merges.append((start_row, cell))
+                else:
+                    values.append('')
+                    # 纵向合并在第一个续接行处确定（横向合并已在左上角记录）
+                    if (cell.col_span == 1 and cell.row + 1 == row_idx
+                            and cell.col == col_idx):
+                        merges.append((start_row, cell))
+            row = values
+        yield row
+
+
+def create_excel_with_tables(tables_data: Iterable[Iterable[List[str]]],
                             output_path: str,
                             sheet_name: str = "Tables",
-                            preserve_format: bool = False) -> bool:
+                            preserve_format: bool = False,
+                            with_titles: Optional[bool] = None,
+                            converter: Optional[CellConverter] = None) -> bool:
     """
     将表格数据保存到Excel文件
 
+    使用只写工作表逐行写入。tables_data 可以是完整的表格列表，也可以是
+    iter_tables_from_docx() 返回的惰性迭代器，此时峰值内存只取决于单个表格的一行
+    和列宽采样行数。列宽按前 WIDTH_SAMPLE_ROWS 行计算（传入列表时按全部行计算）。
+
     Args:
-        tables_data: 表格数据列表
+        tables_data: 表格数据列表或表格迭代器
         output_path: 输出Excel文件路径
         sheet_name: 工作表名称
         preserve_format: 是否保留格式
+        with_titles: 是否在每个表格前添加标题行，None 表示多于一个表格时添加
+        converter: 把数字、金额、百分比和日期写为带数字格式的数值单元格，None 表示全部写为文本
 
     Returns:
         是否成功
     """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+    from openpyxl.worksheet.cell_range import CellRange
+
     try:
-        if not tables_data:
+        stats: Dict[str, Any] = {'tables': 0}
+        # 惰性生成表格行的耗时（解析表格）单独计入 tables 阶段
+        rows = metrics.timed(_layout_rows(tables_data, stats, with_titles, converter), 'tables')
+        sample_rows = None if isinstance(tables_data, list) else WIDTH_SAMPLE_ROWS
+
+        # 先缓存采样行并统计每列的最大显示宽度
+        sample = []
+        column_widths: Dict[int, int] = {}
+        with stage('autofit'):
+            for style, values, formats in rows:
+                sample.append((style, values, formats))
+                if style in (HEADER_STYLE, CELL_STYLE):
+                    for col_idx, value in enumerate(values, 1):
+                        width = display_width(str(value))
+                        if width > column_widths.get(col_idx, 0):
+                            column_widths[col_idx] = width
+                if sample_rows is not None and len(sample) >= sample_rows:
+                    break
+
+        if not sample:
             print("警告: 未找到表格数据")
             return False
 
         # 创建Excel工作簿
-        wb = Workbook()
-        ws = wb.active
-        ws.title = sheet_name
-
-        current_row = 1
-
-        for table_idx, table in enumerate(tables_data):
-            if table_idx > 0:
-                # 表格之间添加空行
-                current_row += 2
-
-            # 添加表格标题
-            if len(tables_data) > 1:
-                title_cell = ws.cell(row=current_row, column=1, value=f"表格 {table_idx + 1}")
-                if preserve_format:
-                    title_cell.font = Font(bold=True, size=14)
-                    title_cell.fill = PatternFill(start_color="CCCCCC", end_color="CCCCCC", fill_type="solid")
-                current_row += 1
-
-            # 写入表格数据
-            for row_idx, row in enumerate(table):
-                for col_idx, cell_value in enumerate(row):
-                    cell = ws.cell(row=current_row + row_idx,
-                                  column=col_idx + 1,
-                                  value=cell_value)
-
-                    if preserve_format:
-                        # 应用基本格式
-                        cell.alignment = Alignment(horizontal='left', vertical='center', wrap_text=True)
-
-                        # 设置边框
-                        thin_border = Border(left=Side(style='thin'),
-                                           right=Side(style='thin'),
-                                           top=Side(style='thin'),
-                                           bottom=Side(style='thin'))
-                        cell.border = thin_border
-
-                        # 表头加粗
-                        if row_idx == 0:
-                            cell.font = Font(bold=True)
-                            cell.fill = PatternFill(start_color="E6E6E6", end_color="E6E6E6", fill_type="solid")
-
-            # 调整列宽
-            if table:
-                for col_idx in range(len(table[0])):
-                    max_length = 0
-                    for row in table:
-                        if col_idx < len(row):
-                            cell_length = len(str(row[col_idx]))
-                            if cell_length > max_length:
-                                max_length = cell_length
-
-                    # 设置列宽，最小10，最大50
-                    column_width = min(max(max_length + 2, 10), 50)
-                    ws.column_dimensions[get_column_letter(col_idx + 1)].width = column_width
-
-            current_row += len(table)
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title=sheet_name)
+
+        if preserve_format:
+            register_table_styles(wb)
+
+        # 设置列宽，最小10，最大50
+        for col_idx, max_width in column_widths.items():
+            ws.column_dimensions[get_column_letter(col_idx)].width = min(max(max_width + 2, 10), 50)
+
+        with stage('write'):
+            for style, values, formats in itertools.chain(sample, rows):
+                if (preserve_format and style) or (formats and any(formats)):
+                    cells = []
+                    for value, number_format in zip(values, formats or itertools.repeat(None)):
+                        cell = WriteOnlyCell(ws, value=value)
+                        if preserve_format and style:
+                            cell.style = style
+                        if number_format:
+                            cell.number_format = number_format
+                        cells.append(cell)
+                    ws.append(cells)
+                else:
+                    ws.append(values)
+
+            # 只写工作表不支持 merge_cells()，合并区域直接登记，保存时写在工作表末尾
+            for start_row, cell in stats['merges']:
+                top = start_row + cell.row
+                ws.merged_cells.add(CellRange(min_col=cell.col + 1, min_row=top,
+                                              max_col=cell.col + cell.col_span,
+                                              max_row=top + cell.row_span - 1))
 
         # 保存文件
-        wb.save(output_path)
+        with stage('save'):
+            wb.save(output_path)
         print(f"Excel文件已保存: {output_path}")
-        print(f"提取了 {len(tables_data)} 个表格")
+        print(f"提取了 {stats['tables']} 个表格")
         return True
 
     except Exception as e:
@@ -138,50 +296,191 @@ def create_excel_with_tables(tables_data: List[List[List[str]]],
         return False
 
 
+# 非 xlsx 格式的记录结构：每个单元格一条记录，行列号从1开始，合并单元格的值在其覆盖的每个位置重复
+TABLE_RECORD_FIELDS = ['表格', '行', '列', '值']
+
+
+def write_table_records(tables_data: Iterable[Iterable[List[str]]], output_path: str,
+                        output_format: str) -> bool:
+    """
+    将表格数据逐个单元格流式写出为 csv/jsonl/parquet
+
+    与 create_excel_with_tables 不同，不需要预读行来计算列宽，表格边读边写。
+
+    Returns:
+        是否成功
+    """
+    try:
+        writer = open_record_writer(output_path, output_format)
+        writer.write_header(TABLE_RECORD_FIELDS)
+        table_count = 0
+        try:
+            for table_idx, rows in enumerate(metrics.timed(tables_data, 'tables'), 1):
+                table_count = table_idx
+                for row_idx, row in enumerate(metrics.timed(rows, 'tables'), 1):
+                    with stage('write'):
+                        for col_idx, value in enumerate(row, 1):
+                            writer.append([table_idx, row_idx, col_idx, value])
+        finally:
+            with stage('save'):
+                writer.close()
+
+        if table_count == 0:
+            print("警告: 未找到表格数据")
+            return False
+
+        print(f"{output_format}文件已保存: {output_path}")
+        print(f"提取了 {table_count} 个表格")
+        return True
+
+    except Exception as e:
+        print(f"保存{output_format}文件失败: {e}")
+        return False
+
+
+def _report_tables(tables: Iterable[Iterable[List[str]]]) -> Iterator[Iterator[List[str]]]:
+    """包装表格迭代器，每个表格写完后输出其行列数"""
+    def report(idx: int, rows: Iterable[List[str]]) -> Iterator[List[str]]:
+        row_count = 0
+        col_count = 0
+        for row in rows:
+            if row_count == 0:
+                col_count = len(row)
+            row_count += 1
+            yield row
+        print(f"  表格 {idx}: {row_count} 行 × {col_count} 列")
+
+    for idx, rows in enumerate(tables, 1):
+        yield report(idx, rows)
+
+
+def run_extract_tables(input: str, output: str = 'output.xlsx', sheet_name: str = 'Tables',
+                       preserve_format: bool = False, engine: str = DEFAULT_ENGINE,
+                       verbose: bool = False, output_format: Optional[str] = None,
+                       streaming: bool = False, format_numbers: bool = False,
+                       number_precision: Optional[int] = None) -> Dict[str, Any]:
+    """
+    提取一个文档的全部表格并保存为Excel（命令行和常驻服务共用）
+
+    output_format 为 csv/jsonl/parquet 时按 TABLE_RECORD_FIELDS 逐个单元格写出，
+    默认按输出文件扩展名判断格式。streaming 为 True 时增量解析文档，每读完一行即写出。
+    xlsx 中 Word 的合并单元格保留为合并区域，文本只写在左上角。
+    format_numbers 为 True 时 xlsx 中表头以外的数字、金额、百分比和日期写为数值单元格，
+    number_precision 为其小数位数；其他格式总是按原文本写出。
+
+    Returns:
+        处理结果：tables（表格数）、output（输出文件）
+
+    Raises:
+        FileNotFoundError: 输入文件不存在
+        ValueError: number_precision 不是非负整数
+        RuntimeError: 读取文档或保存Excel失败
+    """
+    output_format = resolve_format(output, output_format)
+    converter = CellConverter(number_precision) if format_numbers else None
+    output = format_output_path(output, output_format)
+
+    # 检查输入文件
+    input_path = Path(input)
+    if not input_path.exists():
+        raise FileNotFoundError(f"输入文件不存在: {input}")
+
+    if input_path.suffix.lower() != '.docx':
+        print(f"警告: 文件扩展名不是 .docx: {input}")
+
+    # 提取表格数据
+    if verbose:
+        print(f"正在读取文档: {input}")
+
+    with_titles = None
+    try:
+        if output_format == 'xlsx':
+            # xlsx 按单元格读取，合并单元格写为工作表的合并区域
+            tables_data = iter_table_cells_from_docx(str(input_path), engine, streaming)
+        else:
+            tables_data = iter_tables_from_docx(str(input_path), engine, streaming)
+        if streaming and output_format == 'xlsx':
+            # 流式读取不能预读下一个表格，先单独扫描判断是否多于一个表格（需要标题行）
+            with stage('scan'):
+                with_titles = StreamingDocument(str(input_path)).count_tables(limit=2) > 1
+    except Exception as e:
+        raise RuntimeError(f"读取Word文档失败: {e}") from e
+
+    if verbose:
+        tables_data = _report_tables(tables_data)
+
+    table_count = 0
+    collect = metrics.current() is not None
+
+    def count_rows(rows):
+        for row in rows:
+            metrics.count(rows=1, cells=len(row))
+            yield row
+
+    def count_tables(tables):
+        nonlocal table_count
+        for table in tables:
+            table_count += 1
+            if collect:
+                metrics.count(tables=1)
+                table = count_rows(table)
+            yield table
+
+    # 逐表逐行写入
+    if output_format == 'xlsx':
+        success = create_excel_with_tables(count_tables(tables_data), output, sheet_name,
+                                           preserve_format, with_titles, converter)
+    else:
+        success = write_table_records(count_tables(tables_data), output, output_format)
+    if not success:
+        # 具体原因已由写入函数输出
+        raise RuntimeError(f"未能生成{output_format}文件")
+
+    return {'tables': table_count, 'output': output}
+
+
 def main():
     parser = argparse.ArgumentParser(description='从Word文档提取表格数据到Excel')
     parser.add_argument('input', help='输入Word文档路径 (.docx)')
     parser.add_argument('--output', '-o', default='output.xlsx', help='输出Excel文件路径 (默认: output.xlsx)')
     parser.add_argument('--sheet-name', '-s', default='Tables', help='Excel工作表名称 (默认: Tables)')
     parser.add_argument('--preserve-format', '-f', action='store_true', help='保留表格格式')
+    parser.add_argument('--format', '-F', dest='output_format', choices=OUTPUT_FORMATS,
+                       help='输出格式: xlsx, csv, jsonl, parquet (默认: 按输出文件扩展名判断，否则为 xlsx)；'
+                            '非 xlsx 格式每个单元格一条记录 (表格, 行, 列, 值)')
+    parser.add_argument('--engine', '-e', choices=ENGINES, default=DEFAULT_ENGINE,
+                       help=f'解析引擎: fast 直接读取XML, docx 使用python-docx (默认: {DEFAULT_ENGINE})')
+    parser.add_argument('--streaming', action='store_true',
+                       help='流式解析超大文档：增量读取XML，逐行写出，峰值内存与文档大小无关 (忽略 --engine)')
+    parser.add_argument('--format-numbers', action='store_true',
+                       help='xlsx 中把数字、金额、百分比和日期写为数值单元格（表头除外），'
+                            '带千位分隔符、“元”等数字格式')
+    parser.add_argument('--number-precision', type=int, metavar='N',
+                       help='配合 --format-numbers：数字统一保留 N 位小数 (默认: 按各列原值)')
     parser.add_argument('--verbose', '-v', action='store_true', help='显示详细信息')
+    metrics.add_arguments(parser)
 
     args = parser.parse_args()
 
-    # 检查输入文件
-    input_path = Path(args.input)
-    if not input_path.exists():
-        print(f"错误: 输入文件不存在: {args.input}")
+    collector = metrics.from_args(args)
+    try:
+        with metrics.activate(collector), metrics.document(Path(args.input).name):
+            run_extract_tables(args.input, args.output, args.sheet_name, args.preserve_format,
+                               args.engine, args.verbose, args.output_format, args.streaming,
+                               args.format_numbers, args.number_precision)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"错误: {e}")
         sys.exit(1)
-
-    if input_path.suffix.lower() != '.docx':
-        print(f"警告: 文件扩展名不是 .docx: {args.input}")
-
-    # 提取表格数据
-    if args.verbose:
-        print(f"正在读取文档: {args.input}")
-
-    tables_data = extract_tables_from_docx(str(input_path))
-
-    if args.verbose:
-        print(f"找到 {len(tables_data)} 个表格")
-        for idx, table in enumerate(tables_data):
-            print(f"  表格 {idx + 1}: {len(table)} 行 × {len(table[0]) if table else 0} 列")
-
-    # 保存到Excel
-    success = create_excel_with_tables(
-        tables_data,
-        args.output,
-        args.sheet_name,
-        args.preserve_format
-    )
-
-    if success:
-        print("处理完成!")
-        sys.exit(0)
-    else:
+    except RuntimeError as e:
+        if e.__cause__ is not None:  # 读取失败的原因尚未输出
+            print(e)
         print("处理失败!")
         sys.exit(1)
+    finally:
+        metrics.report(collector, args)
+
+    print("处理完成!")
+    sys.exit(0)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+常驻服务模式：在同一个进程内处理多次请求
+避免每次调用都重新启动解释器和导入 openpyxl、python-docx 等依赖
+
+协议为 JSON Lines，每行一个请求，每个请求对应一行响应：
+    请求: {"id": 1, "op": "extract_tables", "params": {"input": "a.docx", "output": "a.xlsx"}}
+    成功: {"id": 1, "ok": true, "result": {...}, "log": "..."}
+    失败: {"id": 1, "ok": false, "error": "...", "log": "..."}
+
+默认从标准输入读取请求、向标准输出写入响应；指定 --socket 时监听 Unix 套接字，
+每个连接同样按行收发。处理过程中的提示信息不会写入标准输出，而是放在响应的 log 字段中。
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import time
+from typing import Any, Callable, Dict, IO
+
+from batch_process import run_batch, run_merge
+from extract_fields import run_extract_fields
+from extract_tables import run_extract_tables
+
+
+def _ping(**params) -> Dict[str, Any]:
+    return {'pid': os.getpid(), 'ops': sorted(OPERATIONS)}
+
+
+# 操作名称 -> 处理函数，params 作为关键字参数传入（与命令行参数同名，连字符改为下划线）
+OPERATIONS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    'extract_tables': run_extract_tables,
+    'extract_fields': run_extract_fields,
+    'batch_process': run_batch,
+    'batch_merge': run_merge,
+    'ping': _ping,
+}
+
+
+def preload():
+    """预先导入处理请求时才会用到的依赖，使第一个请求不必承担导入开销"""
+    import openpyxl  # noqa: F401
+    import openpyxl.cell  # noqa: F401
+    import openpyxl.styles  # noqa: F401
+    import openpyxl.utils  # noqa: F401
+
+    try:
+        import docx  # noqa: F401
+    except ImportError:
+        pass  # 只使用 fast 引擎时不需要 python-docx
+
+
+def handle_request(request: Any) -> Dict[str, Any]:
+    """处理一个请求，返回响应对象（不会抛出异常）"""
+    if not isinstance(request, dict):
+        return {'id': None, 'ok': False, 'error': '请求必须是JSON对象'}
+
+    response: Dict[str, Any] = {'id': request.get('id')}
+    op = request.get('op')
+    params = request.get('params') or {}
+    handler = OPERATIONS.get(op)
+    if handler is None:
+        response.update(ok=False, error=f"未知的操作: {op}")
+        return response
+    if not isinstance(params, dict):
+        response.update(ok=False, error='params 必须是JSON对象')
+        return response
+
+    log = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(log):
+            result = handler(**params)
+    except Exception as e:
+        response.update(ok=False, error=str(e) or type(e).__name__)
+    else:
+        response.update(ok=True, result=result)
+    response['elapsed'] = round(time.perf_counter() - start, 4)
+    response['log'] = log.getvalue()
+    return response
+
+
+def serve_stream(reader: IO[str], writer: IO[str]) -> bool:
+    """
+    逐行处理请求直到输入结束或收到 shutdown 请求
+
+    Returns:
+        是否收到 shutdown 请求
+    """
+    for line in reader:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as e:
+            response = {'id': None, 'ok': False, 'error': f"无效的JSON: {e}"}
+        else:
+            if isinstance(request, dict) and request.get('op') == 'shutdown':
+                writer.write(json.dumps({'id': request.get('id'), 'ok': True, 'result': {}},
+                                        ensure_ascii=False) + '\n')
+                writer.flush()
+                return True
+            response = handle_request(request)
+
+        writer.write(json.dumps(response, ensure_ascii=False, default=str) + '\n')
+        writer.flush()
+    return False
+
+
+def serve_stdio():
+    """通过标准输入/输出提供服务"""
+    # 协议使用原标准输出的副本；文件描述符1改指向标准错误，
+    # 防止工作进程等绕过 redirect_stdout 的输出混入响应
+    protocol_out = io.TextIOWrapper(os.fdopen(os.dup(sys.stdout.fileno()), 'wb'),
+                                    encoding='utf-8')
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    stdin = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8')
+    serve_stream(stdin, protocol_out)
+
+
+def remove_stale_socket(socket_path: str):
+    """
+    删除上次运行遗留的套接字文件
+
+    只删除拒绝连接的套接字（服务已退出）；路径不是套接字或仍有服务在监听时抛出 RuntimeError。
+    """
+    try:
+        mode = os.lstat(socket_path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise RuntimeError(f"路径已存在且不是套接字: {socket_path}")
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except ConnectionRefusedError:
+        os.unlink(socket_path)
+        return
+    except OSError as e:
+        raise RuntimeError(f"无法检查已存在的套接字 {socket_path}: {e}") from e
+    finally:
+        probe.close()
+    raise RuntimeError(f"已有服务在监听该套接字: {socket_path}")
+
+
+def serve_unix_socket(socket_path: str):
+    """监听 Unix 套接字，按连接顺序逐个处理（单线程，请求不会并发执行）"""
+    state = {'shutdown': False}
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            reader = io.TextIOWrapper(self.rfile, encoding='utf-8')
+            writer = io.TextIOWrapper(self.wfile, encoding='utf-8', write_through=True)
+            if serve_stream(reader, writer):
+                state['shutdown'] = True
+
+    remove_stale_socket(socket_path)
+
+    with socketserver.UnixStreamServer(socket_path, Handler) as server:
+        print(f"服务已启动: {socket_path} (pid {os.getpid()})", file=sys.stderr)
+        try:
+            while not state['shutdown']:
+                server.handle_request()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='常驻服务模式：通过 JSON Lines 重复调用表格提取、字段提取和批量处理')
+    parser.add_argument('--socket', '-s', help='Unix 套接字路径 (默认: 使用标准输入/输出)')
+    parser.add_argument('--no-preload', action='store_false', dest='preload',
+                       help='不预先导入依赖，在第一个请求时再导入')
+
+    args = parser.parse_args()
+
+    if args.preload:
+        preload()
+
+    if args.socket:
+        if not hasattr(socketserver, 'UnixStreamServer'):
+            print("错误: 当前平台不支持 Unix 套接字", file=sys.stderr)
+            sys.exit(1)
+        try:
+            serve_unix_socket(args.socket)
+        except RuntimeError as e:
+            print(f"错误: {e}", file=sys.stderr)
+            sys.exit(1)
+    else:
+        serve_stdio()
+
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+fast 与 docx 两种解析引擎的一致性测试
+
+docx 引擎以 python-docx 的 row.cells 为参照实现，fast 引擎直接解析XML。两者对同一批文档的
+表格提取、字段提取和批量分析结果必须完全相同。语料包括 benchmarks/corpus.py 生成的带
+横向/纵向合并单元格的文档，以及手工构造的 gridBefore（行首空缺网格）和嵌套表格。
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'scripts'))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+docx = pytest.importorskip('docx')
+from docx.oxml import OxmlElement  # noqa: E402
+from docx.oxml.ns import qn  # noqa: E402
+
+from batch_process import analyze_document  # noqa: E402
+from corpus import CorpusSpec, generate_corpus  # noqa: E402
+from docx_excel import document_cache, table_model  # noqa: E402
+from docx_excel import open_document  # noqa: E402
+from extract_fields import extract_fields  # noqa: E402
+from extract_tables import extract_tables_from_docx, iter_table_cells_from_docx  # noqa: E402
+
+FIELDS = [
+    {'name': '标题', 'type': 'paragraph', 'location': '标题1[0]', 'default': ''},
+    {'name': '日期', 'type': 'regex', 'pattern': '日期[:：]\\s*(\\d{4}年\\d{1,2}月\\d{1,2}日)', 'default': ''},
+    {'name': '负责人', 'type': 'regex', 'pattern': '负责人[:：]\\s*([^\\s，。]+)', 'default': ''},
+    {'name': '首表表头', 'type': 'table', 'table_index': 0, 'row': 0, 'column': 1, 'default': ''},
+    {'name': '首表合并', 'type': 'table', 'table_index': 0, 'row': 2, 'column': 1, 'default': ''},
+    {'name': '末表单元格', 'type': 'table', 'table_index': 1, 'row': 3, 'column': 2, 'default': ''},
+]
+
+
+def _grid_before(row, count: int):
+    """删除行首的 count 个单元格，改为 w:gridBefore 空缺"""
+    tr = row._tr
+    for tc in tr.tc_lst[:count]:
+        tr.remove(tc)
+    tr_pr = tr.get_or_add_trPr()
+    grid_before = OxmlElement('w:gridBefore')
+    grid_before.set(qn('w:val'), str(count))
+    tr_pr.insert(0, grid_before)
+
+
+def _build_edge_document(path: Path):
+    """gridBefore、嵌套表格、跨多列的纵向合并"""
+    doc = docx.Document()
+    doc.add_heading('边界情况', level=1)
+    doc.add_paragraph('日期：2024年3月5日，负责人：张三')
+
+    table = doc.add_table(rows=6, cols=4)
+    for r, row in enumerate(table.rows):
+        for c, cell in enumerate(row.cells):
+            cell.text = f"R{r}C{c}"
+    table.cell(1, 1).merge(table.cell(3, 2))       # 跨两列的纵向合并
+    table.cell(0, 2).merge(table.cell(0, 3))       # 横向合并
+    table.cell(4, 3).add_paragraph('第二段')
+    table.cell(4, 2).merge(table.cell(5, 2))       # 从 gridBefore 行开始的纵向合并
+    _grid_before(table.rows[4], 1)
+
+    outer = doc.add_table(rows=4, cols=3)
+    for r, row in enumerate(outer.rows):
+        for c, cell in enumerate(row.cells):
+            cell.text = f"外{r}{c}"
+    nested = outer.cell(1, 1).add_table(rows=2, cols=2)
+    nested.cell(0, 0).text = '嵌套'
+    outer.cell(2, 0).merge(outer.cell(3, 0))
+    doc.save(str(path))
+
+
+@pytest.fixture(scope='module')
+def corpus(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('parity')
+    spec = CorpusSpec(paragraphs=30, heading_depth=2, tables=3, rows=8, cols=5, merge_ratio=0.2)
+    paths = generate_corpus(str(directory), spec, 6, seed=7)
+    edge = directory / 'edge.docx'
+    _build_edge_document(edge)
+    return paths + [edge]
+
+
+@pytest.fixture(autouse=True)
+def _no_document_cache():
+    cache = document_cache()
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _merged_regions(path: Path, engine: str):
+    regions = []
+    for table in iter_table_cells_from_docx(str(path), engine):
+        seen = set()  # GridCell 按对象比较，集合同时保证对象不被回收
+        for row in table:
+            for cell in row:
+                if cell not in seen:
+                    seen.add(cell)
+                    regions.append((cell.text, cell.row, cell.col, cell.row_span, cell.col_span))
+    return regions
+
+
+def test_corpus_has_merged_cells(corpus):
+    doc = open_document(str(corpus[0]), 'fast')
+    assert any(table_model(table).merged_cells for table in doc.tables)
+
+
+def test_extract_tables(corpus):
+    for path in corpus:
+        assert extract_tables_from_docx(str(path), 'fast') == extract_tables_from_docx(str(path), 'docx'), path
+
+
+def test_table_cells(corpus):
+    for path in corpus:
+        assert _merged_regions(path, 'fast') == _merged_regions(path, 'docx'), path
+
+
+def test_table_model(corpus):
+    for path in corpus:
+        fast = open_document(str(path), 'fast').tables
+        reference = open_document(str(path), 'docx').tables
+        assert len(fast) == len(reference)
+        for fast_table, docx_table in zip(fast, reference):
+            a, b = table_model(fast_table), table_model(docx_table)
+            assert a.texts() == b.texts(), path
+            assert a.column_count == b.column_count
+            assert a.cell_count == b.cell_count
+            assert ([(c.row, c.col, c.row_span, c.col_span) for c in a.merged_cells]
+                    == [(c.row, c.col, c.row_span, c.col_span) for c in b.merged_cells]), path
+
+
+def test_extract_fields(corpus):
+    for path in corpus:
+        assert extract_fields(str(path), FIELDS, 'fast') == extract_fields(str(path), FIELDS, 'docx'), path
+
+
+def test_analyze_document(corpus):
+    for path in corpus:
+        assert analyze_document(path, 'fast') == analyze_document(path, 'docx'), path